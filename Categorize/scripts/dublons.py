@@ -1,46 +1,33 @@
 import json
 import os
-from collections import defaultdict
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common.dedup_index import DedupIndex
 
 # --- Configuration ---
 DAILY_DIR = "data_daily"
+# Index persistant des clés (reference, objet, acheteur) : seuls les fichiers nouveaux ou modifiés sont relus
+INDEX_PATH = "doublons.sqlite"
+# Export des groupes de doublons (une ligne par enregistrement), None pour ne pas l'écrire
 OUTPUT_FILE = "doublons.jsonl"
 
-# --- Chargement des fichiers JSON quotidiens ---
-files = [f for f in os.listdir(DAILY_DIR) if f.startswith("attributed_") and f.endswith(".json")]
-
-# --- Indexation des enregistrements ---
-seen = defaultdict(list)
-
-for filename in files:
-    full_path = os.path.join(DAILY_DIR, filename)
-    with open(full_path, 'r', encoding='utf-8') as f:
-        try:
-            data = json.load(f)
-        except json.JSONDecodeError as e:
-            print(f"[⚠️] Erreur de lecture JSON dans {filename} : {e}")
-            continue
-
-        for record in data:
-            if not record:
-                continue
-            try:
-                key = (
-                    record["reference"].strip().lower(),
-                    record["objet"].strip().lower(),
-                    record["acheteur"].strip().lower()
-                )
-                seen[key].append(record)
-            except Exception as e:
-                print(f"[⚠️] Erreur sur un enregistrement de {filename} : {e}")
-
-# --- Sauvegarde des doublons ---
-with open(OUTPUT_FILE, "w", encoding="utf-8") as out:
-    doublons_count = 0
-    for group in seen.values():
-        if len(group) > 1:
-            for item in group:
-                out.write(json.dumps(item, ensure_ascii=False) + "\n")
-            doublons_count += 1
+with DedupIndex(INDEX_PATH) as index:
+    # --- Indexation des nouveaux fichiers JSON quotidiens ---
+    ingested = index.ingest_dir(DAILY_DIR)
+    for filename, count in ingested.items():
+        print(f"📥 {filename} : {count} enregistrements indexés")
+    stats = index.stats()
+    print(f"🗂️  {len(ingested)} nouveaux fichiers, {stats['files']} fichiers et {stats['records']} enregistrements dans l'index")
 
-print(f"✅ {doublons_count} groupes de doublons écrits dans '{OUTPUT_FILE}'")
+    # --- Sauvegarde des doublons ---
+    if OUTPUT_FILE:
+        doublons_count = 0
+        with open(OUTPUT_FILE, "w", encoding="utf-8") as out:
+            for group in index.duplicate_groups():
+                for item in group:
+                    out.write(json.dumps(item, ensure_ascii=False) + "\n")
+                doublons_count += 1
+        print(f"✅ {doublons_count} groupes de doublons écrits dans '{OUTPUT_FILE}'")
+    else:
+        print(f"✅ {stats['duplicate_groups']} groupes de doublons dans l'index '{INDEX_PATH}'")
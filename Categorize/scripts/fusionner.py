@@ -1,20 +1,10 @@
 import os
 import json
-import re
+import sys
 
-# --- Fonctions utilitaires ---
-def clean(text):
-    if not isinstance(text, str):
-        return ""
-    # Supprimer espaces, # et :
-    text = re.sub(r"^[\s#:]+|[\s#:]+$", "", text)
-    # Normaliser la casse (majuscules ou minuscules selon ce que tu préfères)
-    return text.strip().upper()
-
-
-def load_jsonl(path):
-    with open(path, 'r', encoding='utf-8') as f:
-        return [json.loads(line) for line in f if line.strip()]
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common.dedup_index import DedupIndex
+from common.detail_index import DetailIndex
 
 # --- Fichiers sources ---
 DAILY_DIR = "data_daily"
@@ -22,38 +12,26 @@ CONSULT_FILES = [
     "C:/Users/pc/Desktop/newNew/scraper/old_data/data/consultations.ndjson",
     "data_daily/consultations.ndjson"
 ]
-DOUBLONS_FILE = "doublons.jsonl"
+# Index des doublons construit par dublons.py
+DOUBLONS_INDEX = "doublons.sqlite"
+# Index sur disque des consultations détaillées et des fichiers déjà fusionnés
+DETAILS_INDEX = "consultations.sqlite"
 OUTPUT_DIR = "merged_outputs"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-# --- Chargement des doublons ---
-doublons_data = load_jsonl(DOUBLONS_FILE)
-doublons_keys = {
-    (
-        clean(d.get("reference", "")),
-        clean(d.get("objet", "")),
-        clean(d.get("acheteur", ""))
-    )
-    for d in doublons_data
-}
-print(clean(" 17/2025"))
-# --- Chargement des consultations détaillées des deux fichiers ---
-consultation_index = {}
+# --- Index des doublons (recherche par clé, sans recharger doublons.jsonl) ---
+doublons_index = DedupIndex(DOUBLONS_INDEX)
+details_index = DetailIndex(DETAILS_INDEX)
+details_index.attach_dedup(DOUBLONS_INDEX)
+
+# --- Ajout des nouvelles consultations détaillées à l'index (lignes écrites depuis le dernier passage) ---
 for consult_file in CONSULT_FILES:
-    consultations_data = load_jsonl(consult_file)
-    for c in consultations_data:
-        key = (
-            clean(c.get("référence", "")),
-            clean(c.get("objet", "")),
-            clean(c.get("acheteur", ""))
-        )
-        consultation_index[key] = c  # écrasement autorisé
+    added = details_index.ingest_ndjson(consult_file)
+    print(f"📥 {added} consultations indexées depuis {consult_file}")
 
-# --- Traitement des fichiers attributed_*.json ---
-attributed_files = sorted([
-    f for f in os.listdir(DAILY_DIR)
-    if f.startswith("attributed_") and f.endswith(".json")
-])
+# --- Traitement des fichiers attributed_*.json nouveaux ou à refusionner ---
+attributed_files = details_index.files_to_process(DAILY_DIR)
+print(f"🗂️  {len(attributed_files)} fichiers à fusionner ({details_index.stats()['details']} consultations indexées)")
 
 total_merged = 0
 
@@ -67,19 +45,14 @@ for filename in attributed_files:
             continue
 
     merged_data = []
+    merged_sources = []
     non_matched_data = []
 
     for attr in attributed_data:
-        key = (
-            clean(attr.get("reference", "")),
-            clean(attr.get("objet", "")),
-            clean(attr.get("acheteur", ""))
-        )
-
-        if key in doublons_keys:
+        if doublons_index.is_duplicate(attr):
             continue  # Ignorer les doublons
 
-        consultation_match = consultation_index.get(key)
+        consultation_match = details_index.lookup(attr)
         if consultation_match:
             merged_item = {
                 "reference": attr["reference"],
@@ -88,6 +61,7 @@ for filename in attributed_files:
                 "montant": attr.get("montant", "")
             }
             merged_data.append(merged_item)
+            merged_sources.append(attr)
         else:
             non_matched_data.append(attr)
 
@@ -105,7 +79,10 @@ for filename in attributed_files:
         for item in non_matched_data:
             out.write(json.dumps(item, ensure_ascii=False) + "\n")
 
+    details_index.mark_processed(input_path, merged_sources, non_matched_data)
     print(f"✅ {len(merged_data)} fusionnés | ❗ {len(non_matched_data)} non trouvés → {date_suffix}")
     total_merged += len(merged_data)
 
-print(f"\n🎉 Fusion terminée pour tous les jours : {total_merged} éléments fusionnés.")
+details_index.close()
+doublons_index.close()
+print(f"\n🎉 Fusion terminée pour {len(attributed_files)} jours : {total_merged} éléments fusionnés.")
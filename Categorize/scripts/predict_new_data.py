@@ -1,38 +1,32 @@
 import json
 import os
-import re
-import unicodedata
 from collections import defaultdict
 from pathlib import Path
-from string import punctuation
 from nltk.corpus import stopwords
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common.cleaning import parse_montants
+from common.token_store import DEFAULT_VOCABULARY, Vocabulary, tokenize_file
+from common.keyword_index import load_index
+from common.consultation_store import DEFAULT_PATH as STORE_DEFAULT_PATH, ConsultationStore
 
 # === Configuration ===
 data_dir = "C:/Users/pc/Desktop/NewData/data/natures_new"
 lemmes_dir = "C:/Users/pc/Desktop/NewData/data/resultats_par_nature"
 output_dir = "C:/Users/pc/Desktop/NewData/data/prediction/prediction_results/new_data"
 os.makedirs(output_dir, exist_ok=True)
+# Base SQLite canonique (common.consultation_store) où les prédictions sont aussi enregistrées, None pour la désactiver
+STORE_PATH = STORE_DEFAULT_PATH
+STORE_MODEL = "keywords"
 
 # === Stopwords ===
 STOPWORDS = set(stopwords.words("french"))
+# Vocabulaire partagé des fichiers .tokens.npz écrits à côté des données
+VOCABULARY_FILE = DEFAULT_VOCABULARY
 
-# === Nettoyage et normalisation du texte ===
-def clean_and_tokenize(text):
-    text = text.lower()
-    text = unicodedata.normalize('NFD', text)
-    text = text.encode('ascii', 'ignore').decode('utf-8')
-    text = re.sub(rf"[{punctuation}]", " ", text)
-    text = re.sub(r"\s+", " ", text)
-    tokens = [t for t in text.strip().split() if t not in STOPWORDS and len(t) > 2]
-    return set(tokens)
-
-# === Parse montant ===
-def parse_montant(montant_str):
-    montant_str = montant_str.replace("MAD", "").replace(",", ".").replace(" ", "")
-    try:
-        return float(montant_str)
-    except:
-        return None
+# === Texte tokenisé une seule fois (common.token_store) : vocabulaire global + identifiants par enregistrement ===
+vocabulary = Vocabulary(VOCABULARY_FILE)
 
 # === Fonction pour nom fichier nature ===
 def normaliser_nom_fichier_nature(nature):
@@ -51,10 +45,25 @@ for filename in os.listdir(data_dir):
     detailed_results = []
     stats_by_nature = defaultdict(lambda: {"total": 0, "correct": 0})
 
-    for item in entries:
+    montants = parse_montants(item.get("montant", "") for item in entries)
+    tokenized = tokenize_file(filepath, vocabulary, STOPWORDS, "racines")
+    token_sets = tokenized.sets()
+
+    # Meilleur intervalle : index inversé de chaque nature (common.keyword_index) chargé une fois,
+    # tous les éléments de la nature scorés en un seul appel
+    rows_by_lemme_file = defaultdict(list)
+    for row, item in enumerate(entries):
+        if item.get("nature"):
+            rows_by_lemme_file[os.path.join(lemmes_dir, f"{normaliser_nom_fichier_nature(item['nature'])}.json")].append(row)
+    best_by_row = {}
+    for lemme_file, rows in rows_by_lemme_file.items():
+        if os.path.exists(lemme_file):
+            index = load_index(lemme_file, vocabulary)
+            best_by_row.update(zip(rows, index.best([tokenized[row] for row in rows])))
+
+    for row, (item, montant_real, racines) in enumerate(zip(entries, montants, token_sets)):
         nature = item.get("nature")
         text = item.get("text", "")
-        montant_real = parse_montant(item.get("montant", ""))
         reference = item.get("reference", "")
 
         if not nature:
@@ -67,19 +76,7 @@ for filename in os.listdir(data_dir):
             print(f"⚠️  Fichier introuvable pour nature: {nature} → {lemme_file}")
             continue
 
-        racines = clean_and_tokenize(text)
-
-        with open(lemme_file, "r", encoding="utf-8") as f:
-            interv_dict = json.load(f)
-
-        best_match = None
-        max_overlap = 0
-
-        for interval_str, ref_racines in interv_dict.items():
-            intersection = len(set(ref_racines) & racines)
-            if intersection > max_overlap:
-                best_match = interval_str
-                max_overlap = intersection
+        best_match = best_by_row[row]
 
         if best_match:
             predicted_min, predicted_max = map(float, best_match.split("-"))
@@ -99,7 +96,7 @@ for filename in os.listdir(data_dir):
             "predicted_interval": best_match,
             "correct": correct,
             "text": text,
-            "tokens": sorted(list(racines))
+            "tokens": sorted(vocabulary.decode(racines))
         })
 
     # Sauvegarde des résultats
@@ -109,6 +106,9 @@ for filename in os.listdir(data_dir):
 
     with open(result_path, "w", encoding="utf-8") as f:
         json.dump(detailed_results, f, ensure_ascii=False, indent=2)
+    if STORE_PATH:
+        with ConsultationStore(STORE_PATH) as store:
+            store.add_predictions(detailed_results, STORE_MODEL)
 
     with open(stats_path, "w", encoding="utf-8") as f:
         stats_pct = {
@@ -1,8 +1,15 @@
 import json
 import spacy
 import os
+import sys
 from unidecode import unidecode
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.range_binning import RangeBinning, category_name
+
+# Découpage produit par categorize_with_diffrent_range.py
+BINNING_FILE = "binning.npz"
+
 # Charger le modèle spaCy pour le français
 nlp = spacy.load('fr_core_news_sm')
 
@@ -15,53 +22,47 @@ def normalize_text(text):
     text = unidecode(text)
     return text
 
-def process_category_file(file_path, fields_to_use):
-    """
-    Traite un seul fichier JSON de catégorie.
-    - file_path : chemin du fichier JSON
-    - fields_to_use : liste des champs à concaténer (ex: ["objet", "reference", "acheteur"])
-    """
-    with open(file_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    all_words = []
-
-    for item in data:
-        # Concaténer les champs spécifiés
-        texts = [item.get(field, "") for field in fields_to_use if isinstance(item.get(field, ""), str)]
-        combined_text = " ".join(texts)
-        combined_text = normalize_text(combined_text)
+def item_words(item, fields_to_use):
+    """Lemmes d'un élément (champs spécifiés concaténés, ex: ["objet", "reference", "acheteur"])."""
+    texts = [item.get(field, "") for field in fields_to_use if isinstance(item.get(field, ""), str)]
+    combined_text = " ".join(texts)
+    combined_text = normalize_text(combined_text)
 
-        # Traitement NLP avec spaCy
-        doc = nlp(combined_text)
+    # Traitement NLP avec spaCy
+    doc = nlp(combined_text)
 
-        # Lemmatisation + filtrage
-        words = [token.lemma_ for token in doc
-                 if token.lemma_ not in stop_words
-                 and token.is_alpha
-                 and len(token.lemma_) > 1]
+    # Lemmatisation + filtrage
+    return {token.lemma_ for token in doc
+            if token.lemma_ not in stop_words
+            and token.is_alpha
+            and len(token.lemma_) > 1}
 
-        all_words.extend(words)
-
-    unique_sorted_words = sorted(set(all_words))
-    return unique_sorted_words
-
-def process_all_ranges(base_dir, fields_to_use):
+def process_all_ranges(input_file, fields_to_use):
     """
-    Traite toutes les catégories dans tous les dossiers de range
-    - base_dir : chemin du dossier principal (ex: 'nature1/nature1')
+    Traite toutes les catégories de toutes les résolutions à partir du fichier de découpage
+    - input_file : fichier source de categorize_with_diffrent_range.py (ex: 'nature1/nature1.json')
     - fields_to_use : liste des champs à analyser
     """
-    # Parcourir tous les sous-dossiers
-    for range_dir in os.listdir(base_dir):
-        if not range_dir.startswith('range_'):
-            continue
+    base_name = os.path.splitext(os.path.basename(input_file))[0]
+    base_dir = os.path.join(os.path.dirname(os.path.abspath(input_file)), base_name)
+
+    with open(input_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    binning = RangeBinning(os.path.join(base_dir, BINNING_FILE))
+    if len(binning) != len(data):
+        print(f"❌ {BINNING_FILE} ne correspond plus à {input_file} : relancez categorize_with_diffrent_range.py")
+        return
 
+    # Chaque élément n'est lemmatisé qu'une fois, quelle que soit la résolution
+    print(f"🔤 Lemmatisation de {len(data)} éléments")
+    words_by_item = [item_words(item, fields_to_use) for item in data]
+
+    for r in binning.ranges:
+        range_dir = f"range_{r:02d}"
         range_path = os.path.join(base_dir, range_dir)
-        if not os.path.isdir(range_path):
-            continue
+        os.makedirs(range_path, exist_ok=True)
 
-        print(f"📂 Traitement du dossier : {range_dir}")
+        print(f"📂 Traitement de la résolution : {range_dir}")
 
         # Dictionnaire pour stocker les résultats de toutes les catégories de ce range
         range_results = {
@@ -72,20 +73,14 @@ def process_all_ranges(base_dir, fields_to_use):
             "categories": {}
         }
 
-        # Traiter chaque fichier de catégorie
-        for file in os.listdir(range_path):
-            if not file.startswith('categorie_') or not file.endswith('.json'):
-                continue
-
-            category_name = file[:-5]  # Enlever le '.json'
-            category_path = os.path.join(range_path, file)
-            print(f"  📄 Analyse de : {file}")
+        bins = binning.bins(r)
+        category_words = [set() for _ in range(r)]
+        for words, category_index in zip(words_by_item, bins):
+            category_words[category_index] |= words
 
-            # Traiter le fichier
-            words = process_category_file(category_path, fields_to_use)
-            
-            # Ajouter les résultats au dictionnaire
-            range_results["categories"][category_name] = {
+        for category_index, words in enumerate(category_words):
+            words = sorted(words)
+            range_results["categories"][category_name(category_index)] = {
                 "word_count": len(words),
                 "words": words
             }
@@ -98,17 +93,17 @@ def process_all_ranges(base_dir, fields_to_use):
             json.dump(range_results, f, ensure_ascii=False, indent=2)
 
         print(f"✅ Analyse terminée pour {range_dir} - Résultats sauvegardés dans {output_filename}")
+    binning.close()
 
 if __name__ == "__main__":
     # Configuration
-    base_dir = os.path.join("nature1", "nature1")
+    input_file = os.path.join("nature1", "nature1.json")
     fields_to_use = ["objet", "reference", "acheteur"]  # Ajustez selon vos besoins
 
-    # Vérifier si le dossier existe
-    if not os.path.exists(base_dir):
-        print(f"❌ Le dossier {base_dir} n'existe pas.")
+    # Vérifier si le fichier existe
+    if not os.path.exists(input_file):
+        print(f"❌ Le fichier {input_file} n'existe pas.")
     else:
-        print(f"🔍 Début de l'analyse pour : {base_dir}")
-        process_all_ranges(base_dir, fields_to_use)
+        print(f"🔍 Début de l'analyse pour : {input_file}")
+        process_all_ranges(input_file, fields_to_use)
         print("✨ Traitement terminé !")
-
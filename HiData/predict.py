@@ -1,24 +1,34 @@
 import json
-import spacy
-from unidecode import unidecode
 from pathlib import Path
 import statistics
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.keyword_index import KeywordIndex
+from common.lemmatizer import preprocess as lemmatize, preprocess_texts
+from common.range_binning import RangeBinning
+from common.token_store import Vocabulary
+
+# Découpage de categorize_with_diffrent_range.py, utilisé quand data_categories/<rang> n'a pas de resume_categories.json
+BINNING_FILE = Path("nature1") / "nature1" / "binning.npz"
+# Rangs évalués par le balayage (analyze_file_all_ranks)
+SWEEP_RANKS = list(range(3, 101))
 
-# Charger modèle spaCy
-nlp = spacy.load("fr_core_news_sm")
-stop_words = set(nlp.Defaults.stop_words)
 
 def preprocess(text):
-    text = unidecode(text.lower())
-    doc = nlp(text)
-    return set([
-        token.lemma_ for token in doc
-        if token.is_alpha and token.lemma_ not in stop_words
-    ])
-
-def load_price_stats(summary_path):
-    with open(summary_path, "r", encoding="utf-8") as f:
-        summary = json.load(f)
+    # Lemmes mis en cache d'un run à l'autre (common.lemmatizer)
+    return set(lemmatize(text))
+
+def load_price_stats(summary_path, rank=None):
+    if Path(summary_path).suffix == ".npz":
+        with RangeBinning(summary_path) as binning:
+            summary = binning.summary(int(rank))
+    else:
+        with open(summary_path, "r", encoding="utf-8") as f:
+            summary = json.load(f)
     price_stats = {}
     for cat, stats in summary.items():
         price_stats[cat] = {
@@ -44,70 +54,116 @@ def predict_with_similarity(text, category_words, multiple=False, tolerance=2):
         return [first, second]
     return [first]
 
-def analyze_file_with_rank(json_path, rank, use_multiple=False, tolerance=2):
-    print(f"\nAnalyse du fichier : {json_path.name} avec rang : {rank}")
-    with open(json_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+def load_rank(rank):
+    """Mots et statistiques de prix des catégories d'un rang.
 
+    data_categories/<rang> (processed_categories.json, resume_categories.json) s'il existe, sinon le
+    découpage de categorize_with_diffrent_range.py (binning.npz et range_XX/analysis_range_XX.json).
+    """
     rang = str(rank).zfill(2)
     category_dir = Path("data_categories") / rang
 
-    with open(category_dir / "processed_categories.json", "r", encoding="utf-8") as f:
-        category_words = json.load(f)
-    price_stats = load_price_stats(category_dir / "resume_categories.json")
-
-    results = []
-    errors = []
-    error_percentages = []
-
-    all_prices = [float(str(d['montant']).replace(',', '.')) for d in data]
-
+    words_path = category_dir / "processed_categories.json"
+    if words_path.exists():
+        with open(words_path, "r", encoding="utf-8") as f:
+            category_words = json.load(f)
+    else:
+        analysis_path = BINNING_FILE.parent / f"range_{rang}" / f"analysis_range_{rang}.json"
+        with open(analysis_path, "r", encoding="utf-8") as f:
+            category_words = {cat: values['words'] for cat, values in json.load(f)['categories'].items()}
+    summary_path = category_dir / "resume_categories.json"
+    if not summary_path.exists():
+        summary_path = BINNING_FILE
+    return category_dir, category_words, load_price_stats(summary_path, rank)
+
+def prepare_items(data, vocabulary):
+    """Prix réel et lemmes (en identifiants) de chaque élément, calculés une seule fois pour tous les rangs."""
+    items = []
     for i, item in enumerate(data, 1):
         try:
             real_price = float(str(item['montant']).replace(',', '.'))
             full_text = item.get('objet', '') + ' ' + item.get('description', '')
-            predictions = predict_with_similarity(full_text, category_words, use_multiple, tolerance)
+        except Exception as e:
+            print(f"Erreur avec l'élément {i}: {e}")
+            continue
+        items.append((item.get('id', f"elt_{i}"), real_price, full_text))
+
+    lemmas = preprocess_texts([text for _, _, text in items])
+    token_ids = [np.array(vocabulary.encode(set(words)), dtype=np.int32) for words in lemmas]
+    prices = np.array([price for _, price, _ in items], dtype=np.float64)
+    return [item_id for item_id, _, _ in items], prices, token_ids
+
+def evaluate_rank(prepared, category_words, price_stats, vocabulary, use_multiple=False, tolerance=2,
+                  with_details=True):
+    """Prédictions et statistiques d'erreur d'un rang pour des éléments préparés par prepare_items.
+
+    Les scores de toutes les catégories sont calculés en une fois (index inversé des mots) et le
+    nombre de prix dans l'intervalle prédit vient d'une recherche dichotomique dans les prix triés.
+    """
+    ids, prices, token_ids = prepared
+    categories = list(category_words)
+    index = KeywordIndex.build(category_words, vocabulary)
+    scores = index.scores(token_ids)
+    # Même ordre que sorted(..., reverse=True) : score décroissant, ordre des catégories en cas d'égalité
+    ranking = np.argsort(-scores, axis=1, kind="stable")[:, :2]
+
+    means = np.array([price_stats[cat]['mean'] for cat in categories], dtype=np.float64)
+    mins = np.array([price_stats[cat]['min'] for cat in categories], dtype=np.float64)
+    maxs = np.array([price_stats[cat]['max'] for cat in categories], dtype=np.float64)
+    sorted_prices = np.sort(prices)
+    counts_in_range = np.searchsorted(sorted_prices, maxs, side="right") - np.searchsorted(sorted_prices, mins, side="left")
+
+    first = ranking[:, 0]
+    errors = np.abs(prices - means[first])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        error_percentages = np.where(prices != 0, errors / prices * 100, 0.0)
 
+    results = []
+    if with_details:
+        for row, item_id in enumerate(ids):
+            predicted = [first[row]]
+            if use_multiple and len(categories) >= 2:
+                second = ranking[row, 1]
+                if abs(scores[row, first[row]] - scores[row, second]) <= tolerance:
+                    predicted.append(second)
             entry_result = {
-                'id': item.get('id', f"elt_{i}"),
-                'real_price': real_price,
+                'id': item_id,
+                'real_price': float(prices[row]),
                 'predictions': []
             }
-
-            for cat, score in predictions:
-                cat_stats = price_stats[cat]
-                diff = abs(real_price - cat_stats['mean'])
-                err_percent = (diff / real_price) * 100 if real_price else 0
-                count_in_range = sum(1 for p in all_prices if cat_stats['min'] <= p <= cat_stats['max'])
-
+            for cat_index in predicted:
+                diff = abs(prices[row] - means[cat_index])
                 entry_result['predictions'].append({
-                    'category': cat,
-                    'similarity_score': score,
-                    'predicted_avg_price': cat_stats['mean'],
-                    'min': cat_stats['min'],
-                    'max': cat_stats['max'],
-                    'price_difference': diff,
-                    'error_percentage': err_percent,
-                    'count_in_predicted_range': count_in_range
+                    'category': categories[cat_index],
+                    'similarity_score': int(scores[row, cat_index]),
+                    'predicted_avg_price': price_stats[categories[cat_index]]['mean'],
+                    'min': price_stats[categories[cat_index]]['min'],
+                    'max': price_stats[categories[cat_index]]['max'],
+                    'price_difference': float(diff),
+                    'error_percentage': float(diff / prices[row] * 100) if prices[row] else 0,
+                    'count_in_predicted_range': int(counts_in_range[cat_index])
                 })
-
-                if predictions.index((cat, score)) == 0:
-                    errors.append(diff)
-                    error_percentages.append(err_percent)
-
             results.append(entry_result)
 
-        except Exception as e:
-            print(f"Erreur avec l'élément {i}: {e}")
-            continue
-
+    errors, error_percentages = errors.tolist(), error_percentages.tolist()
     stats = {
-        'nb_total': len(results),
+        'nb_total': len(ids),
         'erreur_moyenne': statistics.mean(errors) if errors else 0,
         'erreur_mediane': statistics.median(errors) if errors else 0,
         'erreur_moyenne_%': statistics.mean(error_percentages) if error_percentages else 0,
         'erreur_mediane_%': statistics.median(error_percentages) if error_percentages else 0
     }
+    return results, stats
+
+def analyze_file_with_rank(json_path, rank, use_multiple=False, tolerance=2):
+    print(f"\nAnalyse du fichier : {json_path.name} avec rang : {rank}")
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    category_dir, category_words, price_stats = load_rank(rank)
+    vocabulary = Vocabulary()
+    results, stats = evaluate_rank(prepare_items(data, vocabulary), category_words, price_stats, vocabulary,
+                                   use_multiple, tolerance)
 
     final_report = {
         'statistiques_globales': stats,
@@ -115,6 +171,7 @@ def analyze_file_with_rank(json_path, rank, use_multiple=False, tolerance=2):
     }
 
     output_path = category_dir / f"rapport_prediction_{json_path.stem}.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
     with open(output_path, "w", encoding="utf-8") as f:
         json.dump(final_report, f, ensure_ascii=False, indent=2)
 
@@ -124,10 +181,51 @@ def analyze_file_with_rank(json_path, rank, use_multiple=False, tolerance=2):
 
     return final_report
 
+def analyze_file_all_ranks(json_path, ranks=SWEEP_RANKS, use_multiple=False, tolerance=2):
+    """Balayage de tous les rangs : chaque élément est prétraité une fois, un seul rapport combiné."""
+    print(f"\nBalayage du fichier : {json_path.name} pour les rangs {ranks[0]} à {ranks[-1]}")
+    started = time.perf_counter()
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    vocabulary = Vocabulary()
+    prepared = prepare_items(data, vocabulary)
+    by_rank = {}
+    for rank in ranks:
+        try:
+            _, category_words, price_stats = load_rank(rank)
+        except (OSError, KeyError) as e:
+            print(f"⏭️  Rang {rank} ignoré : {e}")
+            continue
+        _, stats = evaluate_rank(prepared, category_words, price_stats, vocabulary, use_multiple, tolerance,
+                                 with_details=False)
+        by_rank[str(rank).zfill(2)] = stats
+
+    if not by_rank:
+        print("❌ Aucun rang disponible.")
+        return None
+    best_rank = min(by_rank, key=lambda rang: by_rank[rang]['erreur_moyenne_%'])
+    report = {
+        'fichier': json_path.name,
+        'option_categories_proches': use_multiple,
+        'tolerance': tolerance,
+        'meilleur_rang': best_rank,
+        'statistiques_par_rang': by_rank
+    }
+    output_path = json_path.with_name(f"rapport_balayage_{json_path.stem}.json")
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    best = by_rank[best_rank]
+    print(f"\n✅ {len(by_rank)} rangs évalués en {time.perf_counter() - started:.1f}s → {output_path}")
+    print(f"   Meilleur rang : {best_rank} — erreur moyenne {best['erreur_moyenne']:.2f} MAD ({best['erreur_moyenne_%']:.2f}%), "
+          f"médiane {best['erreur_mediane']:.2f} MAD ({best['erreur_mediane_%']:.2f}%)")
+    return report
+
 # --- Lancement interactif ---
 if __name__ == "__main__":
     chemin_fichier = input("Chemin du fichier JSON à analyser (ex: data_cleaned/25.json) : ").strip()
-    rang = input("Rang de catégorisation (ex: 25) : ").strip()
+    rang = input("Rang de catégorisation (ex: 25, ou 'tous' pour évaluer les rangs 3 à 100) : ").strip()
     choix = input("Activer l’option de catégories proches ? (o/n) : ").strip().lower()
     use_multiple = choix == 'o'
     tolerance = 2
@@ -138,6 +236,9 @@ if __name__ == "__main__":
 
     json_path = Path(chemin_fichier)
     if json_path.exists():
-        analyze_file_with_rank(json_path, rang, use_multiple, tolerance)
+        if rang.lower() in ("tous", "all"):
+            analyze_file_all_ranks(json_path, SWEEP_RANKS, use_multiple, tolerance)
+        else:
+            analyze_file_with_rank(json_path, rang, use_multiple, tolerance)
     else:
         print(f"❌ Fichier introuvable : {chemin_fichier}")
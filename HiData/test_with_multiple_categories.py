@@ -1,19 +1,19 @@
 import json
-import spacy
-from unidecode import unidecode
 from pathlib import Path
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.lemmatizer import preprocess as lemmatize
+from common.range_binning import RangeBinning
+
+# Découpage produit par categorize_with_diffrent_range.py
+BINNING_FILE = "binning.npz"
 
-# Charger modèle spaCy français
-nlp = spacy.load("fr_core_news_sm")
-stop_words = set(nlp.Defaults.stop_words)
 
 def preprocess(text):
-    text = unidecode(text.lower())
-    doc = nlp(text)
-    return set([
-        token.lemma_ for token in doc
-        if token.is_alpha and token.lemma_ not in stop_words
-    ])
+    # Lemmes mis en cache d'un run à l'autre (common.lemmatizer)
+    return set(lemmatize(text))
 
 def predict_close_categories(text, categories_data, nb_categories=2):
     processed = preprocess(text)
@@ -36,9 +36,9 @@ def load_category_data(data_path):
     # Chargement des fichiers de catégories et du résumé
     categories_data = {}
     
-    # Charger le résumé pour obtenir les statistiques
-    with open(data_path / "resume.json", "r", encoding="utf-8") as f:
-        price_stats = json.load(f)
+    # Résumé de cette résolution, lu dans le fichier de découpage (categorize_with_diffrent_range.py)
+    with RangeBinning(data_path.parent / BINNING_FILE) as binning:
+        price_stats = binning.summary(int(range_number))
     
     # Charger l'analyse qui contient les mots par catégorie
     with open(data_path / f"analysis_range_{range_number}.json", "r", encoding="utf-8") as f:
@@ -1,10 +1,15 @@
 import json
-import re
-import unicodedata
 from pathlib import Path
 from collections import defaultdict
-from string import punctuation
 from nltk.corpus import stopwords
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common.cleaning import parse_montants
+from common.token_store import DEFAULT_VOCABULARY, Vocabulary, tokenize_file
+from common.keyword_index import load_index
+from common.consultation_store import DEFAULT_PATH as STORE_DEFAULT_PATH, ConsultationStore
 
 '''Ce script prend le json de la nouvelle data sans split par nature, chaque 
 enregistrement contient les champs suivants; reference, nature, montant, text 
@@ -15,30 +20,13 @@ NATURES_MAP_FILE = "natures.json"  # Mapping nature <-> id
 RESULTS_DIR = "resultats_par_nature"  # Dossier des fichiers de mots-clés par nature
 OUTPUT_RESULTS = "prediction_results.json"
 OUTPUT_STATS = "prediction_stats.json"
+# Base SQLite canonique (common.consultation_store) où les prédictions sont aussi enregistrées, None pour la désactiver
+STORE_PATH = STORE_DEFAULT_PATH
+STORE_MODEL = "keywords"
 
 STOPWORDS = set(stopwords.words('french'))
-
-def normalize_text(text):
-    text = text.lower()
-    text = unicodedata.normalize('NFD', text)
-    text = text.encode('ascii', 'ignore').decode('utf-8')
-    text = re.sub(rf"[{punctuation}]", " ", text)
-    text = re.sub(r"\d+", " ", text)
-    text = re.sub(r"\s+", " ", text)
-    return text.strip()
-
-def extract_keywords(text):
-    text = normalize_text(text)
-    return set(mot for mot in text.split() if mot not in STOPWORDS and len(mot) > 2)
-
-def parse_montant(montant_str):
-    if montant_str is None:
-        return None
-    montant_str = str(montant_str).replace("MAD", "").replace(",", ".").replace(" ", "").strip()
-    try:
-        return float(montant_str)
-    except Exception:
-        return None
+# Vocabulaire partagé des fichiers .tokens.npz écrits à côté des données (common.token_store)
+VOCABULARY_FILE = DEFAULT_VOCABULARY
 
 def interval_contains(interval_str, montant):
     try:
@@ -61,11 +49,30 @@ with open(DATA_FILE, "r", encoding="utf-8") as f:
 detailed_results = []
 stats_by_nature = defaultdict(lambda: {"total": 0, "correct": 0})
 
-for elt in data:
+# Texte tokenisé une seule fois (relu tant que DATA_FILE ne change pas)
+vocabulary = Vocabulary(VOCABULARY_FILE)
+tokenized = tokenize_file(DATA_FILE, vocabulary, STOPWORDS, "keywords")
+
+def nature_keywords_file(nature):
+    return Path(RESULTS_DIR) / f"{nature.replace(' ', '_').replace('/', '_')}.json"
+
+# Meilleur intervalle de chaque enregistrement : index inversé de la nature chargé une fois,
+# tous les enregistrements de la nature scorés en un seul appel
+rows_by_nature = defaultdict(list)
+for row, elt in enumerate(data):
+    rows_by_nature[elt.get("nature", "")].append(row)
+best_by_row = {}
+for nature, rows in rows_by_nature.items():
+    nature_file = nature_keywords_file(nature)
+    if not natures_map.get(nature, {}).get("id", None) or not nature_file.exists():
+        continue
+    index = load_index(nature_file, vocabulary)
+    best_by_row.update(zip(rows, index.best([tokenized[row] for row in rows])))
+
+montants = parse_montants(elt.get("montant", "") for elt in data)
+for row, (elt, montant) in enumerate(zip(data, montants)):
     reference = elt.get("reference", "")
     nature = elt.get("nature", "")
-    montant = parse_montant(elt.get("montant", ""))
-    text = elt.get("text", "")
 
     # Trouver l'id de la nature
     nature_id = natures_map.get(nature, {}).get("id", None)
@@ -73,24 +80,12 @@ for elt in data:
         print(f"Nature inconnue : {nature}")
         continue
 
-    # Charger les mots-clés par intervalle pour cette nature
-    nature_file = Path(RESULTS_DIR) / f"{nature.replace(' ', '_').replace('/', '_')}.json"
-    if not nature_file.exists():
+    # Mots-clés par intervalle pour cette nature
+    if not nature_keywords_file(nature).exists():
         print(f"Fichier de mots-clés introuvable pour la nature : {nature}")
         continue
 
-    with open(nature_file, "r", encoding="utf-8") as f:
-        intervals_keywords = json.load(f)
-
-    elt_keywords = extract_keywords(text)
-    best_interval = None
-    max_overlap = 0
-
-    for interval, keywords in intervals_keywords.items():
-        overlap = len(elt_keywords & set(keywords))
-        if overlap > max_overlap:
-            max_overlap = overlap
-            best_interval = interval
+    best_interval = best_by_row[row]
 
     # Vérifier si la prédiction est correcte
     correct = False
@@ -113,6 +108,9 @@ for elt in data:
 # Sauvegarder les résultats détaillés
 with open(OUTPUT_RESULTS, "w", encoding="utf-8") as f:
     json.dump(detailed_results, f, ensure_ascii=False, indent=2)
+if STORE_PATH:
+    with ConsultationStore(STORE_PATH) as store:
+        store.add_predictions(detailed_results, STORE_MODEL)
 
 # Statistiques globales
 stats = {
@@ -5,6 +5,11 @@ from collections import defaultdict
 from pathlib import Path
 from string import punctuation
 from nltk.corpus import stopwords
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common.cleaning import convert_montant as convertir_montant
 
 # === PARAMÈTRES ===
 FICHIER_INTERVALS = "C:/Users/pc/Desktop/NewData/data/intervals.json"
@@ -26,14 +31,6 @@ def normalize_text(text):
     return text.strip()
 
 
-def convertir_montant(montant_str):
-    montant_str = montant_str.replace("MAD", "").replace(",", ".").replace(" ", "").strip()
-    try:
-        return float(montant_str)
-    except ValueError:
-        return None
-
-
 def charger_intervalles(fichier):
     print(f"Chargement des intervalles depuis {fichier}...")
     with open(fichier, "r", encoding="utf-8") as f:
@@ -1,13 +1,17 @@
 import requests
 from bs4 import BeautifulSoup
-import time
 import random
 import os
-import json
+import sys
 import re
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from tqdm import tqdm
-from datetime import datetime, timedelta
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common.card_extractor import extract_cards
+from common.ndjson_sink import NdjsonSink, JsonArrayWriter, iter_ndjson
+from common.date_planner import date_window, discover_pages, run_plan
+from common.metrics import METRICS
+from common.consultation_store import DEFAULT_PATH as STORE_DEFAULT_PATH, ConsultationStore
 
 # --- Configuration ---
 MAX_WORKERS = 8
@@ -15,7 +19,7 @@ RETRIES = 10
 TIMEOUT = 50
 PAGE_SIZE = 50
 
-BASE_URL = "https://www.marchespublics.gov.ma"
+BASE_URL = os.environ.get("MARCHES_BASE_URL", "https://www.marchespublics.gov.ma")
 SEARCH_URL = BASE_URL + "/bdc/entreprise/consultation/resultat"
 
 FIXED_URL_PART_1 = (
@@ -37,6 +41,11 @@ FIXED_URL_PART_3 = (
 
 DAILY_DIR = "data_daily"
 os.makedirs(DAILY_DIR, exist_ok=True)
+# Rapport de fin de run (latences, statuts, octets, retries, temps réseau/parsing/attente par date) :
+# .json ou .prom (texte Prometheus), None pour désactiver
+METRICS_REPORT = os.path.join(DAILY_DIR, "metrics.json")
+# Base SQLite canonique des consultations (common.consultation_store), None pour la désactiver
+STORE_PATH = STORE_DEFAULT_PATH
 
 headers = {"User-Agent": "Mozilla/5.0"}
 session = requests.Session()
@@ -57,9 +66,10 @@ def get_max_page(date_str):
     url = f"{SEARCH_URL}?{query}"
     print(url)
     try:
-        res = session.get(url, timeout=TIMEOUT)
+        res = METRICS.get(session, url, date=date_str, timeout=TIMEOUT)
         res.raise_for_status()
-        soup = BeautifulSoup(res.text, 'lxml')
+        with METRICS.parsing(date=date_str):
+            soup = BeautifulSoup(res.text, 'lxml')
         div = soup.find('div', class_='content__resultat')
         if div:
             match = re.search(r'Nombre de résultats\s*:\s*(\d+)', div.get_text(strip=True))
@@ -71,48 +81,6 @@ def get_max_page(date_str):
         print(f"[get_max_page] Erreur: {e}")
     return 1, 0
 
-def extract_card_data(card):
-    try:
-        ref = card.select_one('.font-bold.table__links')
-        objet = card.select_one('[data-bs-toggle="tooltip"]')
-        buyer = card.find('span', string=lambda s: s and "Acheteur" in s)
-        pub_date = card.find('span', string=lambda s: s and "Date de publication" in s)
-
-        reference = ref.text.strip().replace('Référence :', '') if ref else None
-        obj = objet.text.strip().replace('Objet :', '') if objet else None
-        acheteur = buyer.parent.text.replace('Acheteur :', '').strip() if buyer else None
-        date_pub = pub_date.parent.text.replace('Date de publication du résultat :', '').strip() if pub_date else None
-
-        right = card.select_one('.entreprise__rightSubCard--top')
-        if right:
-            devis = right.find(string=lambda s: "Nombre de devis reçus" in s)
-            nombre_devis = right.select_one("span span.font-bold").text.strip() if devis else None
-
-            spans = right.find_all('span', recursive=False)
-            attribue = False
-            entreprise = montant = None
-
-            if len(spans) >= 3:
-                entreprise = spans[1].find('span', class_='font-bold')
-                montant = spans[2].find('span', class_='font-bold')
-                entreprise = entreprise.text.strip() if entreprise else None
-                montant = montant.text.strip() if montant else None
-                attribue = entreprise is not None
-
-            return {
-                "reference": reference,
-                "objet": obj,
-                "acheteur": acheteur,
-                "date_publication": date_pub,
-                "nombre_devis": nombre_devis,
-                "attribue": attribue,
-                "entreprise_attributaire": entreprise if attribue else None,
-                "montant": montant if attribue else None
-            }
-    except Exception as e:
-        print(f"[extract_card_data] Erreur: {e}")
-    return None
-
 def fetch_page(page, date_str):
     date_obj = datetime.strptime(date_str, "%d/%m/%Y")
     date_formattee = date_obj.strftime("%Y-%m-%d")
@@ -127,55 +95,69 @@ def fetch_page(page, date_str):
     )
     url = f"{SEARCH_URL}?{query}"
     for attempt in range(RETRIES):
+        if attempt:
+            METRICS.observe_retry(date=date_str)
         try:
-            time.sleep(random.uniform(0.25, 0.35))
-            res = session.get(url, timeout=TIMEOUT)
+            METRICS.sleep(random.uniform(0.25, 0.35), date=date_str)
+            res = METRICS.get(session, url, date=date_str, timeout=TIMEOUT)
             res.raise_for_status()
-            soup = BeautifulSoup(res.text, 'lxml')
-            cards = soup.select('.entreprise__card')
-            return [extract_card_data(card) for card in cards if card]
+            with METRICS.parsing(date=date_str):
+                return extract_cards(res.text)
         except requests.RequestException as e:
             print(f"[fetch_page] Tentative {attempt+1}/{RETRIES} - Erreur page {page}: {e}")
-            time.sleep(0.3)
+            METRICS.sleep(0.3, date=date_str)
     return []
 
-def save_results(data, date_str):
-    attribues = [d for d in data if d and d['attribue']]
-    if not attribues:
-        print(f"❌ Aucune donnée attribuée trouvée pour {date_str}")
-        return
+def stream_path(date_str):
+    file_date = datetime.strptime(date_str, "%d/%m/%Y").strftime("%Y-%m-%d")
+    return os.path.join(DAILY_DIR, f"attributed_{file_date}.ndjson")
+
+def save_results(date_str):
     date_obj = datetime.strptime(date_str, "%d/%m/%Y")
     file_date = date_obj.strftime("%Y-%m-%d")
     raw_path = os.path.join(DAILY_DIR, f"attributed_{file_date}.json")
-    with open(raw_path, 'w', encoding='utf-8') as f:
-        json.dump(attribues, f, ensure_ascii=False, indent=2)
-    print(f"✅ {len(attribues)} consultations attribuées sauvegardées dans {raw_path}")
+    with JsonArrayWriter(raw_path, keep_empty=False) as writer:
+        writer.write_many(iter_ndjson(stream_path(date_str)))
+    if STORE_PATH and writer.count:
+        with ConsultationStore(STORE_PATH) as store:
+            store.upsert_awards(iter_ndjson(stream_path(date_str)))
+    os.remove(stream_path(date_str))
+    if not writer.count:
+        print(f"❌ Aucune donnée attribuée trouvée pour {date_str}")
+        return
+    print(f"✅ {writer.count} consultations attribuées sauvegardées dans {raw_path}")
     
-def scrape_day(date_str):
-    max_pages, total_results = get_max_page(date_str)
-    print(f"🔍 {total_results} résultats trouvés sur {max_pages} pages.")
-    all_data = []
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        futures = {
-            executor.submit(fetch_page, page, date_str): page
-            for page in range(1, max_pages + 1)
-        }
-        for future in tqdm(as_completed(futures), total=len(futures), desc="📄 Pages"):
-            result = future.result()
-            if result:
-                all_data.extend(result)
-    print(f'📊 Total des données extraites : {len(all_data)}')
-    save_results(all_data, date_str)
-
 def loop_days(start_date_str, end_date_str):
-    start_date = datetime.strptime(start_date_str, "%d/%m/%Y")
-    end_date = datetime.strptime(end_date_str, "%d/%m/%Y")
-    current_date = start_date
-    while current_date <= end_date:
-        date_str = current_date.strftime('%d/%m/%Y')
-        print(f"\n📅 Scraping pour la date : {date_str}")
-        scrape_day(date_str)
-        current_date += timedelta(days=1)
+    dates = date_window(start_date_str, end_date_str)
+    print(f"\n📅 Scraping du {dates[0]} au {dates[-1]} ({len(dates)} jours)")
+    # Nombre de pages de toutes les dates découvert en parallèle, puis un seul pool pour toutes les pages
+    plan = discover_pages(dates, get_max_page, MAX_WORKERS)
+    for date_str, (max_pages, total_results) in plan.items():
+        print(f"🔍 {date_str} : {total_results} résultats trouvés sur {max_pages} pages.")
+
+    sinks, totals = {}, {}
+    for date_str in dates:
+        if os.path.exists(stream_path(date_str)):
+            os.remove(stream_path(date_str))
+        sinks[date_str] = NdjsonSink(stream_path(date_str))
+        totals[date_str] = 0
+
+    def on_records(date_str, result):
+        totals[date_str] += len(result)
+        sinks[date_str].write_many(d for d in result if d and d['attribue'])
+
+    def on_date_done(date_str):
+        sinks.pop(date_str).close()
+        print(f'\n📊 Total des données extraites pour {date_str} : {totals[date_str]}')
+        save_results(date_str)
+
+    run_plan(plan, fetch_page, on_records, on_date_done, MAX_WORKERS)
+    print(f"📈 {METRICS.summary()}")
+    if METRICS_REPORT:
+        METRICS.dump(METRICS_REPORT)
+
+def scrape_day(date_str):
+    loop_days(date_str, date_str)
 
 if __name__ == "__main__":
     loop_days("07/07/2025", "28/07/2025")
@@ -1,41 +1,17 @@
-import json
 import os
+import sys
 
-# Charger les données
-with open("merged.jsonl", "r", encoding="utf-8") as f:
-    data = [json.loads(line) for line in f]
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common.nature_partitioner import NaturePartitioner
 
-# Dictionnaire pour regrouper par nature
-nature_dict = {}
-nature_id_map = {}
-current_id = 1
+# --- Configuration ---
+INPUT_FILE = "merged.jsonl"
+OUTPUT_DIR = "../data/natures_new"  # data_nature_{id}.jsonl et natures.json (registre des identifiants)
 
-# Regrouper les éléments par nature
-for item in data:
-    nature = item.get("nature", "").strip()
-    
-    if not nature:
-        continue  # Ignore les éléments sans nature
-    
-    if nature not in nature_dict:
-        nature_dict[nature] = []
-        nature_id_map[nature] = {"id": current_id, "count": 0}
-        current_id += 1
-    
-    nature_dict[nature].append(item)
-    nature_id_map[nature]["count"] += 1
+# Seules les lignes ajoutées à merged.jsonl depuis le dernier passage sont découpées
+partitioner = NaturePartitioner(OUTPUT_DIR)
+added = partitioner.split(INPUT_FILE)
 
-# Sauvegarder chaque groupe dans un fichier séparé
-for nature, items in nature_dict.items():
-    file_id = nature_id_map[nature]["id"]
-    filename = f"../data/natures_new/data_nature_{file_id}.jsonl"
-    
-    with open(filename, "w", encoding="utf-8") as f:
-        for item in items:
-            f.write(json.dumps(item, ensure_ascii=False) + "\n")
-
-# Sauvegarder le mapping des natures
-with open("../data/natures_new/natures.json", "w", encoding="utf-8") as f:
-    json.dump(nature_id_map, f, ensure_ascii=False, indent=2)
-
-print(f"{len(nature_dict)} fichiers créés (un par nature). Détails dans natures.json")
+for nature, count in sorted(added.items(), key=lambda kv: partitioner.registry[kv[0]]["id"]):
+    print(f"➕ data_nature_{partitioner.registry[nature]['id']}.jsonl : {count} nouveaux enregistrements ({nature})")
+print(f"{len(partitioner.registry)} natures ({len(added)} fichiers complétés). Détails dans natures.json")
@@ -1,11 +1,19 @@
 import json
 import re
 import os
-import spacy
 from unidecode import unidecode
+import sys
 
-# Charger le modèle spaCy pour le français
-nlp = spacy.load("fr_core_news_sm")
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common.cleaning import parse_montants
+from common.lemmatizer import DEFAULT_PROCESSES, lemmatize_texts, load_nlp
+
+# Lemmatisation par lots (nlp.pipe) : taille des lots et nombre de processus
+BATCH_SIZE = 512
+N_PROCESS = DEFAULT_PROCESSES
+
+# Charger le modèle spaCy pour le français (sans parser ni NER)
+nlp = load_nlp("fr_core_news_sm")
 stop_words = set(nlp.Defaults.stop_words)
 
 # 🔍 Fonction de nettoyage et lemmatisation améliorée
@@ -16,7 +24,7 @@ def normalize_text(text):
     text = unidecode(text)
     return text
 
-def clean_and_lemmatize(text):
+def clean_text(text):
     # Supprimer les caractères spéciaux \r, \n, \t
     text = text.replace("\r", " ").replace("\n", " ").replace("\t", " ")
 
@@ -28,23 +36,12 @@ def clean_and_lemmatize(text):
     text = text.replace("/", " ").replace("-", " ")
 
     # Normaliser le texte (minuscule + suppression accents)
-    text = normalize_text(text)
-
-    # Traitement NLP avec spaCy
-    doc = nlp(text)
-    racines = [
-        token.lemma_ for token in doc
-        if token.lemma_ not in stop_words and token.is_alpha and len(token.lemma_) > 1
-    ]
-    return racines
-
-# 💰 Fonction pour convertir un montant texte en float
-def parse_montant(montant_str):
-    montant_str = montant_str.replace("MAD", "").replace(",", ".").replace(" ", "")
-    try:
-        return float(montant_str)
-    except ValueError:
-        return None
+    return normalize_text(text)
+
+def clean_and_lemmatize(texts):
+    """Racines de chaque texte : nettoyage puis lemmatisation spaCy par lots."""
+    return lemmatize_texts((clean_text(text) for text in texts), nlp, stop_words,
+                           batch_size=BATCH_SIZE, n_process=N_PROCESS)
 
 # 🔢 Charger les intervalles depuis intervals.json
 with open("../data/intervals.json", "r", encoding="utf-8") as f:
@@ -68,45 +65,55 @@ def find_interval(montant):
 # 🔁 Nouveau chemin absolu du dossier contenant les fichiers
 data_dir = "C:/Users/pc/Desktop/NewData/data/natures"
 output_dir = "C:/Users/pc/Desktop/NewData/data/lemmes_par_nature"
-os.makedirs(output_dir, exist_ok=True)
 
-# 🔀 Parcours des fichiers dans le bon dossier
-for file in os.listdir(data_dir):
-    if file.startswith("data_nature_") and file.endswith(".jsonl"):
-        full_path = os.path.join(data_dir, file)
+def main():
+    os.makedirs(output_dir, exist_ok=True)
+
+    # 🔀 Parcours des fichiers dans le bon dossier
+    for file in os.listdir(data_dir):
+        if file.startswith("data_nature_") and file.endswith(".jsonl"):
+            full_path = os.path.join(data_dir, file)
+
+            with open(full_path, "r", encoding="utf-8") as f:
+                data = [json.loads(line) for line in f if line.strip()]
+                print(f"📂 {file} : {len(data)} lignes chargées")
+
+            interval_texts = {}
 
-        with open(full_path, "r", encoding="utf-8") as f:
-            data = [json.loads(line) for line in f if line.strip()]
-            print(f"📂 {file} : {len(data)} lignes chargées")
+            montants = parse_montants(item.get("montant", "") for item in data)
+            for item, montant in zip(data, montants):
+                if montant is None:
+                    continue
 
-        interval_texts = {}
+                interval = find_interval(montant)
+                if not interval:
+                    continue
 
-        for item in data:
-            montant = parse_montant(item.get("montant", ""))
-            if montant is None:
-                continue
+                text = item.get("text", "")
+                interval_texts.setdefault(interval, []).append(text)
 
-            interval = find_interval(montant)
-            if not interval:
-                continue
+            # Tous les textes de la nature lemmatisés en une passe
+            all_texts = [text for texts in interval_texts.values() for text in texts]
+            lemmas_by_text = iter(clean_and_lemmatize(all_texts))
 
-            text = item.get("text", "")
-            interval_texts.setdefault(interval, []).append(text)
+            interval_lemmas = {}
+            for interval, texts in interval_texts.items():
+                lemmas = set()
+                for _ in texts:
+                    lemmas.update(next(lemmas_by_text))
 
-        interval_lemmas = {}
-        for interval, texts in interval_texts.items():
-            full_text = " ".join(texts)
-            lemmas = clean_and_lemmatize(full_text)
+                if lemmas:
+                    key = f"{interval[0]}-{interval[1]}"
+                    interval_lemmas[key] = sorted(lemmas)
 
-            if lemmas:
-                key = f"{interval[0]}-{interval[1]}"
-                interval_lemmas[key] = sorted(list(set(lemmas)))
+            if interval_lemmas:
+                out_file = os.path.join(output_dir, file.replace(".jsonl", "_lemmes.json"))
+                with open(out_file, "w", encoding="utf-8") as f:
+                    json.dump(interval_lemmas, f, ensure_ascii=False, indent=2)
 
-        if interval_lemmas:
-            out_file = os.path.join(output_dir, file.replace(".jsonl", "_lemmes.json"))
-            with open(out_file, "w", encoding="utf-8") as f:
-                json.dump(interval_lemmas, f, ensure_ascii=False, indent=2)
+                print(f"✅ {file} → {len(interval_lemmas)} intervalles sauvegardés")
+            else:
+                print(f"⚠️ {file} → aucun mot lemmatisé")
 
-            print(f"✅ {file} → {len(interval_lemmas)} intervalles sauvegardés")
-        else:
-            print(f"⚠️ {file} → aucun mot lemmatisé")
+if __name__ == "__main__":
+    main()
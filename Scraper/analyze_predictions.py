@@ -1,13 +1,13 @@
 import json
-import spacy
-from unidecode import unidecode
 import statistics
 from pathlib import Path
 import numpy as np
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.lemmatizer import preprocess as lemmatize
 
-# Charger le modèle spaCy français
-nlp = spacy.load("fr_core_news_sm")
-stop_words = set(nlp.Defaults.stop_words)
 
 def load_price_margins_json(summary_json_path):
     # Charger les marges de prix depuis le fichier de résumé JSON
@@ -24,12 +24,8 @@ def load_price_margins_json(summary_json_path):
     return price_stats
 
 def preprocess(text):
-    text = unidecode(text.lower())
-    doc = nlp(text)
-    return set([
-        token.lemma_ for token in doc
-        if token.is_alpha and token.lemma_ not in stop_words
-    ])
+    # Lemmes mis en cache d'un run à l'autre (common.lemmatizer)
+    return set(lemmatize(text))
 
 def predict_category(text, category_words):
     processed = preprocess(text)
@@ -1,14 +1,9 @@
 import json
 import os
+import sys
 
-def clean_amount(montant_str):
-    if not montant_str:
-        return None
-    montant_str = montant_str.replace("MAD", "").replace(" ", "").replace(",", ".")
-    try:
-        return float(montant_str)
-    except ValueError:
-        return None
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.cleaning import parse_montants
 
 
 def process_large_files():
@@ -28,20 +23,18 @@ def process_large_files():
             if not isinstance(data, list) or len(data) <= 900:
                 continue
 
-            cleaned = []
-            for item in data:
-                if all(k in item for k in ['montant', 'objet', 'acheteur', 'reference']):
-                    montant = clean_amount(item['montant'])
-                    objet = item['objet']
-                    acheteur = item['acheteur']
-                    reference = item['reference']
-
-                    cleaned.append({
-                        "montant": montant,
-                        "objet": objet,
-                        "acheteur": acheteur,
-                        "reference": reference
-                    })
+            items = [item for item in data if all(k in item for k in ['montant', 'objet', 'acheteur', 'reference'])]
+            # Conversion de tous les montants du fichier en une passe (common.cleaning)
+            montants = parse_montants(item['montant'] for item in items)
+            cleaned = [
+                {
+                    "montant": montant,
+                    "objet": item['objet'],
+                    "acheteur": item['acheteur'],
+                    "reference": item['reference']
+                }
+                for item, montant in zip(items, montants)
+            ]
 
             # Sauvegarde du fichier nettoyé
             output_path = os.path.join(output_dir, filename)
@@ -1,4 +1,5 @@
 import os
+import sys
 import json
 import time
 import random
@@ -8,6 +9,9 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 from datetime import datetime
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.card_extractor import extract_cards
+
 # --- Configuration ---
 MAX_WORKERS = 8
 MAX_NATURE_WORKERS = 4
@@ -15,7 +19,7 @@ RETRIES = 3
 TIMEOUT = 50
 PAGES_TO_FETCH = 10
 
-BASE_URL = "https://www.marchespublics.gov.ma"
+BASE_URL = os.environ.get("MARCHES_BASE_URL", "https://www.marchespublics.gov.ma")
 SEARCH_URL = f"{BASE_URL}/bdc/entreprise/consultation/resultat"
 
 FIXED_URL_PART_1 = (
@@ -59,64 +63,12 @@ def fetch_page(nature_id, page):
             time.sleep(random.uniform(0.25, 0.35))
             res = session.get(url, timeout=TIMEOUT)
             if res.status_code == 200:
-                soup = BeautifulSoup(res.text, 'lxml')
-                cards = soup.select('.entreprise__card')
-                return [extract_card_data(card) for card in cards if card]
+                return extract_cards(res.text)
         except Exception as e:
             time.sleep(0.3)
     return []
 
 
-def extract_card_data(card):
-    """Extrait les données d'une carte de résultat."""
-    try:
-        ref = card.select_one('.font-bold.table__links')
-        ref_text = ref.text.strip().replace('Référence :', '').strip() if ref else None
-
-        objet_div = card.select_one('[data-bs-toggle="tooltip"]')
-        objet_text = objet_div.text.strip().replace('Objet :', '').strip() if objet_div else None
-
-        acheteur_span = card.find('span', string=lambda s: s and "Acheteur" in s)
-        acheteur = acheteur_span.parent.text.replace('Acheteur :', '').strip() if acheteur_span else None
-
-        date_span = card.find('span', string=lambda s: s and "Date de publication" in s)
-        date_pub = date_span.parent.text.replace('Date de publication du résultat :', '').strip() if date_span else None
-
-        right_card = card.select_one('.entreprise__rightSubCard--top')
-        nombre_devis = entreprise_attributaire = montant_ttc = None
-        attribue = False
-
-        if right_card:
-            devis_match = right_card.find(string=lambda s: s and "Nombre de devis reçus" in s)
-            if devis_match:
-                devis_span = right_card.select_one("span span.font-bold")
-                nombre_devis = devis_span.text.strip() if devis_span else None
-
-            spans = right_card.find_all('span', recursive=False)
-            def get_bold(span):
-                bold = span.find('span', class_='font-bold')
-                return bold.text.strip() if bold else None
-
-            if len(spans) >= 3:
-                entreprise_attributaire = get_bold(spans[1])
-                montant_ttc = get_bold(spans[2])
-                attribue = entreprise_attributaire is not None
-
-        return {
-            "reference": ref_text,
-            "objet": objet_text,
-            "acheteur": acheteur,
-            "date_publication": date_pub,
-            "nombre_devis": nombre_devis,
-            "attribue": attribue,
-            "entreprise_attributaire": entreprise_attributaire if attribue else None,
-            "montant": montant_ttc if attribue else None
-        }
-    except Exception as e:
-        print(f"[Erreur carte] {e}")
-        return None
-
-
 def is_today(date_str):
     """Vérifie si la date donnée est aujourd'hui (heure ignorée)."""
     try:
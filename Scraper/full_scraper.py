@@ -1,68 +1,63 @@
 import requests
-from bs4 import BeautifulSoup
-import time
 import random
 import os
 import json
-import re
+import sys
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.marches import HEADERS, SEARCH_URL, search_url, parse_natures, parse_max_pages, parse_cards
+from common.nature_crawler import crawl_natures
+from common.checkpoints import CheckpointStore
+from common.http_cache import CachedSession, CacheMiss
+from common.ndjson_sink import NdjsonSink, JsonArrayWriter, iter_ndjson
+from common.metrics import METRICS
+
 # --- Configuration ---
 MAX_WORKERS = 8
 MAX_NATURE_WORKERS = 4
 RETRIES = 5
 TIMEOUT = 80
-PAGE_SIZE = 50
-
-BASE_URL = "https://www.marchespublics.gov.ma"
-SEARCH_URL = BASE_URL + "/bdc/entreprise/consultation/resultat"
-
-FIXED_URL_PART_1 = (
-    "search_consultation_resultats%5Bkeyword%5D="
-    "&search_consultation_resultats%5Breference%5D="
-    "&search_consultation_resultats%5Bobjet%5D="
-    "&search_consultation_resultats%5BdateLimitePublicationStart%5D="
-    "&search_consultation_resultats%5BdateLimitePublicationEnd%5D="
-    "&search_consultation_resultats%5BdateMiseEnLigneStart%5D="
-    "&search_consultation_resultats%5BdateMiseEnLigneEnd%5D="
-    "&search_consultation_resultats%5Bcategorie%5D="
-)
-FIXED_URL_PART_2 = (
-    "&search_consultation_resultats%5Bacheteur%5D="
-    "&search_consultation_resultats%5Bservice%5D="
-    "&search_consultation_resultats%5BlieuExecution%5D="
-    f"&search_consultation_resultats%5BpageSize%5D={PAGE_SIZE}"
-)
-
-headers = {"User-Agent": "Mozilla/5.0"}
-session = requests.Session()
-session.headers.update(headers)
+
+# Mode de crawl : "full" (toutes les pages, fichiers réécrits) ou "incremental"
+# (seulement les pages plus récentes que le filigrane de la nature, fusionnées avec l'existant)
+CRAWL_MODE = "full"
+
+# Mode de récupération : "threads" (pools imbriqués + sleep par requête) ou
+# "async" (une seule boucle asyncio pour toutes les natures et pages)
+FETCH_MODE = "threads"
+# Mode async : requêtes en vol et débit global (même plafond que 4 × 8 threads espacés de 0.3 s)
+ASYNC_CONCURRENCY = MAX_NATURE_WORKERS * MAX_WORKERS
+ASYNC_RATE = ASYNC_CONCURRENCY / 0.3
+ASYNC_BURST = MAX_WORKERS
+
+# Cache HTTP : "off", "cache", "refresh" ou "replay" (rejeu hors ligne, voir common.http_cache)
+CACHE_DIR = "http_cache"
+CACHE_MODE = "off"
+CACHE_TTL = None  # secondes, None : sans expiration
+
+session = CachedSession(CACHE_DIR, CACHE_MODE, CACHE_TTL)
+session.headers.update(HEADERS)
 
 DATA_DIR = "data"
 os.makedirs(DATA_DIR, exist_ok=True)
 
-def get_max_page_for_nature(nature_id):
-    query = (
-        f"{FIXED_URL_PART_1}"
-        f"&search_consultation_resultats%5BnaturePrestation%5D={nature_id}"
-        f"{FIXED_URL_PART_2}"
-    )
-    url = f"{SEARCH_URL}?{query}"
+# Filigranes par nature et pages terminées des crawls interrompus
+CHECKPOINT_DIR = os.path.join(DATA_DIR, "checkpoints")
+checkpoints = CheckpointStore(CHECKPOINT_DIR)
+# Infructueuses par nature, écrites au fil de l'eau avant d'être regroupées dans infructueux.json
+STREAM_DIR = os.path.join(DATA_DIR, "stream")
+# Rapport de fin de run (latences, statuts, octets, retries, temps réseau/parsing/attente par nature) :
+# .json ou .prom (texte Prometheus), None pour désactiver
+METRICS_REPORT = os.path.join(DATA_DIR, "metrics.json")
 
+def get_max_page_for_nature(nature_id):
     try:
-        res = session.get(url, timeout=TIMEOUT)
+        res = METRICS.get(session, search_url(nature_id=nature_id), nature=nature_id, timeout=TIMEOUT)
         res.raise_for_status()
-        soup = BeautifulSoup(res.text, 'lxml')
-
-        div_result = soup.find('div', class_='content__resultat')
-        if div_result:
-            text = div_result.get_text(strip=True)
-            match = re.search(r'Nombre de résultats\s*:\s*(\d+)', text)
-            if match:
-                total_results = int(match.group(1))
-                max_pages = (total_results + PAGE_SIZE - 1) // PAGE_SIZE
-                return max_pages, total_results
+        with METRICS.parsing(nature=nature_id):
+            return parse_max_pages(res.text)
     except Exception as e:
         print(f"[get_max_page_for_nature] Erreur: {e}")
 
@@ -71,106 +66,77 @@ def get_max_page_for_nature(nature_id):
 
 def get_natures():
     try:
-        res = session.get(SEARCH_URL, timeout=TIMEOUT)
+        res = METRICS.get(session, SEARCH_URL, timeout=TIMEOUT)
         res.raise_for_status()
-        soup = BeautifulSoup(res.text, 'lxml')
-        options = soup.select('#search_consultation_resultats_naturePrestation option')
-        return {int(opt['value']): opt.text.strip() for opt in options if opt['value'].isdigit()}
+        return parse_natures(res.text)
     except Exception as e:
         print(f"[get_natures] Erreur: {e}")
         return {}
 
 
-def extract_card_data(card):
-    try:
-        ref_element = card.select_one('.font-bold.table__links')
-        reference = ref_element.text.strip().replace('Référence :', '').strip() if ref_element else None
-
-        object_element = card.select_one('[data-bs-toggle="tooltip"]')
-        obj = object_element.text.strip().replace('Objet :', '').strip() if object_element else None
-
-        buyer_span = card.find('span', string=lambda s: s and "Acheteur" in s)
-        buyer = buyer_span.parent.text.replace('Acheteur :', '').strip() if buyer_span else None
-
-        date_span = card.find('span', string=lambda s: s and "Date de publication" in s)
-        publication_date = date_span.parent.text.replace('Date de publication du résultat :', '').strip() if date_span else None
-
-        number_of_quotes = None
-        awarded = False
-        awarded_company = None
-        amount_ttc = None
-
-        right_card = card.select_one('.entreprise__rightSubCard--top')
-        if right_card:
-            quotes_match = right_card.find(string=lambda s: s and "Nombre de devis reçus" in s)
-            if quotes_match:
-                quotes_span = right_card.select_one("span span.font-bold")
-                if quotes_span:
-                    number_of_quotes = quotes_span.text.strip()
-
-            spans = right_card.find_all('span', recursive=False)
-
-            def get_bold_text(span):
-                b = span.find('span', class_='font-bold')
-                return b.text.strip() if b else None
-
-            if len(spans) >= 3:
-                awarded_company = get_bold_text(spans[1])
-                amount_ttc = get_bold_text(spans[2])
-                awarded = awarded_company is not None
-
-        return {
-            "reference": reference,
-            "objet": obj,
-            "acheteur": buyer,
-            "date_publication": publication_date,
-            "nombre_devis": number_of_quotes,
-            "attribue": awarded,
-            "entreprise_attributaire": awarded_company if awarded else None,
-            "montant": amount_ttc if awarded else None
-        }
-    except Exception as e:
-        print(f"[extract_card_data] Erreur extraction carte: {e}")
-        return None
-
-
 def fetch_nature_page(nature_id, page):
-    query = (
-        f"{FIXED_URL_PART_1}"
-        f"&search_consultation_resultats%5BnaturePrestation%5D={nature_id}"
-        f"{FIXED_URL_PART_2}"
-        f"&page={page}"
-    )
-    url = f"{SEARCH_URL}?{query}"
+    url = search_url(nature_id=nature_id, page=page)
 
     for attempt in range(RETRIES):
+        if attempt:
+            METRICS.observe_retry(nature=nature_id)
         try:
-            time.sleep(random.uniform(0.25, 0.35))
-            res = session.get(url, timeout=TIMEOUT)
+            METRICS.sleep(random.uniform(0.25, 0.35), nature=nature_id)
+            res = METRICS.get(session, url, nature=nature_id, timeout=TIMEOUT)
             res.raise_for_status()
 
-            soup = BeautifulSoup(res.text, 'lxml')
-            cards = soup.select('.entreprise__card')
-            return [extract_card_data(card) for card in cards if card]
+            with METRICS.parsing(nature=nature_id):
+                return parse_cards(res.text)
+        except CacheMiss:
+            return None
         except requests.RequestException as e:
             print(f"[fetch_nature_page] Tentative {attempt+1}/{RETRIES} Nature {nature_id} Page {page} erreur: {e}")
-            time.sleep(0.3)
-    return []
+            METRICS.sleep(0.3, nature=nature_id)
+    return None
 
 
-def save_json_per_nature(nature_name, data):
+def merge_with_existing(filepath, data):
+    """Place les nouveaux enregistrements devant ceux du fichier existant (dédoublonnés par référence)."""
+    if not os.path.exists(filepath):
+        return data
+    with open(filepath, 'r', encoding='utf-8') as f:
+        existing = json.load(f)
+    new_refs = {d["reference"] for d in data}
+    return data + [d for d in existing if d["reference"] not in new_refs]
+
+
+def nature_filepath(nature_name):
     safe_name = nature_name.lower().replace(' ', '_').replace('/', '_').replace('-', '_')
-    filepath = os.path.join(DATA_DIR, f"{safe_name}.json")
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    print(f"[save_json_per_nature] Sauvegardé {len(data)} consultations attribuées pour '{nature_name}'")
+    return os.path.join(DATA_DIR, f"{safe_name}.json")
 
 
-def save_infructuous_consultations(data):
+def infructuous_stream_path(nid):
+    return os.path.join(STREAM_DIR, f"infructueux_nature_{nid}.ndjson")
+
+
+def save_json_per_nature(nature_name, data):
+    """Écrit les consultations attribuées au fil de l'eau (fusionnées avec l'existant en mode incrémental)."""
+    filepath = nature_filepath(nature_name)
+    if CRAWL_MODE == "incremental":
+        data = merge_with_existing(filepath, list(data))
+    with JsonArrayWriter(filepath, keep_empty=False) as writer:
+        writer.write_many(data)
+    if writer.count:
+        print(f"[save_json_per_nature] Sauvegardé {writer.count} consultations attribuées pour '{nature_name}'")
+
+
+def save_infructuous_consultations(nature_ids):
+    """Construit infructueux.json à partir des flux NDJSON de chaque nature."""
     filepath = os.path.join(DATA_DIR, "infructueux.json")
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    print(f"[save_infructuous_consultations] Sauvegardé {len(data)} consultations infructueuses")
+    data = (d for nid in nature_ids for d in iter_ndjson(infructuous_stream_path(nid)))
+    if CRAWL_MODE == "incremental":
+        data = merge_with_existing(filepath, list(data))
+    with JsonArrayWriter(filepath) as writer:
+        writer.write_many(data)
+    for nid in nature_ids:
+        if os.path.exists(infructuous_stream_path(nid)):
+            os.remove(infructuous_stream_path(nid))
+    print(f"[save_infructuous_consultations] Sauvegardé {writer.count} consultations infructueuses")
 
 
 def get_max_pages_all_natures():
@@ -188,39 +154,125 @@ def get_max_pages_all_natures():
     return info
 
 
-def process_nature_using_global_info(nid, nature_pages_info):
-    nature_name = nature_pages_info[nid]["name"]
-    max_pages = nature_pages_info[nid]["max_pages"]
+def split_and_save_nature(nid, nature_name, records):
+    """Répartit le flux d'une nature : attribuées dans son fichier JSON, infructueuses dans son flux NDJSON."""
+    stream_path = infructuous_stream_path(nid)
+    if os.path.exists(stream_path):
+        os.remove(stream_path)
+
+    with NdjsonSink(stream_path) as infructuous:
+        def attributed():
+            for d in records:
+                if d and d['attribue']:
+                    yield d
+                elif d:
+                    infructuous.write(d)
+
+        save_json_per_nature(nature_name, attributed())
 
-    print(f"[process_nature_using_global_info] Traitement nature: {nature_name} (ID {nid}), {max_pages} pages")
 
-    all_data = []
+def crawl_all_pages(nid, nature_name, max_pages, done_pages):
+    """Récupère les pages pas encore terminées ; chaque page finie est ajoutée au flux de la nature."""
+    todo = [page for page in range(1, max_pages + 1) if page not in done_pages]
     with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
         futures = {
             executor.submit(fetch_nature_page, nid, page): page
-            for page in range(1, max_pages + 1)
+            for page in todo
         }
         for future in tqdm(as_completed(futures), total=len(futures), desc=f"Pages {nature_name}"):
             result = future.result()
-            if result:
-                all_data.extend(result)
+            if result is not None:
+                checkpoints.mark_page_done(nid, futures[future], result)
 
-    attributed = [d for d in all_data if d and d['attribue']]
-    infructuous = [d for d in all_data if d and not d['attribue']]
 
-    if attributed:
-        save_json_per_nature(nature_name, attributed)
+def crawl_new_pages(nid, nature_name, max_pages, done_pages):
+    """Récupère les pages par lots depuis la première, jusqu'à une page entièrement déjà connue."""
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        for start in range(1, max_pages + 1, MAX_WORKERS):
+            batch = range(start, min(start + MAX_WORKERS, max_pages + 1))
+            todo = [page for page in batch if page not in done_pages]
+            results = {}
+            for page, result in zip(todo, executor.map(lambda p: fetch_nature_page(nid, p), todo)):
+                if result is not None:
+                    results[page] = result
+                    checkpoints.mark_page_done(nid, page, result)
+
+            for page in batch:
+                if page in results and all(checkpoints.is_known(nid, d) for d in results[page] if d):
+                    print(f"[crawl_new_pages] {nature_name}: page {page} déjà connue, arrêt")
+                    return
+
+
+def process_nature_using_global_info(nid, nature_pages_info):
+    nature_name = nature_pages_info[nid]["name"]
+    max_pages = nature_pages_info[nid]["max_pages"]
+    incremental = CRAWL_MODE == "incremental" and checkpoints.watermark(nid) is not None
+
+    print(f"[process_nature_using_global_info] Traitement nature: {nature_name} (ID {nid}), {max_pages} pages")
+
+    done_pages = checkpoints.completed_pages(nid)
+    if done_pages:
+        print(f"[process_nature_using_global_info] Reprise {nature_name}: {len(done_pages)} pages déjà terminées")
+
+    if incremental:
+        crawl_new_pages(nid, nature_name, max_pages, done_pages)
+    else:
+        crawl_all_pages(nid, nature_name, max_pages, done_pages)
+
+    records = checkpoints.iter_records(nid)
+    if incremental:
+        records = [d for d in records if d and not checkpoints.is_known(nid, d)]
+        print(f"[process_nature_using_global_info] {nature_name}: {len(records)} nouvelles consultations")
+
+    split_and_save_nature(nid, nature_name, records)
+    checkpoints.finish(nid)
 
-    return infructuous
+
+def report_metrics():
+    print(f"📈 {METRICS.summary()}")
+    if METRICS_REPORT:
+        METRICS.dump(METRICS_REPORT)
+
+
+def main_async():
+    print("[main_async] Début extraction des consultations (mode async)...")
+
+    natures = get_natures()
+    # Mode incrémental : natures déjà crawlées, arrêtées à la première page entièrement connue
+    known = {}
+    if CRAWL_MODE == "incremental":
+        known = {
+            nid: (lambda d, nid=nid: checkpoints.is_known(nid, d))
+            for nid in natures if checkpoints.watermark(nid) is not None
+        }
+    crawl_natures(
+        list(natures), ASYNC_CONCURRENCY, ASYNC_RATE, ASYNC_BURST, RETRIES, TIMEOUT,
+        cache=session.cache, on_page=checkpoints.mark_page_done,
+        done_pages={nid: checkpoints.completed_pages(nid) for nid in natures},
+        metrics=METRICS, known=known
+    )
+
+    for nid, nature_name in natures.items():
+        records = checkpoints.iter_records(nid)
+        if nid in known:
+            records = [d for d in records if d and not known[nid](d)]
+            print(f"[main_async] {nature_name}: {len(records)} nouvelles consultations")
+        split_and_save_nature(nid, nature_name, records)
+        checkpoints.finish(nid)
+    save_infructuous_consultations(natures)
+
+    print("\n✅ Extraction terminée, voir dossier 'data'")
+    report_metrics()
 
 
 def main():
+    if FETCH_MODE == "async":
+        return main_async()
+
     print("[main] Début extraction des consultations...")
 
     nature_pages_info = get_max_pages_all_natures()
 
-    all_infructuous = []
-
     with ThreadPoolExecutor(max_workers=MAX_NATURE_WORKERS) as executor:
         futures = {
             executor.submit(process_nature_using_global_info, nid, nature_pages_info): nid
@@ -228,13 +280,12 @@ def main():
         }
 
         for future in tqdm(as_completed(futures), total=len(futures), desc="Traitement global natures"):
-            infructuous_data = future.result()
-            if infructuous_data:
-                all_infructuous.extend(infructuous_data)
+            future.result()
 
-    save_infructuous_consultations(all_infructuous)
+    save_infructuous_consultations(nature_pages_info.keys())
 
     print("\n✅ Extraction terminée, voir dossier 'data'")
+    report_metrics()
 
 
 if __name__ == "__main__":
@@ -1,9 +1,10 @@
 import requests
 from bs4 import BeautifulSoup
 import json
+import os
 
 # Configuration
-BASE_URL = "https://www.marchespublics.gov.ma"
+BASE_URL = os.environ.get("MARCHES_BASE_URL", "https://www.marchespublics.gov.ma")
 SEARCH_URL = BASE_URL + "/bdc/entreprise/consultation/resultat"
 
 headers = {"User-Agent": "Mozilla/5.0"}
@@ -1,13 +1,20 @@
 import json
 import os
 from collections import defaultdict
-import spacy
+import sys
 from unidecode import unidecode
 import pandas as pd
 from pathlib import Path
 
-# Charger le modèle français de spaCy
-nlp = spacy.load('fr_core_news_sm')
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.lemmatizer import DEFAULT_PROCESSES, lemmatize_texts, load_nlp
+
+# Lemmatisation par lots (nlp.pipe) : taille des lots et nombre de processus
+BATCH_SIZE = 512
+N_PROCESS = DEFAULT_PROCESSES
+
+# Charger le modèle français de spaCy (sans parser ni NER)
+nlp = load_nlp('fr_core_news_sm')
 
 # Mots de liaison français à exclure
 stop_words = set(nlp.Defaults.stop_words)
@@ -18,42 +25,30 @@ def normalize_text(text):
     text = unidecode(text)
     return text
 
-def process_json_file(file_path):
-    # Lire le fichier JSON
+def read_texts(file_path):
+    """Textes normalisés de toutes les valeurs textuelles d'un fichier de catégorie."""
     with open(file_path, 'r', encoding='utf-8') as f:
         data = json.load(f)
     
-    # Collecter tous les textes
-    all_words = []
-    
-    # Traiter chaque objet
+    texts = []
     for item in data:
-        # Extraire le texte des champs pertinents (ajustez selon votre structure JSON)
-        text_fields = []
+        # Récupérer toutes les valeurs textuelles (ajustez selon votre structure JSON)
         if isinstance(item, dict):
-            # Récupérer toutes les valeurs textuelles
-            for value in item.values():
-                if isinstance(value, str):
-                    text_fields.append(value)
-        
-        # Normaliser et traiter chaque texte
-        for text in text_fields:
-            # Normaliser
-            text = normalize_text(text)
-            
-            # Traiter avec spaCy
-            doc = nlp(text)
-            
-            # Lemmatiser et filtrer
-            words = [token.lemma_ for token in doc 
-                    if token.lemma_ not in stop_words 
-                    and token.is_alpha 
-                    and len(token.lemma_) > 1]
-            
-            all_words.extend(words)
-    
-    # Retourner les mots uniques de cette catégorie
-    return sorted(set(all_words))
+            texts.extend(normalize_text(value) for value in item.values() if isinstance(value, str))
+    return texts
+
+def process_json_files(file_paths):
+    """Mots uniques de chaque catégorie ; tous les textes du dossier sont lemmatisés en une passe."""
+    texts_by_file = [read_texts(file_path) for file_path in file_paths]
+    lemmas = iter(lemmatize_texts((text for texts in texts_by_file for text in texts), nlp, stop_words,
+                                  batch_size=BATCH_SIZE, n_process=N_PROCESS))
+    results = []
+    for texts in texts_by_file:
+        all_words = set()
+        for _ in texts:
+            all_words.update(next(lemmas))
+        results.append(sorted(all_words))
+    return results
 
 def main():
     # Chemin vers le dossier contenant les sous-dossiers de catégories
@@ -63,11 +58,11 @@ def main():
             continue
         print(f"\nTraitement du dossier {subdir.name}...")
         results = {}
-        # Traiter chaque fichier categorie_XX.json
-        for file_path in subdir.glob('categorie_*.json'):
+        # Traiter tous les fichiers categorie_XX.json du dossier
+        file_paths = list(subdir.glob('categorie_*.json'))
+        for file_path, words in zip(file_paths, process_json_files(file_paths)):
             category_name = file_path.stem
             print(f"  - Catégorie: {category_name}")
-            words = process_json_file(file_path)
             results[category_name] = words
             print(f"    Nombre de mots: {len(words)}")
         # Sauvegarder les résultats dans le sous-dossier
@@ -0,0 +1 @@
+"""Modules partagés entre les scrapers et les scripts de traitement."""
@@ -0,0 +1,96 @@
+import asyncio
+import time
+
+import aiohttp
+from tqdm import tqdm
+
+from common.http_cache import CacheMiss
+
+
+def open_session(concurrency, timeout, headers):
+    """Crée une session aiohttp dont le pool de connexions est borné à `concurrency`."""
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    return aiohttp.ClientSession(
+        connector=connector,
+        headers=headers,
+        timeout=aiohttp.ClientTimeout(total=timeout),
+    )
+
+
+async def fetch_text(session, limiter, url, retries, label="", cache=None, metrics=None, labels=None):
+    """Télécharge une page en respectant le limiteur global, avec retry. Retourne None en cas d'échec.
+
+    Avec un `cache` (common.http_cache.HttpCache), la page est servie ou enregistrée selon son mode.
+    Avec `metrics` (common.metrics.Metrics), latence, statut, octets, retries et attente du limiteur
+    sont enregistrés sous `labels` ({"nature": ..., "date": ...}).
+    """
+    labels = labels or {}
+    if cache is not None:
+        try:
+            hit = cache.read(url)
+        except CacheMiss as e:
+            print(f"[fetch_text] {label} {e}")
+            return None
+        if hit is not None:
+            body, entry = hit
+            if metrics is not None:
+                metrics.observe_cache_hit(len(body), **labels)
+            return body.decode(entry.get("encoding") or "utf-8", errors="replace")
+
+    for attempt in range(retries):
+        if attempt and metrics is not None:
+            metrics.observe_retry(**labels)
+        waited = time.perf_counter()
+        await limiter.acquire()
+        start = time.perf_counter()
+        if metrics is not None:
+            metrics.observe_wait(start - waited, **labels)
+        recorded = False
+        try:
+            async with session.get(url) as res:
+                body = await res.read()
+                if metrics is not None:
+                    metrics.observe_request(time.perf_counter() - start, res.status, len(body), **labels)
+                    recorded = True
+                res.raise_for_status()
+                encoding = res.get_encoding()
+                if cache is not None:
+                    cache.write(url, body, encoding)
+                return body.decode(encoding, errors="replace")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if metrics is not None and not recorded:
+                metrics.observe_request(time.perf_counter() - start, error=type(e).__name__, **labels)
+            print(f"[fetch_text] Tentative {attempt+1}/{retries} {label} erreur: {e}")
+    return None
+
+
+async def fetch_all(session, limiter, jobs, parse, retries, desc=None, cache=None, on_result=None,
+                    metrics=None, labels=None):
+    """Télécharge et parse toutes les URLs de `jobs` ((clé, url)) dans la même boucle.
+
+    Retourne un dict {clé: parse(html)} ; la valeur vaut None si la page n'a pas pu être récupérée.
+    Avec `on_result(clé, valeur)`, chaque résultat est transmis dès qu'il arrive et n'est pas conservé.
+    Avec `metrics`, `labels(clé)` donne les étiquettes {"nature": ..., "date": ...} de chaque job.
+    """
+    async def run(key, url):
+        job_labels = labels(key) if labels is not None else {}
+        html = await fetch_text(session, limiter, url, retries, label=str(key), cache=cache,
+                                metrics=metrics, labels=job_labels)
+        if html is None:
+            return key, None
+        if metrics is None:
+            return key, parse(html)
+        with metrics.parsing(**job_labels):
+            return key, parse(html)
+
+    tasks = [asyncio.ensure_future(run(key, url)) for key, url in jobs]
+    results = {}
+    with tqdm(total=len(tasks), desc=desc, disable=desc is None) as bar:
+        for task in asyncio.as_completed(tasks):
+            key, value = await task
+            if on_result is not None:
+                on_result(key, value)
+            else:
+                results[key] = value
+            bar.update(1)
+    return results
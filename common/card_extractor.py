@@ -0,0 +1,149 @@
+"""Extraction des cartes de résultats avec lxml et des XPath précompilés.
+
+Remplace les `extract_card_data` BeautifulSoup copiés dans chaque scraper : la page est
+parsée une seule fois et tous les champs de toutes les cartes sont extraits en une passe,
+avec exactement les mêmes règles (et donc les mêmes valeurs) que l'ancienne version
+(vérifiable avec `python -m common.card_parity_check`).
+"""
+import re
+
+from lxml import etree
+
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+CARDS = etree.XPath(f"//*[{_has_class('entreprise__card')}]")
+REFERENCE = etree.XPath(f".//*[{_has_class('font-bold')} and {_has_class('table__links')}][1]")
+OBJECT = etree.XPath(".//*[@data-bs-toggle='tooltip'][1]")
+LABEL_SPANS = etree.XPath(".//span[contains(., $label)]")
+RIGHT_CARD = etree.XPath(f".//*[{_has_class('entreprise__rightSubCard--top')}][1]")
+QUOTES_LABEL = etree.XPath(".//text()[contains(., 'Nombre de devis reçus')]")
+QUOTES_VALUE = etree.XPath(f".//span[{_has_class('font-bold')}][ancestor::span][1]")
+CHILD_SPANS = etree.XPath("./span")
+BOLD_SPAN = etree.XPath(f".//span[{_has_class('font-bold')}][1]")
+RESULT_COUNT = etree.XPath(f"//div[{_has_class('content__resultat')}][1]//text()")
+RESULT_COUNT_PATTERN = re.compile(r'Nombre de résultats\s*:\s*(\d+)')
+NATURE_OPTIONS = etree.XPath("//*[@id='search_consultation_resultats_naturePrestation']//option")
+
+
+def parse_html(html):
+    """Parse une page HTML (même parseur libxml2 que BeautifulSoup(html, 'lxml'))."""
+    if not html:
+        return None
+    return etree.HTML(html)
+
+
+def text_of(element):
+    """Texte de tous les descendants, comme `.text` de BeautifulSoup."""
+    return "".join(element.itertext())
+
+
+def _single_string(element):
+    """Équivalent de `Tag.string` de BeautifulSoup : l'unique texte du nœud, sinon None."""
+    while True:
+        children = list(element)
+        if not children:
+            return element.text
+        if len(children) > 1 or element.text or children[0].tail:
+            return None
+        element = children[0]
+
+
+def _first_labelled_span(card, label):
+    """Premier <span> dont le texte unique contient `label` (find('span', string=...))."""
+    for span in LABEL_SPANS(card, label=label):
+        string = _single_string(span)
+        if string and label in string:
+            return span
+    return None
+
+
+def _first(nodes):
+    return nodes[0] if nodes else None
+
+
+def extract_card_data(card):
+    try:
+        ref_element = _first(REFERENCE(card))
+        reference = text_of(ref_element).strip().replace('Référence :', '').strip() if ref_element is not None else None
+
+        object_element = _first(OBJECT(card))
+        obj = text_of(object_element).strip().replace('Objet :', '').strip() if object_element is not None else None
+
+        buyer_span = _first_labelled_span(card, "Acheteur")
+        buyer = text_of(buyer_span.getparent()).replace('Acheteur :', '').strip() if buyer_span is not None else None
+
+        date_span = _first_labelled_span(card, "Date de publication")
+        publication_date = (
+            text_of(date_span.getparent()).replace('Date de publication du résultat :', '').strip()
+            if date_span is not None else None
+        )
+
+        number_of_quotes = None
+        awarded = False
+        awarded_company = None
+        amount_ttc = None
+
+        right_card = _first(RIGHT_CARD(card))
+        if right_card is not None:
+            if QUOTES_LABEL(right_card):
+                quotes_span = _first(QUOTES_VALUE(right_card))
+                if quotes_span is not None:
+                    number_of_quotes = text_of(quotes_span).strip()
+
+            spans = CHILD_SPANS(right_card)
+
+            def get_bold_text(span):
+                b = _first(BOLD_SPAN(span))
+                return text_of(b).strip() if b is not None else None
+
+            if len(spans) >= 3:
+                awarded_company = get_bold_text(spans[1])
+                amount_ttc = get_bold_text(spans[2])
+                awarded = awarded_company is not None
+
+        return {
+            "reference": reference,
+            "objet": obj,
+            "acheteur": buyer,
+            "date_publication": publication_date,
+            "nombre_devis": number_of_quotes,
+            "attribue": awarded,
+            "entreprise_attributaire": awarded_company if awarded else None,
+            "montant": amount_ttc if awarded else None
+        }
+    except Exception as e:
+        print(f"[extract_card_data] Erreur extraction carte: {e}")
+        return None
+
+
+def extract_cards(html):
+    """Extrait toutes les cartes de consultation d'une page de résultats, en une passe."""
+    root = parse_html(html)
+    if root is None:
+        return []
+    return [extract_card_data(card) for card in CARDS(root)]
+
+
+def extract_result_count(html):
+    """Nombre de résultats annoncé par la page (« Nombre de résultats : N »), ou None."""
+    root = parse_html(html)
+    if root is None:
+        return None
+    # get_text(strip=True) : chaque texte est nettoyé puis concaténé sans séparateur
+    text = "".join(t.strip() for t in RESULT_COUNT(root))
+    match = RESULT_COUNT_PATTERN.search(text)
+    return int(match.group(1)) if match else None
+
+
+def extract_natures(html):
+    """Retourne {id: libellé} des natures de prestation du formulaire de recherche."""
+    root = parse_html(html)
+    if root is None:
+        return {}
+    return {
+        int(opt.get('value')): text_of(opt).strip()
+        for opt in NATURE_OPTIONS(root) if (opt.get('value') or '').isdigit()
+    }
@@ -0,0 +1,158 @@
+"""Vérifie que l'extracteur lxml (common.card_extractor) donne exactement les mêmes
+champs que l'ancien extract_card_data BeautifulSoup, puis compare leurs temps.
+
+Usage :
+    python -m common.card_parity_check                      # fixture common/fixtures/resultats_page.html
+    python -m common.card_parity_check http_cache/objects   # + toutes les pages .html d'un dossier (ex. cache HTTP)
+"""
+import os
+import re
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+from common.card_extractor import extract_cards, extract_natures, extract_result_count
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "resultats_page.html")
+
+
+# --- Implémentation de référence (BeautifulSoup), telle qu'elle existait dans les scrapers ---
+
+def legacy_extract_card_data(card):
+    try:
+        ref_element = card.select_one('.font-bold.table__links')
+        reference = ref_element.text.strip().replace('Référence :', '').strip() if ref_element else None
+
+        object_element = card.select_one('[data-bs-toggle="tooltip"]')
+        obj = object_element.text.strip().replace('Objet :', '').strip() if object_element else None
+
+        buyer_span = card.find('span', string=lambda s: s and "Acheteur" in s)
+        buyer = buyer_span.parent.text.replace('Acheteur :', '').strip() if buyer_span else None
+
+        date_span = card.find('span', string=lambda s: s and "Date de publication" in s)
+        publication_date = date_span.parent.text.replace('Date de publication du résultat :', '').strip() if date_span else None
+
+        number_of_quotes = None
+        awarded = False
+        awarded_company = None
+        amount_ttc = None
+
+        right_card = card.select_one('.entreprise__rightSubCard--top')
+        if right_card:
+            quotes_match = right_card.find(string=lambda s: s and "Nombre de devis reçus" in s)
+            if quotes_match:
+                quotes_span = right_card.select_one("span span.font-bold")
+                if quotes_span:
+                    number_of_quotes = quotes_span.text.strip()
+
+            spans = right_card.find_all('span', recursive=False)
+
+            def get_bold_text(span):
+                b = span.find('span', class_='font-bold')
+                return b.text.strip() if b else None
+
+            if len(spans) >= 3:
+                awarded_company = get_bold_text(spans[1])
+                amount_ttc = get_bold_text(spans[2])
+                awarded = awarded_company is not None
+
+        return {
+            "reference": reference,
+            "objet": obj,
+            "acheteur": buyer,
+            "date_publication": publication_date,
+            "nombre_devis": number_of_quotes,
+            "attribue": awarded,
+            "entreprise_attributaire": awarded_company if awarded else None,
+            "montant": amount_ttc if awarded else None
+        }
+    except Exception as e:
+        print(f"[extract_card_data] Erreur extraction carte: {e}")
+        return None
+
+
+def legacy_extract_cards(html):
+    soup = BeautifulSoup(html, 'lxml')
+    cards = soup.select('.entreprise__card')
+    return [legacy_extract_card_data(card) for card in cards if card]
+
+
+def legacy_result_count(html):
+    soup = BeautifulSoup(html, 'lxml')
+    div_result = soup.find('div', class_='content__resultat')
+    if div_result:
+        match = re.search(r'Nombre de résultats\s*:\s*(\d+)', div_result.get_text(strip=True))
+        if match:
+            return int(match.group(1))
+    return None
+
+
+def legacy_natures(html):
+    soup = BeautifulSoup(html, 'lxml')
+    options = soup.select('#search_consultation_resultats_naturePrestation option')
+    return {int(opt['value']): opt.text.strip() for opt in options if opt.get('value', '').isdigit()}
+
+
+# --- Comparaison ---
+
+def html_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if name.endswith(".html"):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def compare_page(path, html):
+    """Retourne la liste des différences (chaîne lisible) entre les deux extracteurs."""
+    diffs = []
+    old_cards, new_cards = legacy_extract_cards(html), extract_cards(html)
+    if len(old_cards) != len(new_cards):
+        diffs.append(f"{path}: {len(old_cards)} cartes (bs4) != {len(new_cards)} cartes (lxml)")
+    for i, (old, new) in enumerate(zip(old_cards, new_cards)):
+        for field in sorted(set(old or {}) | set(new or {})):
+            if (old or {}).get(field) != (new or {}).get(field):
+                diffs.append(f"{path}: carte {i} champ '{field}': {old.get(field)!r} != {new.get(field)!r}")
+    if legacy_result_count(html) != extract_result_count(html):
+        diffs.append(f"{path}: nombre de résultats {legacy_result_count(html)} != {extract_result_count(html)}")
+    if legacy_natures(html) != extract_natures(html):
+        diffs.append(f"{path}: natures différentes")
+    return diffs
+
+
+def timed(function, pages):
+    start = time.perf_counter()
+    count = sum(len(function(html)) for html in pages)
+    return count, time.perf_counter() - start
+
+
+def main(paths):
+    pages = []
+    all_diffs = []
+    for path in html_files([FIXTURE] + paths):
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            html = f.read()
+        pages.append(html)
+        all_diffs.extend(compare_page(path, html))
+
+    for diff in all_diffs:
+        print(f"❌ {diff}")
+
+    old_count, old_time = timed(legacy_extract_cards, pages)
+    new_count, new_time = timed(extract_cards, pages)
+    print(f"📄 {len(pages)} pages, {new_count} cartes comparées champ par champ")
+    print(f"⏱️  bs4 : {old_time:.3f} s, lxml : {new_time:.3f} s (x{old_time / max(new_time, 1e-9):.1f})")
+
+    if all_diffs:
+        print(f"❌ {len(all_diffs)} différences")
+        return 1
+    print("✅ Parité complète entre bs4 et lxml")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
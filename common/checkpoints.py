@@ -0,0 +1,111 @@
+"""Points de reprise des crawls : filigrane par nature et pages déjà terminées.
+
+- watermarks.json : pour chaque nature, la date de publication la plus récente déjà vue
+  et les références publiées à cette date. Un enregistrement est « connu » s'il est
+  plus ancien que ce filigrane (ou de la même date avec une référence déjà vue).
+- nature_X.pages.jsonl : une ligne {"page": p, "records": [...]} par page terminée du
+  crawl en cours, écrite au fil de l'eau (NdjsonSink, fsync périodique). C'est le flux
+  à partir duquel les fichiers de la nature sont construits ; un crawl interrompu
+  reprend en sautant ces pages. Le fichier est supprimé quand la nature est terminée.
+
+Les résultats du site sont triés du plus récent au plus ancien : en mode incrémental,
+on s'arrête à la première page entièrement composée d'enregistrements connus.
+"""
+import json
+import os
+import re
+import threading
+
+from common.ndjson_sink import NdjsonSink, iter_ndjson
+
+DATE_PATTERN = re.compile(r'(\d{2})/(\d{2})/(\d{4})')
+
+
+def publication_day(record):
+    """Retourne la date de publication au format YYYY-MM-DD (comparable), ou None."""
+    match = DATE_PATTERN.search((record or {}).get("date_publication") or "")
+    if not match:
+        return None
+    day, month, year = match.groups()
+    return f"{year}-{month}-{day}"
+
+
+class CheckpointStore:
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, "watermarks.json")
+        self._lock = threading.Lock()
+        self._page_sinks = {}
+        self.watermarks = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.watermarks = json.load(f)
+
+    def _pages_path(self, nature_id):
+        return os.path.join(self.directory, f"nature_{nature_id}.pages.jsonl")
+
+    def _save_watermarks(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.watermarks, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def watermark(self, nature_id):
+        return self.watermarks.get(str(nature_id))
+
+    def is_known(self, nature_id, record):
+        """Vrai si l'enregistrement est antérieur (ou égal) au filigrane de la nature."""
+        mark = self.watermark(nature_id)
+        if not mark or not record:
+            return False
+        day = publication_day(record)
+        if day is None:
+            return record.get("reference") in mark["references"]
+        return day < mark["date"] or (day == mark["date"] and record.get("reference") in mark["references"])
+
+    def update_watermark(self, nature_id, records):
+        """Avance le filigrane de la nature avec les enregistrements récupérés."""
+        with self._lock:
+            mark = self.watermarks.get(str(nature_id)) or {"date": "", "references": []}
+            for record in records:
+                day = publication_day(record)
+                if day is None or day < mark["date"]:
+                    continue
+                if day > mark["date"]:
+                    mark = {"date": day, "references": []}
+                if record.get("reference") not in mark["references"]:
+                    mark["references"].append(record.get("reference"))
+            if mark["date"]:
+                self.watermarks[str(nature_id)] = mark
+                self._save_watermarks()
+
+    def completed_pages(self, nature_id):
+        """Retourne l'ensemble des pages déjà terminées du crawl en cours."""
+        return {entry["page"] for entry in iter_ndjson(self._pages_path(nature_id))}
+
+    def iter_records(self, nature_id):
+        """Relit, page par page, les enregistrements du crawl en cours (dans l'ordre d'arrivée)."""
+        sink = self._page_sinks.get(nature_id)
+        if sink is not None:
+            sink.checkpoint()
+        for entry in iter_ndjson(self._pages_path(nature_id)):
+            yield from entry["records"]
+
+    def mark_page_done(self, nature_id, page, records):
+        with self._lock:
+            sink = self._page_sinks.get(nature_id)
+            if sink is None:
+                sink = self._page_sinks[nature_id] = NdjsonSink(self._pages_path(nature_id))
+        sink.write({"page": page, "records": records})
+
+    def finish(self, nature_id):
+        """Clôt le crawl d'une nature : avance le filigrane et oublie les pages en cours."""
+        with self._lock:
+            sink = self._page_sinks.pop(nature_id, None)
+        if sink is not None:
+            sink.close()
+        self.update_watermark(nature_id, self.iter_records(nature_id))
+        path = self._pages_path(nature_id)
+        if os.path.exists(path):
+            os.remove(path)
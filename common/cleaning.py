@@ -0,0 +1,169 @@
+"""Nettoyage des consultations scrapées (montants, champs conservés).
+
+Une seule règle de conversion des montants pour les scrapers et les scripts de traitement :
+le premier nombre du texte est extrait (« 12 480,00 MAD », « 1.250.000,50 DH »,
+« Montant : 12,480.00 »...), espaces (y compris insécables) et apostrophes sont retirés,
+puis le séparateur décimal est déterminé :
+
+- virgule et point présents : le dernier des deux est le séparateur décimal ;
+- une seule virgule (ou un seul point) : séparateur décimal ;
+- plusieurs virgules (ou plusieurs points) : séparateurs de milliers ;
+- séparateur décimal répété alors que l'autre est présent (« 1,2.3,4 ») : montant illisible (None).
+
+parse_montants applique cette règle à toute une colonne avec les noyaux pyarrow.compute ;
+convert_montant en est la version pour un seul montant, pour les boucles existantes.
+"""
+import re
+from datetime import date, datetime
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Espaces (dont insécables) et apostrophes utilisés comme séparateurs de milliers
+_SPACES = " \t\n\r\f\v\u00a0\u202f'"
+_NUMBER = "\\d[\\d" + _SPACES + ".,]*"
+_NUMBER_RE = re.compile(_NUMBER)
+_SPACES_RE = re.compile(f"[{_SPACES}]")
+
+CLEANED_FIELDS = ("reference", "objet", "acheteur")
+_DATE_RE = re.compile(r"(\d{2})/(\d{2})/(\d{4})")
+
+
+def _normalize_separators(number):
+    commas, dots = number.count(","), number.count(".")
+    if commas and dots:
+        decimal = "," if number.rfind(",") > number.rfind(".") else "."
+        if number.count(decimal) > 1:
+            return None
+    elif commas == 1:
+        decimal = ","
+    elif dots == 1:
+        decimal = "."
+    else:
+        decimal = None
+    if decimal == ",":
+        return number.replace(".", "").replace(",", ".")
+    if decimal == ".":
+        return number.replace(",", "")
+    return number.replace(",", "").replace(".", "")
+
+
+def convert_montant(montant_str):
+    """Convertit un montant (texte ou nombre) en nombre flottant, None si aucun nombre."""
+    if montant_str is None or isinstance(montant_str, bool):
+        return None
+    if isinstance(montant_str, (int, float)):
+        return float(montant_str)
+    match = _NUMBER_RE.search(montant_str)
+    if not match:
+        return None
+    number = _normalize_separators(_SPACES_RE.sub("", match.group(0)).rstrip(".,"))
+    return float(number) if number is not None else None
+
+
+def _remove_chars(strings, chars):
+    # Remplacements littéraux, nettement plus rapides qu'une classe regex (RE2) sur toute la colonne ;
+    # les caractères absents du tampon de données sont sautés
+    data = strings.buffers()[2]
+    present = data.to_pybytes() if data is not None else b""
+    for char in chars:
+        if char.encode("utf-8") in present:
+            strings = pc.replace_substring(strings, char, "")
+    return strings
+
+
+def parse_montant_array(texts):
+    """Version colonne de convert_montant : tableau Arrow de textes -> tableau float64 (null si aucun nombre)."""
+    number = pc.struct_field(pc.extract_regex(texts, f"(?P<n>{_NUMBER})"), [0])
+    number = pc.utf8_rtrim(_remove_chars(number, _SPACES), characters=".,")
+
+    commas = pc.count_substring(number, ",")
+    dots = pc.count_substring(number, ".")
+    # dernier séparateur : celui qui reste en fin de chaîne une fois les chiffres finaux retirés
+    tail = pc.utf8_rtrim(number, characters="0123456789")
+    comma_decimal = pc.and_(pc.ends_with(tail, ","), pc.or_(pc.equal(commas, 1), pc.greater(dots, 0)))
+    dot_decimal = pc.and_(pc.ends_with(tail, "."), pc.or_(pc.equal(dots, 1), pc.greater(commas, 0)))
+
+    # séparateur décimal répété alors que l'autre séparateur est présent (« 1,2.3,4 ») : montant illisible
+    ambiguous = pc.or_(pc.and_(comma_decimal, pc.greater(commas, 1)), pc.and_(dot_decimal, pc.greater(dots, 1)))
+
+    without_dots = _remove_chars(number, ".")
+    normalized = pc.if_else(
+        comma_decimal,
+        pc.replace_substring(without_dots, ",", "."),
+        pc.if_else(dot_decimal, _remove_chars(number, ","), _remove_chars(without_dots, ",")),
+    )
+    normalized = pc.if_else(ambiguous, pa.scalar(None, pa.string()), normalized)
+    return pc.cast(normalized, pa.float64())
+
+
+def parse_montants(values):
+    """Convertit une liste de montants (textes, nombres ou None) en une passe ; même règle que convert_montant."""
+    values = list(values)
+    try:
+        # Cas courant (montants bruts du site) : uniquement des textes ou None
+        return parse_montant_array(pa.array(values, pa.string())).to_pylist()
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        pass
+    texts = pa.array([v if isinstance(v, str) else None for v in values], pa.string())
+    parsed = parse_montant_array(texts).to_pylist()
+    return [
+        float(v) if isinstance(v, (int, float)) and not isinstance(v, bool) else p
+        for v, p in zip(values, parsed)
+    ]
+
+
+def clean_data(data):
+    """Nettoie les données en gardant uniquement les champs requis et en convertissant le montant."""
+    items = [item for item in data if item]
+    montants = parse_montants(item.get("montant") for item in items)
+    return [
+        {
+            "reference": item.get("reference"),
+            "objet": item.get("objet"),
+            "acheteur": item.get("acheteur"),
+            "montant": montant
+        }
+        for item, montant in zip(items, montants)
+    ]
+
+
+def clean_frame(df):
+    """Version DataFrame de clean_data pour les traitements par lots (colonnes manquantes -> None)."""
+    import pandas as pd
+
+    cleaned = pd.DataFrame({field: df[field] if field in df.columns else None for field in CLEANED_FIELDS},
+                           index=df.index)
+    montants = df["montant"] if "montant" in df.columns else pd.Series(None, index=df.index, dtype=object)
+    cleaned["montant"] = parse_montants(montants.tolist())
+    return cleaned
+
+
+def parse_date(value):
+    """Date du site (JJ/MM/AAAA, éventuellement suivie d'une heure) ou ISO -> date, None si absente/illisible."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if not value or not isinstance(value, str):
+        return None
+    match = _DATE_RE.search(value)
+    try:
+        if match:
+            day, month, year = match.groups()
+            return date(int(year), int(month), int(day))
+        return datetime.strptime(value.strip()[:10], "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+def iter_batches(records, size=5000):
+    """Regroupe un itérable d'enregistrements en listes de `size` (nettoyage par lots des flux)."""
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
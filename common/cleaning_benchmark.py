@@ -0,0 +1,142 @@
+"""Compare le nettoyage des montants par colonne (common.cleaning) aux anciennes versions
+par enregistrement recopiées dans les scripts, puis mesure leurs temps.
+
+Vérifie que parse_montants (pyarrow) et convert_montant (un montant à la fois) donnent
+exactement le même résultat, et liste les montants pour lesquels l'ancienne conversion
+différait (ex. « 1.250.000,50 DH », espaces insécables) : ce sont des corrections.
+
+Usage :
+    python -m common.cleaning_benchmark                         # 200 000 montants synthétiques
+    python -m common.cleaning_benchmark data/attributed.json    # + fichiers JSON / JSONL bruts
+"""
+import json
+import random
+import re
+import sys
+import time
+
+from common.cleaning import clean_data, convert_montant, parse_montants
+
+SYNTHETIC_SIZE = 200_000
+MAX_EXAMPLES = 10
+# Formats rencontrés ou plausibles, toujours inclus dans la comparaison
+EDGE_CASES = [
+    "12 480,00 MAD", "1.250.000,50 DH", "Montant : 12,480.00", "1,250,000", "1.250.000", "12\u00a0480,5",
+    "12\u202f480,50 MAD", "3'450.75 MAD", "100.", "7,", "12,5", "0,00", "1,2.3,4", "MAD", "", None,
+]
+
+
+# --- Implémentations de référence, telles qu'elles existaient dans les scripts ---
+
+def legacy_convert_montant(montant_str):
+    """Version des scraper_daily.py / cleaner.py de traitementParCategories."""
+    if not montant_str:
+        return None
+    montant_str = montant_str.replace(' ', '').replace(',', '.')
+    match = re.search(r'([\d.]+)', montant_str)
+    if not match:
+        return None
+    try:
+        return float(match.group(1))
+    except ValueError:
+        return None
+
+
+def legacy_parse_montant(montant_str):
+    """Version de clean_large_files.py, process_without_spacy.py, predict.py..."""
+    if montant_str is None:
+        return None
+    montant_str = str(montant_str).replace("MAD", "").replace(",", ".").replace(" ", "").strip()
+    try:
+        return float(montant_str)
+    except ValueError:
+        return None
+
+
+def legacy_clean_data(data):
+    return [
+        {
+            "reference": item.get("reference"),
+            "objet": item.get("objet"),
+            "acheteur": item.get("acheteur"),
+            "montant": legacy_convert_montant(item.get("montant"))
+        }
+        for item in data if item
+    ]
+
+
+def synthetic_records(size, seed=0):
+    """Montants au format du site (« 12 480,00 MAD ») avec une part de variantes rencontrées."""
+    rng = random.Random(seed)
+    records = []
+    for i in range(size):
+        value = round(rng.lognormvariate(9, 1.5), 2)
+        text = f"{value:,.2f}".replace(",", " ").replace(".", ",") + " MAD"
+        draw = rng.random()
+        if draw < 0.02:
+            text = f"{value:,.2f}".replace(",", "\u00a0").replace(".", ",") + "\u00a0MAD"
+        elif draw < 0.03:
+            text = f"{value:,.2f}".replace(",", "_").replace(".", ",").replace("_", ".") + " DH"
+        elif draw < 0.04:
+            text = ""
+        records.append({"reference": f"{i}/2025", "objet": f"Objet {i}", "acheteur": "Commune", "montant": text})
+    return records
+
+
+def load_records(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith(".jsonl") or path.endswith(".ndjson"):
+            return [json.loads(line) for line in f if line.strip()]
+        data = json.load(f)
+    return data if isinstance(data, list) else [data]
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main(paths):
+    records = [{"montant": value} for value in EDGE_CASES] + synthetic_records(SYNTHETIC_SIZE)
+    for path in paths:
+        records.extend(item for item in load_records(path) if isinstance(item, dict))
+    values = [item.get("montant") for item in records]
+
+    parse_montants(values[:100])  # initialisation de pyarrow.compute, hors mesure
+    vectorized, vector_time = timed(parse_montants, values)
+    scalar, scalar_time = timed(lambda vs: [convert_montant(v) for v in vs], values)
+    _, legacy_time = timed(lambda vs: [legacy_convert_montant(v) for v in vs], values)
+    _, legacy_clean_time = timed(legacy_clean_data, records)
+    _, clean_time = timed(clean_data, records)
+
+    mismatches = [(v, a, b) for v, a, b in zip(values, vectorized, scalar) if a != b]
+    for value, a, b in mismatches[:MAX_EXAMPLES]:
+        print(f"❌ {value!r} : parse_montants={a} convert_montant={b}")
+
+    changes = {}
+    for value, new in zip(values, vectorized):
+        for name, legacy in (("convert_montant", legacy_convert_montant), ("parse_montant", legacy_parse_montant)):
+            old = legacy(value) if isinstance(value, str) or value is None else value
+            if old != new and isinstance(value, str):
+                changes.setdefault(name, {}).setdefault(value, (old, new))
+    for name, examples in changes.items():
+        print(f"🔁 {len(examples)} montants distincts convertis différemment de l'ancien {name} :")
+        for value, (old, new) in list(examples.items())[:MAX_EXAMPLES]:
+            print(f"    {value!r} : {old} -> {new}")
+
+    print(f"📄 {len(values)} montants comparés")
+    print(f"⏱️  montants : ancien par enregistrement {legacy_time:.3f} s, convert_montant {scalar_time:.3f} s, "
+          f"parse_montants {vector_time:.3f} s (x{legacy_time / max(vector_time, 1e-9):.1f})")
+    print(f"⏱️  clean_data : ancien {legacy_clean_time:.3f} s, par colonne {clean_time:.3f} s "
+          f"(x{legacy_clean_time / max(clean_time, 1e-9):.1f})")
+
+    if mismatches:
+        print(f"❌ {len(mismatches)} différences entre parse_montants et convert_montant")
+        return 1
+    print("✅ parse_montants et convert_montant donnent les mêmes montants")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,404 @@
+"""Base locale canonique des consultations (SQLite en mode WAL) avec une petite API de requêtes.
+
+Tables :
+- natures : registre des natures de prestation (mêmes identifiants que natures.json du découpage) ;
+- awards : résultats attribués (une ligne par (reference, objet, acheteur), montant en nombre,
+  date_publication au format AAAA-MM-JJ, categorie : fournitures / services / traveaux des
+  scrapers quotidiens, distincte de la nature de prestation) ;
+- details / articles : pages de détail /consultation/show/{id} et leurs articles ;
+- predictions : intervalles prédits par les scripts d'évaluation.
+
+Index sur la référence, la nature, la date et l'acheteur : les scripts d'entraînement,
+d'évaluation ou d'analyse lisent directement la tranche voulue, par exemple :
+
+    with ConsultationStore() as store:
+        df = store.awards(categorie="fournitures", last_days=90)
+        montants = store.awards_array("montant", nature="Travaux de voirie", start="2025-01-01")
+
+Import des fichiers existants :
+
+    python -m common.consultation_store awards <catégorie> attributed_day_*.json
+    python -m common.consultation_store details consultations.ndjson
+    python -m common.consultation_store natures ../data/natures_new/natures.json
+    python -m common.consultation_store predictions <modèle> results_*.json
+"""
+import json
+import os
+import sqlite3
+import sys
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from common.cleaning import parse_date, parse_montants
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "store", "consultations.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS natures (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS awards (
+    id INTEGER PRIMARY KEY,
+    reference TEXT NOT NULL,
+    objet TEXT NOT NULL DEFAULT '',
+    acheteur TEXT NOT NULL DEFAULT '',
+    nature_id INTEGER REFERENCES natures (id),
+    date_publication TEXT,
+    nombre_devis INTEGER,
+    attributaire TEXT,
+    montant REAL,
+    montant_texte TEXT,
+    categorie TEXT,
+    UNIQUE (reference, objet, acheteur)
+);
+CREATE INDEX IF NOT EXISTS awards_reference ON awards (reference);
+CREATE INDEX IF NOT EXISTS awards_nature_date ON awards (nature_id, date_publication);
+CREATE INDEX IF NOT EXISTS awards_date ON awards (date_publication);
+CREATE INDEX IF NOT EXISTS awards_acheteur ON awards (acheteur);
+
+CREATE TABLE IF NOT EXISTS details (
+    id INTEGER PRIMARY KEY,
+    reference TEXT NOT NULL,
+    objet TEXT,
+    acheteur TEXT,
+    nature_id INTEGER REFERENCES natures (id),
+    categorie TEXT,
+    lieu TEXT,
+    date_mise_en_ligne TEXT,
+    date_limite TEXT
+);
+CREATE INDEX IF NOT EXISTS details_reference ON details (reference);
+CREATE INDEX IF NOT EXISTS details_nature_date ON details (nature_id, date_mise_en_ligne);
+CREATE INDEX IF NOT EXISTS details_date ON details (date_mise_en_ligne);
+CREATE INDEX IF NOT EXISTS details_acheteur ON details (acheteur);
+
+CREATE TABLE IF NOT EXISTS articles (
+    detail_id INTEGER NOT NULL REFERENCES details (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    titre TEXT,
+    quantite TEXT,
+    PRIMARY KEY (detail_id, position)
+);
+
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY,
+    model TEXT NOT NULL,
+    reference TEXT NOT NULL,
+    nature_id INTEGER REFERENCES natures (id),
+    predicted_interval TEXT,
+    interval_min REAL,
+    interval_max REAL,
+    real_montant REAL,
+    correct INTEGER,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS predictions_reference ON predictions (reference);
+CREATE INDEX IF NOT EXISTS predictions_nature ON predictions (nature_id, model);
+CREATE INDEX IF NOT EXISTS predictions_date ON predictions (created_at);
+"""
+
+AWARD_COLUMNS = ["reference", "objet", "acheteur", "nature", "categorie", "date_publication", "nombre_devis",
+                 "attributaire", "montant"]
+# Tables dont nature_id référence natures (déplacées avec la nature par sync_natures)
+NATURE_TABLES = ["awards", "details", "predictions"]
+DETAIL_COLUMNS = ["id", "reference", "objet", "acheteur", "nature", "categorie", "lieu",
+                  "date_mise_en_ligne", "date_limite"]
+PREDICTION_COLUMNS = ["model", "reference", "nature", "predicted_interval", "interval_min", "interval_max",
+                      "real_montant", "correct", "created_at"]
+DATE_COLUMNS = {"awards": "date_publication", "details": "date_mise_en_ligne", "predictions": "created_at"}
+
+
+def _iso(value):
+    day = parse_date(value)
+    return day.isoformat() if day else None
+
+
+def _interval_bounds(interval):
+    """« 1000-5000 » -> (1000.0, 5000.0), (None, None) si illisible."""
+    try:
+        low, high = str(interval).split("-", 1)
+        return float(low), float(high)
+    except (TypeError, ValueError):
+        return None, None
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class ConsultationStore:
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+        # Base créée avant la colonne categorie des résultats attribués
+        if "categorie" not in [column[1] for column in self.conn.execute("PRAGMA table_info(awards)")]:
+            with self.conn:
+                self.conn.execute("ALTER TABLE awards ADD COLUMN categorie TEXT")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS awards_categorie_date ON awards (categorie, date_publication)")
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- Registre des natures ---
+
+    def nature_id(self, name, create=True):
+        """Identifiant de la nature (créée si besoin avec le plus grand identifiant + 1)."""
+        if name is None or str(name).strip() == "":
+            return None
+        name = str(name).strip()
+        row = self.conn.execute("SELECT id FROM natures WHERE name = ?", (name,)).fetchone()
+        if row or not create:
+            return row[0] if row else None
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO natures (id, name) VALUES ((SELECT COALESCE(MAX(id), 0) + 1 FROM natures), ?)", (name,)
+            )
+        return cursor.lastrowid
+
+    def _move_nature(self, old_id, new_id):
+        """Change l'identifiant d'une nature et des lignes qui la référencent."""
+        self.conn.execute("UPDATE natures SET id = ? WHERE id = ?", (new_id, old_id))
+        for table in NATURE_TABLES:
+            self.conn.execute(f"UPDATE {table} SET nature_id = ? WHERE nature_id = ?", (new_id, old_id))
+
+    def sync_natures(self, registry):
+        """Importe un registre {nature: {"id": n, ...}} (natures.json) en gardant ses identifiants.
+
+        Une nature créée par nature_id() qui occupe l'identifiant d'une autre nature du registre
+        est déplacée (avec ses résultats, détails et prédictions) vers un identifiant libre ; une
+        nature du registre déjà présente sous un autre identifiant est déplacée vers le sien.
+        """
+        registry_ids = [int(entry["id"]) for entry in registry.values()]
+        with self.conn:
+            # Clés étrangères vérifiées au COMMIT : une nature et ses lignes changent d'identifiant ensemble
+            self.conn.execute("BEGIN")
+            self.conn.execute("PRAGMA defer_foreign_keys=ON")
+            for name, entry in registry.items():
+                target = int(entry["id"])
+                current = self.nature_id(name, create=False)
+                if current == target:
+                    continue
+                occupant = self.conn.execute("SELECT name FROM natures WHERE id = ?", (target,)).fetchone()
+                if occupant:
+                    free_id = max(registry_ids + [self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM natures").fetchone()[0]]) + 1
+                    self._move_nature(target, free_id)
+                if current is None:
+                    self.conn.execute("INSERT INTO natures (id, name) VALUES (?, ?)", (target, name))
+                else:
+                    self._move_nature(current, target)
+        return len(registry)
+
+    def natures(self):
+        return pd.read_sql("SELECT id, name FROM natures ORDER BY id", self.conn)
+
+    # --- Écriture ---
+
+    def upsert_awards(self, records, nature=None, categorie=None):
+        """Ajoute ou met à jour des résultats attribués (bruts du scraper ou nettoyés).
+
+        `nature` (nature de prestation, registre natures) s'applique aux enregistrements sans champ
+        « nature » ; `categorie` est la catégorie du scraper (fournitures, services, traveaux), rangée
+        dans sa propre colonne. Retourne le nombre écrit.
+        """
+        records = [r for r in records if r and r.get("reference")]
+        montants = parse_montants(r.get("montant") for r in records)
+        rows = []
+        for record, montant in zip(records, montants):
+            raw = record.get("montant")
+            rows.append((
+                record["reference"].strip(),
+                (record.get("objet") or "").strip(),
+                (record.get("acheteur") or "").strip(),
+                self.nature_id(record.get("nature") or nature),
+                _iso(record.get("date_publication")),
+                _int(record.get("nombre_devis")),
+                record.get("entreprise_attributaire") or record.get("attributaire"),
+                montant,
+                raw if isinstance(raw, str) else None,
+                categorie,
+            ))
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO awards (reference, objet, acheteur, nature_id, date_publication, nombre_devis, "
+                "attributaire, montant, montant_texte, categorie) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (reference, objet, acheteur) DO UPDATE SET "
+                "nature_id = COALESCE(excluded.nature_id, nature_id), "
+                "date_publication = COALESCE(excluded.date_publication, date_publication), "
+                "nombre_devis = COALESCE(excluded.nombre_devis, nombre_devis), "
+                "attributaire = COALESCE(excluded.attributaire, attributaire), "
+                "montant = COALESCE(excluded.montant, montant), "
+                "montant_texte = COALESCE(excluded.montant_texte, montant_texte), "
+                "categorie = COALESCE(excluded.categorie, categorie)",
+                rows,
+            )
+        return len(rows)
+
+    def upsert_details(self, records):
+        """Ajoute ou remplace des pages de détail (format de common.detail_crawler) et leurs articles."""
+        count = 0
+        with self.conn:
+            for record in records:
+                if not record or record.get("id") is None:
+                    continue
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO details (id, reference, objet, acheteur, nature_id, categorie, lieu, "
+                    "date_mise_en_ligne, date_limite) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        int(record["id"]), (record.get("référence") or "").strip(), record.get("objet"),
+                        record.get("acheteur"), self.nature_id(record.get("nature")), record.get("catégorie"),
+                        record.get("lieu"), _iso(record.get("date_mise_en_ligne")), _iso(record.get("date_limite")),
+                    ),
+                )
+                self.conn.execute("DELETE FROM articles WHERE detail_id = ?", (int(record["id"]),))
+                self.conn.executemany(
+                    "INSERT INTO articles (detail_id, position, titre, quantite) VALUES (?, ?, ?, ?)",
+                    [(int(record["id"]), i, a.get("titre"), a.get("quantité"))
+                     for i, a in enumerate(record.get("articles") or [])],
+                )
+                count += 1
+        return count
+
+    def add_predictions(self, results, model):
+        """Enregistre les résultats d'une évaluation (reference, nature, predicted_interval, real_montant, correct)."""
+        created_at = datetime.now().isoformat(timespec="seconds")
+        rows = []
+        for result in results:
+            low, high = _interval_bounds(result.get("predicted_interval"))
+            rows.append((
+                model, str(result.get("reference", "")).strip(), self.nature_id(result.get("nature")),
+                result.get("predicted_interval"), low, high, result.get("real_montant"),
+                None if result.get("correct") is None else int(bool(result.get("correct"))), created_at,
+            ))
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO predictions (model, reference, nature_id, predicted_interval, interval_min, "
+                "interval_max, real_montant, correct, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        return len(rows)
+
+    # --- Lecture ---
+
+    def _select(self, table, columns, nature=None, start=None, end=None, last_days=None, buyer=None,
+                reference=None, model=None, categorie=None, limit=None):
+        date_column = DATE_COLUMNS[table]
+        if last_days is not None:
+            start = date.today() - timedelta(days=last_days)
+        conditions, params = [], []
+        if nature is not None:
+            conditions.append("n.name = ?" if isinstance(nature, str) else "t.nature_id = ?")
+            params.append(nature)
+        if start is not None:
+            conditions.append(f"t.{date_column} >= ?")
+            params.append(_iso(start))
+        if end is not None:
+            conditions.append(f"t.{date_column} < ?" if table == "predictions" else f"t.{date_column} <= ?")
+            params.append((parse_date(end) + timedelta(days=1)).isoformat() if table == "predictions" else _iso(end))
+        if buyer is not None:
+            conditions.append("t.acheteur = ?")
+            params.append(buyer)
+        if reference is not None:
+            conditions.append("t.reference = ?")
+            params.append(reference)
+        if model is not None:
+            conditions.append("t.model = ?")
+            params.append(model)
+        if categorie is not None:
+            conditions.append("t.categorie = ?")
+            params.append(categorie)
+
+        selected = ", ".join("n.name AS nature" if c == "nature" else f"t.{c}" for c in columns)
+        sql = f"SELECT {selected} FROM {table} t LEFT JOIN natures n ON n.id = t.nature_id"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += f" ORDER BY t.{date_column}, t.id"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return pd.read_sql(sql, self.conn, params=params)
+
+    def awards(self, nature=None, start=None, end=None, last_days=None, buyer=None, reference=None,
+               columns=None, limit=None, categorie=None):
+        """Résultats attribués filtrés (nature par nom ou identifiant, catégorie, dates incluses, acheteur exact) en DataFrame."""
+        return self._select("awards", columns or AWARD_COLUMNS, nature, start, end, last_days, buyer, reference,
+                            categorie=categorie, limit=limit)
+
+    def awards_array(self, column="montant", **filters):
+        """Une colonne des résultats filtrés en tableau NumPy (ex. les montants d'une nature)."""
+        return self.awards(columns=[column], **filters)[column].to_numpy()
+
+    def details(self, nature=None, start=None, end=None, last_days=None, buyer=None, reference=None,
+                columns=None, limit=None):
+        return self._select("details", columns or DETAIL_COLUMNS, nature, start, end, last_days, buyer, reference,
+                            limit=limit)
+
+    def articles(self, detail_ids=None):
+        sql = "SELECT detail_id, position, titre, quantite FROM articles"
+        params = []
+        if detail_ids is not None:
+            detail_ids = [int(i) for i in detail_ids]
+            sql += f" WHERE detail_id IN ({', '.join('?' * len(detail_ids))})"
+            params = detail_ids
+        return pd.read_sql(sql + " ORDER BY detail_id, position", self.conn, params=params)
+
+    def predictions(self, model=None, nature=None, start=None, end=None, last_days=None, reference=None,
+                    columns=None, limit=None):
+        return self._select("predictions", columns or PREDICTION_COLUMNS, nature, start, end, last_days,
+                            reference=reference, model=model, limit=limit)
+
+    def query(self, sql, params=()):
+        """Requête SQL libre en DataFrame (pour les analyses ponctuelles)."""
+        return pd.read_sql(sql, self.conn, params=params)
+
+
+def _load(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            return [json.loads(line) for line in f if line.strip()]
+        data = json.load(f)
+    return data if isinstance(data, list) else [data]
+
+
+def main(args):
+    usage = ("Usage : python -m common.consultation_store awards <catégorie> <fichier> [...]\n"
+             "        python -m common.consultation_store details <fichier> [...]\n"
+             "        python -m common.consultation_store natures <natures.json>\n"
+             "        python -m common.consultation_store predictions <modèle> <fichier> [...]")
+    if len(args) < 2:
+        print(usage)
+        return 1
+    with ConsultationStore() as store:
+        if args[0] == "awards" and len(args) >= 3:
+            count = sum(store.upsert_awards(_load(path), categorie=args[1]) for path in args[2:])
+        elif args[0] == "details":
+            count = sum(store.upsert_details(_load(path)) for path in args[1:])
+        elif args[0] == "natures":
+            with open(args[1], 'r', encoding='utf-8') as f:
+                count = store.sync_natures(json.load(f))
+        elif args[0] == "predictions" and len(args) >= 3:
+            count = sum(store.add_predictions(_load(path), args[1]) for path in args[2:])
+        else:
+            print(usage)
+            return 1
+    print(f"✅ {count} enregistrements ({args[0]}) importés dans {DEFAULT_PATH}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,183 @@
+"""Stockage colonnaire (Parquet) des consultations nettoyées, partitionné par nature et par jour.
+
+Arborescence : <racine>/nature=<nature>/day=<AAAA-MM-JJ>/part-0.parquet (day=unknown pour les
+enregistrements sans date de publication). Colonnes typées : reference, objet, acheteur
+(texte), montant (float64) et date_publication (date). La lecture ne charge que les colonnes
+demandées et applique les filtres (nature, dates, montant...) au niveau des partitions et des
+statistiques Parquet, au lieu de json.load de tout attributed_cleaned.json.
+
+Import des fichiers JSON existants (nettoyés ou bruts) :
+
+    python -m common.dataset_store import fournitures traitementParCategories/fournitures/data/attributed_cleaned.json
+
+L'import écrit un marqueur (_history.json) dans le dossier de la nature : load_cleaned ne lit
+le stockage à la place du fichier JSON que pour une nature importée avec tout son historique,
+pas pour une nature qui ne contient que les quelques jours ajoutés par un scraper quotidien.
+"""
+import json
+import operator
+import os
+import shutil
+import sys
+from urllib.parse import quote, unquote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from common.cleaning import parse_date, parse_montants
+
+DEFAULT_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "dataset")
+
+SCHEMA = pa.schema([
+    ("reference", pa.string()),
+    ("objet", pa.string()),
+    ("acheteur", pa.string()),
+    ("montant", pa.float64()),
+    ("date_publication", pa.date32()),
+])
+COLUMNS = SCHEMA.names
+UNKNOWN_DAY = "unknown"
+HISTORY_MARKER = "_history.json"
+FRAGMENT_READAHEAD = 32
+
+_DAY_PARTITIONING = ds.partitioning(pa.schema([("day", pa.string())]), flavor="hive")
+
+
+def to_table(records):
+    """Enregistrements bruts ou nettoyés -> table Arrow typée (montant texte converti, date parsée)."""
+    columns = {name: [] for name in COLUMNS}
+    for item in records:
+        if not item:
+            continue
+        columns["reference"].append(item.get("reference"))
+        columns["objet"].append(item.get("objet"))
+        columns["acheteur"].append(item.get("acheteur"))
+        columns["montant"].append(item.get("montant"))
+        columns["date_publication"].append(parse_date(item.get("date_publication")))
+    columns["montant"] = parse_montants(columns["montant"])
+    return pa.table(columns, schema=SCHEMA)
+
+
+def nature_dir(nature, root=DEFAULT_ROOT):
+    return os.path.join(root, f"nature={quote(str(nature), safe='')}")
+
+
+def write_records(nature, records, root=DEFAULT_ROOT, replace=False):
+    """Écrit les enregistrements d'une nature, un fichier Parquet par jour de publication.
+
+    Dans chaque jour touché, les nouveaux enregistrements remplacent ceux de même référence
+    (les autres sont conservés) ; avec replace=True, tous les jours de la nature sont réécrits à
+    partir de `records` (le marqueur d'historique est conservé). Retourne le nombre
+    d'enregistrements écrits.
+    """
+    table = to_table(records)
+    base = nature_dir(nature, root)
+    if replace and os.path.isdir(base):
+        for name in os.listdir(base):
+            if name.startswith("day="):
+                shutil.rmtree(os.path.join(base, name))
+
+    days = pc.strftime(table["date_publication"], format="%Y-%m-%d").fill_null(UNKNOWN_DAY)
+    for day in pc.unique(days).to_pylist():
+        part = table.filter(pc.equal(days, day))
+        directory = os.path.join(base, f"day={day}")
+        path = os.path.join(directory, "part-0.parquet")
+        if os.path.exists(path):
+            existing = pq.read_table(path, schema=SCHEMA)
+            kept = existing.filter(pc.invert(pc.is_in(existing["reference"], value_set=part["reference"])))
+            part = pa.concat_tables([kept, part])
+        os.makedirs(directory, exist_ok=True)
+        pq.write_table(part.sort_by("reference"), path + ".tmp", compression="zstd")
+        os.replace(path + ".tmp", path)
+    return table.num_rows
+
+
+def natures(root=DEFAULT_ROOT):
+    """Natures présentes dans le stockage."""
+    if not os.path.isdir(root):
+        return []
+    return sorted(unquote(name.split("=", 1)[1]) for name in os.listdir(root) if name.startswith("nature="))
+
+
+def has_nature(nature, root=DEFAULT_ROOT):
+    return os.path.isdir(nature_dir(nature, root))
+
+
+def has_history(nature, root=DEFAULT_ROOT):
+    """Vrai si la nature a été remplie par import_json (historique complet, et non quelques jours)."""
+    return os.path.exists(os.path.join(nature_dir(nature, root), HISTORY_MARKER))
+
+
+def _dataset(nature, root):
+    if nature is not None:
+        return ds.dataset(nature_dir(nature, root), format="parquet", schema=SCHEMA.append(pa.field("day", pa.string())),
+                          partitioning=_DAY_PARTITIONING)
+    partitioning = ds.partitioning(pa.schema([("nature", pa.string()), ("day", pa.string())]), flavor="hive")
+    return ds.dataset(root, format="parquet", partitioning=partitioning)
+
+
+def read_table(nature=None, columns=None, start=None, end=None, filter=None, root=DEFAULT_ROOT):
+    """Lit le stockage en table Arrow.
+
+    `columns` restreint les colonnes lues ; `start` / `end` (date ou AAAA-MM-JJ, inclus) filtrent
+    sur date_publication en élaguant d'abord les partitions jour ; `filter` est une expression
+    pyarrow.dataset supplémentaire, ex. ds.field("montant") > 10000.
+    """
+    dataset = _dataset(nature, root)
+    expression = filter
+    for bound, compare in ((start, operator.ge), (end, operator.le)):
+        if bound is None:
+            continue
+        day = parse_date(bound) if isinstance(bound, str) else bound
+        condition = (compare(ds.field("day"), day.isoformat())
+                     & (ds.field("day") != UNKNOWN_DAY)
+                     & compare(ds.field("date_publication"), pa.scalar(day, pa.date32())))
+        expression = condition if expression is None else expression & condition
+    # Une année = ~365 petits fichiers : on en lit davantage en parallèle que la valeur par défaut (4)
+    return dataset.to_table(columns=columns or COLUMNS, filter=expression, fragment_readahead=FRAGMENT_READAHEAD)
+
+
+def read_frame(nature=None, columns=None, start=None, end=None, filter=None, root=DEFAULT_ROOT):
+    """Comme read_table, en DataFrame pandas (date_publication en datetime64)."""
+    return read_table(nature, columns, start, end, filter, root).to_pandas(date_as_object=False)
+
+
+def load_cleaned(nature, json_path=None, columns=None, root=DEFAULT_ROOT, **filters):
+    """DataFrame des données nettoyées d'une nature : depuis le stockage Parquet s'il contient l'historique
+    importé de la nature, sinon depuis l'ancien fichier JSON `json_path`. Retourne None si aucune source n'existe."""
+    if has_history(nature, root):
+        return read_frame(nature, columns, root=root, **filters)
+    if json_path is None or not os.path.exists(json_path):
+        return None
+    with open(json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if not isinstance(data, list):
+        data = [data]
+    df = pd.DataFrame(data)
+    return df[[c for c in columns if c in df.columns]] if columns else df
+
+
+def import_json(nature, paths, root=DEFAULT_ROOT):
+    """Importe des fichiers JSON (liste d'enregistrements) dans le stockage, en remplaçant la nature."""
+    records = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        records.extend(data if isinstance(data, list) else [data])
+    count = write_records(nature, records, root, replace=True)
+    # Marqueur d'historique complet (conservé par les réécritures suivantes de la nature)
+    os.makedirs(nature_dir(nature, root), exist_ok=True)
+    with open(os.path.join(nature_dir(nature, root), HISTORY_MARKER), 'w', encoding='utf-8') as f:
+        json.dump({"sources": [os.path.abspath(p) for p in paths], "count": count}, f, ensure_ascii=False)
+    print(f"✅ {count} enregistrements importés pour la nature '{nature}' dans {nature_dir(nature, root)}")
+    return count
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4 or sys.argv[1] != "import":
+        print("Usage : python -m common.dataset_store import <nature> <fichier.json> [...]")
+        sys.exit(1)
+    import_json(sys.argv[2], sys.argv[3:])
@@ -0,0 +1,63 @@
+"""Planification des scrapers quotidiens sur une fenêtre de dates.
+
+Au lieu de traiter les jours l'un après l'autre (nombre de pages, puis pages, puis attente),
+le nombre de pages de toutes les dates est découvert en parallèle, puis chaque couple
+(date, page) est soumis à un seul pool de workers partagé. Une date est finalisée dès que
+sa dernière page est terminée, sans attendre les autres.
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+from tqdm import tqdm
+
+DATE_FORMAT = "%d/%m/%Y"
+
+
+def date_window(start, end):
+    """Retourne les dates jj/mm/aaaa de start à end inclus (chaînes ou datetime)."""
+    if isinstance(start, str):
+        start = datetime.strptime(start, DATE_FORMAT)
+    if isinstance(end, str):
+        end = datetime.strptime(end, DATE_FORMAT)
+    current, last = start.date(), end.date()
+    dates = []
+    while current <= last:
+        dates.append(current.strftime(DATE_FORMAT))
+        current += timedelta(days=1)
+    return dates
+
+
+def discover_pages(dates, get_max_page, max_workers=8):
+    """Appelle get_max_page(date) pour toutes les dates en parallèle ; retourne {date: (pages, total)}."""
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(get_max_page, date_str): date_str for date_str in dates}
+        found = {futures[f]: f.result() for f in as_completed(futures)}
+    return {date_str: found[date_str] for date_str in dates}
+
+
+def run_plan(plan, fetch_page, on_records, on_date_done=None, max_workers=8, desc="📄 Pages"):
+    """Exécute tous les couples (date, page) du plan sur un pool partagé.
+
+    fetch_page(page, date) est appelé pour chaque page ; on_records(date, records) reçoit le
+    résultat de chaque page terminée et on_date_done(date) est appelé quand toutes les pages
+    d'une date sont terminées. Les jobs sont soumis date par date, les premières dates se
+    terminent donc en premier.
+    """
+    remaining = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+        for date_str, (max_pages, _) in plan.items():
+            remaining[date_str] = max_pages
+            if not max_pages and on_date_done:
+                on_date_done(date_str)
+            for page in range(1, max_pages + 1):
+                futures[executor.submit(fetch_page, page, date_str)] = date_str
+
+        for future in tqdm(as_completed(futures), total=len(futures), desc=desc):
+            date_str = futures[future]
+            result = future.result()
+            if result:
+                on_records(date_str, result)
+            remaining[date_str] -= 1
+            if not remaining[date_str] and on_date_done:
+                on_date_done(date_str)
@@ -0,0 +1,158 @@
+"""Index persistant des doublons (reference, objet, acheteur) des fichiers attributed_*.json.
+
+L'index (SQLite) garde, pour chaque clé normalisée (empreinte blake2b des trois champs),
+le nombre d'occurrences et les enregistrements correspondants, ainsi que la liste des
+fichiers déjà ingérés (taille, date de modification). Chaque exécution n'ingère que les
+fichiers nouveaux ou modifiés : le coût suit les nouveaux jours et non tout l'historique,
+et « est-ce un doublon ? » est une recherche par clé primaire.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+
+_EDGES = re.compile(r"^[\s#:]+|[\s#:]+$")
+KEY_FIELDS = ("reference", "objet", "acheteur")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    name TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    records INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS keys (
+    key BLOB PRIMARY KEY,
+    count INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS occurrences (
+    key BLOB NOT NULL,
+    file TEXT NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS occurrences_key ON occurrences (key);
+CREATE INDEX IF NOT EXISTS occurrences_file ON occurrences (file);
+"""
+
+
+def normalize(text):
+    """Normalisation des champs de la clé : espaces, # et : retirés aux extrémités, majuscules."""
+    if not isinstance(text, str):
+        return ""
+    return _EDGES.sub("", text).strip().upper()
+
+
+def dedup_key(record):
+    """Empreinte (16 octets) de la clé (reference, objet, acheteur) normalisée."""
+    joined = "\x1f".join(normalize(record.get(field)) for field in KEY_FIELDS)
+    return hashlib.blake2b(joined.encode("utf-8"), digest_size=16).digest()
+
+
+class DedupIndex:
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _forget_file(self, name):
+        """Retire les occurrences d'un fichier (ré-ingestion d'un fichier modifié)."""
+        rows = self.conn.execute(
+            "SELECT key, COUNT(*) FROM occurrences WHERE file = ? GROUP BY key", (name,)
+        ).fetchall()
+        self.conn.executemany("UPDATE keys SET count = count - ? WHERE key = ?", [(n, key) for key, n in rows])
+        self.conn.execute("DELETE FROM keys WHERE count <= 0")
+        self.conn.execute("DELETE FROM occurrences WHERE file = ?", (name,))
+        self.conn.execute("DELETE FROM files WHERE name = ?", (name,))
+
+    def ingest_file(self, path):
+        """Ingère un fichier JSON (liste d'enregistrements) s'il est nouveau ou a changé.
+
+        Retourne le nombre d'enregistrements ajoutés, None si le fichier était déjà à jour.
+        Les enregistrements sans reference/objet/acheteur texte sont ignorés (avec un avertissement).
+        """
+        name = os.path.basename(path)
+        stat = os.stat(path)
+        known = self.conn.execute("SELECT size, mtime FROM files WHERE name = ?", (name,)).fetchone()
+        if known == (stat.st_size, stat.st_mtime):
+            return None
+
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        rows = []
+        for record in data:
+            if not record:
+                continue
+            if not all(isinstance(record.get(field), str) for field in KEY_FIELDS):
+                print(f"[⚠️] Enregistrement incomplet ignoré dans {name} : {record.get('reference')}")
+                continue
+            rows.append((dedup_key(record), name, json.dumps(record, ensure_ascii=False)))
+
+        with self.conn:
+            if known is not None:
+                self._forget_file(name)
+            self.conn.executemany("INSERT INTO occurrences (key, file, record) VALUES (?, ?, ?)", rows)
+            self.conn.executemany(
+                "INSERT INTO keys (key, count) VALUES (?, 1) ON CONFLICT (key) DO UPDATE SET count = count + 1",
+                [(row[0],) for row in rows],
+            )
+            self.conn.execute(
+                "INSERT INTO files (name, size, mtime, records) VALUES (?, ?, ?, ?)",
+                (name, stat.st_size, stat.st_mtime, len(rows)),
+            )
+        return len(rows)
+
+    def ingest_dir(self, directory, prefix="attributed_"):
+        """Ingère les fichiers <prefix>*.json nouveaux ou modifiés du dossier ; retourne {fichier: nb}."""
+        ingested = {}
+        for filename in sorted(os.listdir(directory)):
+            if not (filename.startswith(prefix) and filename.endswith(".json")):
+                continue
+            try:
+                count = self.ingest_file(os.path.join(directory, filename))
+            except json.JSONDecodeError as e:
+                print(f"[⚠️] Erreur de lecture JSON dans {filename} : {e}")
+                continue
+            if count is not None:
+                ingested[filename] = count
+        return ingested
+
+    def is_duplicate(self, record):
+        """Vrai si la clé de l'enregistrement apparaît plus d'une fois dans les fichiers ingérés."""
+        row = self.conn.execute("SELECT count FROM keys WHERE key = ?", (dedup_key(record),)).fetchone()
+        return row is not None and row[0] > 1
+
+    def duplicate_groups(self):
+        """Itère sur les groupes de doublons : listes d'enregistrements de même clé."""
+        cursor = self.conn.execute(
+            "SELECT o.key, o.record FROM occurrences o JOIN keys k ON k.key = o.key "
+            "WHERE k.count > 1 ORDER BY o.key, o.rowid"
+        )
+        group, current = [], None
+        for key, record in cursor:
+            if key != current and group:
+                yield group
+                group = []
+            current = key
+            group.append(json.loads(record))
+        if group:
+            yield group
+
+    def stats(self):
+        files, records = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(records), 0) FROM files").fetchone()
+        groups = self.conn.execute("SELECT COUNT(*) FROM keys WHERE count > 1").fetchone()[0]
+        return {"files": files, "records": records, "duplicate_groups": groups}
@@ -0,0 +1,178 @@
+"""Crawler des pages de détail /consultation/show/{id} avec pool de connexions partagé.
+
+- une seule session (pool de connexions dimensionné sur le nombre de workers) ;
+- au plus `max_in_flight` IDs soumis à la fois : la mémoire ne dépend pas de la largeur de la plage ;
+- retry avec backoff exponentiel (+ gigue) au lieu d'une pause fixe ;
+- détection des trous : après `gap_threshold` pages « sans contenu structuré » consécutives,
+  le pas entre IDs sondés double (jusqu'à `max_stride`). Dès qu'une page valide est trouvée,
+  le pas revient à 1 et les IDs sautés autour d'elle sont repris, pour ne pas perdre le début
+  d'une zone peuplée.
+"""
+import os
+import random
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+
+from common.http_cache import CacheMiss
+
+BASE_URL = os.environ.get("MARCHES_BASE_URL", "https://www.marchespublics.gov.ma") + "/bdc/entreprise/consultation/show/"
+
+# Statuts d'une page de détail
+FOUND = "found"
+EMPTY = "empty"            # « Page sans contenu structuré » : ID inexistant
+INCOMPLETE = "incomplete"  # la consultation existe mais les détails sont incomplets
+FAILED = "failed"          # échec réseau après tous les essais
+
+
+def parse_detail(html, id_):
+    """Retourne (statut, enregistrement) pour le HTML d'une page de détail."""
+    soup = BeautifulSoup(html, "lxml")
+
+    h4 = soup.find("h4")
+    objet_tag = soup.find("span", class_="text-black")
+    if not h4 or not objet_tag:
+        return EMPTY, None
+
+    details = soup.find_all("div", class_="d-flex flex-column")
+    if len(details) < 6:
+        return INCOMPLETE, None
+
+    articles = []
+    for item in soup.find_all("div", class_="accordion-item"):
+        titre = item.find("button", class_="accordion-button").get_text(strip=True)
+        sous_cartes = item.find_all("div", class_="content__article--subMiniCard")
+        quantite = sous_cartes[1].text.strip() if len(sous_cartes) > 1 else "N/A"
+        articles.append({
+            "titre": titre,
+            "quantité": quantite
+        })
+
+    return FOUND, {
+        "id": id_,
+        "référence": h4.text.strip(),
+        "objet": objet_tag.text.strip(),
+        "acheteur": details[0].find_all("span")[1].text.strip(),
+        "date_mise_en_ligne": details[1].find_all("span")[1].text.strip(),
+        "date_limite": details[2].find_all("span")[1].text.strip(),
+        "lieu": details[3].find_all("span")[1].text.strip(),
+        "catégorie": details[4].find_all("span")[1].text.strip(),
+        "nature": details[5].find_all("span")[1].text.strip(),
+        "articles": articles
+    }
+
+
+def backoff_delay(attempt, base, maximum):
+    """Pause avant l'essai suivant : base × 2^attempt, plafonnée, avec gigue de ±50 %."""
+    return min(maximum, base * 2 ** attempt) * random.uniform(0.5, 1.5)
+
+
+def share_session(session, pool_size):
+    """Dimensionne le pool de connexions de la session pour `pool_size` threads."""
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def fetch_detail(session, id_, retries, timeout, backoff_base, backoff_max):
+    """Télécharge et parse une page de détail. Retourne (id, statut, enregistrement)."""
+    url = f"{BASE_URL}{id_}"
+    for attempt in range(retries):
+        try:
+            response = session.get(url, timeout=timeout)
+            if 400 <= response.status_code < 500 and response.status_code != 429:
+                return id_, EMPTY, None
+            response.raise_for_status()
+            status, record = parse_detail(response.text, id_)
+            return id_, status, record
+        except CacheMiss:
+            return id_, FAILED, None
+        except requests.RequestException as e:
+            print(f"[{id_}] Échec tentative {attempt + 1}/{retries}: {e}")
+            time.sleep(backoff_delay(attempt, backoff_base, backoff_max))
+    print(f"[{id_}] Abandon après {retries} tentatives.")
+    return id_, FAILED, None
+
+
+def crawl_details(start_id, end_id, on_record, session=None, max_workers=10, max_in_flight=None,
+                  retries=8, timeout=60, backoff_base=0.5, backoff_max=30,
+                  gap_threshold=20, max_stride=64):
+    """Parcourt les IDs de start_id à end_id et appelle on_record(enregistrement) pour chaque page valide.
+
+    Retourne un dict de compteurs par statut (+ "skipped" : IDs jamais demandés dans les trous).
+    """
+    if session is None:
+        session = requests.Session()
+        session.headers.update({"User-Agent": "Mozilla/5.0"})
+    share_session(session, max_workers)
+    max_in_flight = max_in_flight or 4 * max_workers
+
+    stats = {FOUND: 0, EMPTY: 0, INCOMPLETE: 0, FAILED: 0, "skipped": 0}
+    backfill = deque()   # IDs sautés à reprendre en priorité
+    skipped = []         # plages (début, fin) sautées par la détection de trous
+    next_id = start_id
+    stride = 1
+    empty_streak = 0
+
+    def next_to_submit():
+        nonlocal next_id
+        if backfill:
+            return backfill.popleft()
+        if next_id > end_id:
+            return None
+        id_ = next_id
+        if stride > 1:
+            skip_end = min(id_ + stride - 1, end_id)
+            if skip_end > id_:
+                skipped.append((id_ + 1, skip_end))
+        next_id += stride
+        return id_
+
+    def resume_around(id_):
+        """Reprend les plages sautées adjacentes à une page valide (avant et après elle)."""
+        keep = []
+        for start, end in skipped:
+            if end == id_ - 1 or start > id_:
+                backfill.extend(range(start, end + 1))
+            else:
+                keep.append((start, end))
+        skipped[:] = keep
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = set()
+        while True:
+            while len(in_flight) < max_in_flight:
+                id_ = next_to_submit()
+                if id_ is None:
+                    break
+                in_flight.add(executor.submit(
+                    fetch_detail, session, id_, retries, timeout, backoff_base, backoff_max
+                ))
+            if not in_flight:
+                break
+
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                id_, status, record = future.result()
+                stats[status] += 1
+                if status == EMPTY:
+                    empty_streak += 1
+                    if empty_streak >= gap_threshold and stride < max_stride:
+                        stride = min(stride * 2, max_stride)
+                        empty_streak = 0
+                        print(f"[crawl_details] Trou détecté vers {id_}, pas = {stride}")
+                elif status in (FOUND, INCOMPLETE):
+                    if stride > 1 or skipped:
+                        resume_around(id_)
+                    stride = 1
+                    empty_streak = 0
+                    if record is not None:
+                        on_record(record)
+
+    stats["skipped"] = sum(end - start + 1 for start, end in skipped)
+    return stats
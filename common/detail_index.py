@@ -0,0 +1,201 @@
+"""Index sur disque des consultations détaillées pour la fusion avec les fichiers attributed_*.json.
+
+Les fichiers consultations.ndjson (crawl des détails) sont ingérés à partir du dernier octet
+déjà lu, tant que l'empreinte des octets déjà lus n'a pas changé (un fichier réécrit par
+scraper_details.py est relu depuis le début) ; chaque consultation est rangée sous la clé (référence, objet,
+acheteur) normalisée de common.dedup_index, la dernière vue l'emportant. La fusion consulte
+l'index clé par clé au lieu de charger tout le corpus de détails en mémoire.
+
+L'index garde aussi, pour chaque fichier attributed_*.json déjà fusionné, sa taille, sa date
+de modification et les clés fusionnées / non trouvées. Un fichier n'est retraité que s'il est
+nouveau ou modifié, si une consultation est apparue (ou a été remplacée) pour l'une de ses
+clés, ou si l'une de ses clés fusionnées est devenue un doublon (index des doublons attaché).
+"""
+import json
+import os
+import sqlite3
+
+from common.dedup_index import dedup_key
+from common.file_fingerprint import fingerprint
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY,
+    offset INTEGER NOT NULL,
+    fingerprint TEXT
+);
+CREATE TABLE IF NOT EXISTS details (
+    key BLOB PRIMARY KEY,
+    record TEXT NOT NULL,
+    generation INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS processed (
+    name TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    generation INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS merged (
+    file TEXT NOT NULL,
+    key BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS unmatched (
+    file TEXT NOT NULL,
+    key BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS merged_file ON merged (file);
+CREATE INDEX IF NOT EXISTS unmatched_file ON unmatched (file);
+"""
+
+BATCH_SIZE = 5000
+
+
+def detail_key(consultation):
+    """Clé d'une consultation détaillée (champ « référence » accentué dans les fichiers de détails)."""
+    return dedup_key({
+        "reference": consultation.get("référence", ""),
+        "objet": consultation.get("objet", ""),
+        "acheteur": consultation.get("acheteur", ""),
+    })
+
+
+class DetailIndex:
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        # Index créé avant l'empreinte des sources : colonne ajoutée (les positions sans empreinte sont relues)
+        if "fingerprint" not in [column[1] for column in self.conn.execute("PRAGMA table_info(sources)")]:
+            with self.conn:
+                self.conn.execute("ALTER TABLE sources ADD COLUMN fingerprint TEXT")
+        self.dedup_attached = False
+        # Génération de cette exécution : les consultations ajoutées ou remplacées la portent
+        self.generation = self.conn.execute(
+            "SELECT MAX((SELECT COALESCE(MAX(generation), 0) FROM details), "
+            "(SELECT COALESCE(MAX(generation), 0) FROM processed)) + 1"
+        ).fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def attach_dedup(self, dedup_path):
+        """Attache l'index des doublons (common.dedup_index) pour détecter les clés devenues doublons."""
+        if dedup_path and os.path.exists(dedup_path):
+            self.conn.execute("ATTACH DATABASE ? AS dedup", (dedup_path,))
+            self.dedup_attached = True
+
+    # --- Consultations détaillées ---
+
+    def ingest_ndjson(self, path):
+        """Ajoute les lignes complètes écrites depuis la dernière ingestion ; retourne leur nombre.
+
+        Un fichier réécrit (plus court que la position mémorisée, ou dont les octets déjà lus ont
+        changé) est relu depuis le début.
+        """
+        if not os.path.exists(path):
+            print(f"[⚠️] Fichier de consultations introuvable : {path}")
+            return 0
+        source = os.path.abspath(path)
+        row = self.conn.execute("SELECT offset, fingerprint FROM sources WHERE path = ?", (source,)).fetchone()
+        offset = row[0] if row else 0
+        if offset and (offset > os.path.getsize(path) or fingerprint(path, offset) != row[1]):
+            print(f"♻️  {path} a été réécrit : ingestion depuis le début")
+            offset = 0
+
+        count = 0
+        batch = []
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # ligne en cours d'écriture : reprise au prochain passage
+                offset += len(line)
+                if not line.strip():
+                    continue
+                try:
+                    consultation = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                batch.append((detail_key(consultation), json.dumps(consultation, ensure_ascii=False), self.generation))
+                if len(batch) >= BATCH_SIZE:
+                    count += self._store(batch)
+                    batch = []
+        count += self._store(batch)
+
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO sources (path, offset, fingerprint) VALUES (?, ?, ?) "
+                "ON CONFLICT (path) DO UPDATE SET offset = excluded.offset, fingerprint = excluded.fingerprint",
+                (source, offset, fingerprint(path, offset)),
+            )
+        return count
+
+    def _store(self, rows):
+        if rows:
+            with self.conn:
+                self.conn.executemany("INSERT OR REPLACE INTO details (key, record, generation) VALUES (?, ?, ?)", rows)
+        return len(rows)
+
+    def lookup(self, record):
+        """Consultation détaillée correspondant à un enregistrement attribué, None si absente."""
+        row = self.conn.execute("SELECT record FROM details WHERE key = ?", (dedup_key(record),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    # --- Fichiers attribués déjà fusionnés ---
+
+    def files_to_process(self, directory, prefix="attributed_"):
+        """Fichiers <prefix>*.json du dossier à (re)fusionner, triés par nom."""
+        known = {name: (size, mtime) for name, size, mtime in self.conn.execute("SELECT name, size, mtime FROM processed")}
+        # Consultation apparue pour une clé non trouvée, ou remplacée pour une clé déjà fusionnée
+        stale = {name for (name,) in self.conn.execute(
+            "SELECT DISTINCT u.file FROM unmatched u JOIN details d ON d.key = u.key"
+        )}
+        stale.update(name for (name,) in self.conn.execute(
+            "SELECT DISTINCT m.file FROM merged m JOIN processed p ON p.name = m.file "
+            "JOIN details d ON d.key = m.key WHERE d.generation > p.generation"
+        ))
+        if self.dedup_attached:
+            stale.update(name for (name,) in self.conn.execute(
+                "SELECT DISTINCT m.file FROM merged m JOIN dedup.keys k ON k.key = m.key WHERE k.count > 1"
+            ))
+
+        files = []
+        for filename in sorted(os.listdir(directory)):
+            if not (filename.startswith(prefix) and filename.endswith(".json")):
+                continue
+            stat = os.stat(os.path.join(directory, filename))
+            if filename in stale or known.get(filename) != (stat.st_size, stat.st_mtime):
+                files.append(filename)
+        return files
+
+    def mark_processed(self, path, merged_records, unmatched_records):
+        """Mémorise le résultat de la fusion d'un fichier (clés fusionnées et non trouvées)."""
+        name = os.path.basename(path)
+        stat = os.stat(path)
+        with self.conn:
+            self.conn.execute("DELETE FROM merged WHERE file = ?", (name,))
+            self.conn.execute("DELETE FROM unmatched WHERE file = ?", (name,))
+            self.conn.executemany("INSERT INTO merged (file, key) VALUES (?, ?)",
+                                  [(name, dedup_key(r)) for r in merged_records])
+            self.conn.executemany("INSERT INTO unmatched (file, key) VALUES (?, ?)",
+                                  [(name, dedup_key(r)) for r in unmatched_records])
+            self.conn.execute(
+                "INSERT OR REPLACE INTO processed (name, size, mtime, generation) VALUES (?, ?, ?, ?)",
+                (name, stat.st_size, stat.st_mtime, self.generation),
+            )
+
+    def stats(self):
+        return {
+            "details": self.conn.execute("SELECT COUNT(*) FROM details").fetchone()[0],
+            "processed_files": self.conn.execute("SELECT COUNT(*) FROM processed").fetchone()[0],
+        }
@@ -0,0 +1,220 @@
+"""Cache partagé des embeddings SentenceTransformer, indexé par (modèle, empreinte du texte).
+
+Les scripts d'entraînement et d'évaluation encodaient tous leurs textes à chaque run (et le
+seul cache existant, embeddings_fournitures.npy, n'était associé à aucune donnée : il restait
+faux quand le fichier source changeait). Ici, pour chaque modèle, un dossier
+store/embeddings/<modèle>/ contient :
+
+- vectors.f32 : les vecteurs float32 mis bout à bout (une ligne par texte), relus en
+  mémoire mappée (np.memmap) ;
+- index.sqlite : empreinte blake2b du texte -> numéro de ligne, et le nombre de lignes
+  validées.
+
+embed_texts() ne calcule que les textes absents du cache (le modèle n'est chargé que s'il y
+en a) et ajoute leurs vecteurs à la fin du fichier. Un seul processus écrit à la fois
+(transaction SQLite « IMMEDIATE ») ; les vecteurs sont écrits avant la validation de
+l'index, si bien qu'un lecteur concurrent ne voit que des lignes complètes. Une écriture
+interrompue laisse au plus des octets non référencés, recouverts par l'ajout suivant.
+
+    python -m common.embedding_cache      # modèles en cache et nombre de vecteurs
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import threading
+
+import numpy as np
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "store", "embeddings")
+SEPARATOR = "\x1f"
+# Attente maximale (secondes) du verrou d'écriture tenu par un autre processus
+LOCK_TIMEOUT = 600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS embeddings (
+    key BLOB PRIMARY KEY,
+    row INTEGER NOT NULL
+);
+"""
+
+
+def model_slug(model_name):
+    return re.sub(r"[^A-Za-z0-9._-]+", "__", model_name)
+
+
+class EmbeddingCache:
+    """Vecteurs d'un modèle : index SQLite + fichier float32 en mémoire mappée."""
+
+    def __init__(self, model_name, directory=CACHE_DIR):
+        self.model_name = model_name
+        self.directory = os.path.join(directory, model_slug(model_name))
+        os.makedirs(self.directory, exist_ok=True)
+        self.vectors_path = os.path.join(self.directory, "vectors.f32")
+        self.conn = sqlite3.connect(os.path.join(self.directory, "index.sqlite"), timeout=LOCK_TIMEOUT,
+                                    isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self._vectors = None
+        self.hits = self.misses = 0
+
+    def close(self):
+        if self.conn is None:
+            return
+        self._vectors = None
+        self.conn.close()
+        self.conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def key(self, text):
+        return hashlib.blake2b(f"{self.model_name}{SEPARATOR}{text}".encode("utf-8"), digest_size=16).digest()
+
+    def _meta(self):
+        meta = dict(self.conn.execute("SELECT name, value FROM meta"))
+        return int(meta.get("count", 0)), int(meta["dim"]) if "dim" in meta else None
+
+    def __len__(self):
+        return self._meta()[0]
+
+    def _rows(self, keys):
+        rows = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows.update(self.conn.execute(
+                f"SELECT key, row FROM embeddings WHERE key IN ({', '.join('?' * len(chunk))})", chunk
+            ))
+        return rows
+
+    def vectors(self):
+        """Lignes validées du fichier, en mémoire mappée (lecture seule)."""
+        count, dim = self._meta()
+        if not count:
+            return np.empty((0, dim or 0), dtype=np.float32)
+        if self._vectors is None or len(self._vectors) != count:
+            self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(count, dim))
+        return self._vectors
+
+    def get_many(self, texts):
+        """Matrice des vecteurs en cache et masque des textes trouvés (alignés sur `texts`)."""
+        keys = [self.key(text) for text in texts]
+        rows = self._rows(list(dict.fromkeys(keys)))
+        found = np.array([key in rows for key in keys], dtype=bool)
+        self.hits += int(found.sum())
+        self.misses += len(texts) - int(found.sum())
+        vectors = self.vectors()
+        result = np.zeros((len(texts), vectors.shape[1]), dtype=np.float32)
+        if found.any():
+            result[found] = vectors[[rows[key] for key, ok in zip(keys, found) if ok]]
+        return result, found
+
+    def put_many(self, texts, vectors):
+        """Ajoute à la fin du fichier les vecteurs des textes qui n'y sont pas encore."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        keys = [self.key(text) for text in texts]
+        # Verrou d'écriture : un seul processus ajoute des lignes à la fois
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            count, dim = self._meta()
+            if dim is not None and vectors.shape[1] != dim:
+                raise ValueError(f"Dimension {vectors.shape[1]} incompatible avec le cache {self.directory} ({dim})")
+            # Textes ajoutés entre-temps par un autre processus (ou en double dans le lot)
+            existing = self._rows(keys)
+            new = {}
+            for i, key in enumerate(keys):
+                if key not in existing and key not in new:
+                    new[key] = i
+            if new:
+                block = vectors[list(new.values())]
+                with open(self.vectors_path, "r+b" if os.path.exists(self.vectors_path) else "w+b") as f:
+                    f.seek(count * block.shape[1] * 4)
+                    f.write(block.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                self.conn.executemany("INSERT INTO embeddings (key, row) VALUES (?, ?)",
+                                      [(key, count + j) for j, key in enumerate(new)])
+                self.conn.executemany("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)",
+                                      [("count", str(count + len(new))), ("dim", str(block.shape[1])),
+                                       ("model", self.model_name)])
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        return len(new)
+
+
+_shared = {}
+_lock = threading.Lock()
+
+
+def shared_model(model_name):
+    """Modèle SentenceTransformer chargé une seule fois par processus, et seulement si besoin."""
+    if ("model", model_name) not in _shared:
+        from sentence_transformers import SentenceTransformer
+        _shared[("model", model_name)] = SentenceTransformer(model_name)
+    return _shared[("model", model_name)]
+
+
+def shared_cache(model_name):
+    """Cache du modèle ouvert une seule fois par processus (None si CACHE_DIR vaut None)."""
+    if ("cache", model_name) not in _shared:
+        _shared[("cache", model_name)] = EmbeddingCache(model_name, CACHE_DIR) if CACHE_DIR else None
+    return _shared[("cache", model_name)]
+
+
+def embed_texts(model_name, texts, batch_size=32, show_progress_bar=False):
+    """Embeddings float32 (n x dim) de `texts`, comme model.encode(texts), en ne calculant que les textes nouveaux."""
+    texts = [str(text) for text in texts]
+    # Les scripts appellent aussi embed_texts depuis des threads : cache et modèle ne servent qu'un appel à la fois
+    with _lock:
+        return _embed_texts(model_name, texts, batch_size, show_progress_bar)
+
+
+def _embed_texts(model_name, texts, batch_size, show_progress_bar):
+    cache = shared_cache(model_name)
+    if cache is None:
+        return np.asarray(shared_model(model_name).encode(texts, batch_size=batch_size,
+                                                          show_progress_bar=show_progress_bar), dtype=np.float32)
+
+    result, found = cache.get_many(texts)
+    if not found.all():
+        missing = list(dict.fromkeys(text for text, ok in zip(texts, found) if not ok))
+        computed = np.asarray(shared_model(model_name).encode(missing, batch_size=batch_size,
+                                                              show_progress_bar=show_progress_bar), dtype=np.float32)
+        cache.put_many(missing, computed)
+        if not found.any():
+            result = np.zeros((len(texts), computed.shape[1]), dtype=np.float32)
+        position = {text: i for i, text in enumerate(missing)}
+        rows = [position[text] for text, ok in zip(texts, found) if not ok]
+        result[~found] = computed[rows]
+    return result
+
+
+def main(args):
+    if not os.path.isdir(CACHE_DIR):
+        print(f"❌ Aucun cache d'embeddings dans {CACHE_DIR}")
+        return 1
+    for name in sorted(os.listdir(CACHE_DIR)):
+        index_path = os.path.join(CACHE_DIR, name, "index.sqlite")
+        if not os.path.exists(index_path):
+            continue
+        conn = sqlite3.connect(index_path)
+        meta = dict(conn.execute("SELECT name, value FROM meta"))
+        conn.close()
+        size = os.path.getsize(os.path.join(CACHE_DIR, name, "vectors.f32")) if meta else 0
+        print(f"📦 {meta.get('model', name)} : {meta.get('count', 0)} vecteurs de dimension {meta.get('dim', '?')} "
+              f"({size / 1e6:.1f} Mo)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,19 @@
+"""Empreinte des octets déjà lus d'un fichier en croissance (reprise des lectures incrémentales).
+
+Un lecteur qui mémorise sa position dans un fichier .jsonl garde aussi cette empreinte :
+si elle change, le fichier a été réécrit (et non simplement prolongé) et doit être relu
+depuis le début. Utilisée par nature_partitioner et detail_index.
+"""
+import hashlib
+
+FINGERPRINT_BYTES = 4096
+
+
+def fingerprint(path, offset):
+    """Empreinte des octets déjà lus : début du fichier et derniers octets avant `offset`."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        digest.update(f.read(min(offset, FINGERPRINT_BYTES)))
+        f.seek(max(0, offset - FINGERPRINT_BYTES))
+        digest.update(f.read(min(offset, FINGERPRINT_BYTES)))
+    return digest.hexdigest()
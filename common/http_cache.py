@@ -0,0 +1,115 @@
+"""Cache disque des réponses HTTP, avec mode rejeu hors ligne.
+
+Organisation du dossier de cache :
+    objects/ab/abcdef....html  corps bruts, adressés par leur SHA-256 (pages identiques stockées une fois)
+    index/12/1234....json      une entrée par URL : {url, fetched_at, sha256, encoding}
+
+Modes :
+    "off"     : pas de cache, réseau uniquement
+    "cache"   : sert les entrées de moins de `ttl` secondes (ttl=None : sans expiration), sinon réseau + écriture
+    "refresh" : toujours le réseau, mais enregistre chaque réponse (constitution d'un corpus)
+    "replay"  : cache uniquement, jamais de réseau ; une URL absente lève CacheMiss
+"""
+import hashlib
+import json
+import os
+import time
+
+import requests
+
+CACHE_MODES = ("off", "cache", "refresh", "replay")
+
+
+class CacheMiss(requests.RequestException):
+    """URL absente du cache en mode rejeu."""
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class HttpCache:
+    def __init__(self, cache_dir="http_cache", mode="off", ttl=None):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Mode de cache inconnu: {mode} (attendu: {', '.join(CACHE_MODES)})")
+        self.cache_dir = cache_dir
+        self.mode = mode
+        self.ttl = ttl
+
+    def _index_path(self, url):
+        key = _sha256(url.encode('utf-8'))
+        return os.path.join(self.cache_dir, "index", key[:2], f"{key}.json")
+
+    def _object_path(self, digest):
+        return os.path.join(self.cache_dir, "objects", digest[:2], f"{digest}.html")
+
+    @staticmethod
+    def _write_atomic(path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def lookup(self, url, ignore_ttl=False):
+        """Retourne (corps en octets, entrée d'index) ou None si absent / expiré."""
+        index_path = self._index_path(url)
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            if not ignore_ttl and self.ttl is not None and time.time() - entry["fetched_at"] > self.ttl:
+                return None
+            with open(self._object_path(entry["sha256"]), 'rb') as f:
+                return f.read(), entry
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def store(self, url, body, encoding=None):
+        digest = _sha256(body)
+        object_path = self._object_path(digest)
+        if not os.path.exists(object_path):
+            self._write_atomic(object_path, body)
+        entry = {"url": url, "fetched_at": time.time(), "sha256": digest, "encoding": encoding}
+        self._write_atomic(self._index_path(url), json.dumps(entry).encode('utf-8'))
+
+    def read(self, url):
+        """Applique le mode : (corps, entrée) si la réponse vient du cache, None s'il faut aller sur le réseau."""
+        if self.mode in ("cache", "replay"):
+            hit = self.lookup(url, ignore_ttl=self.mode == "replay")
+            if hit is not None:
+                return hit
+            if self.mode == "replay":
+                raise CacheMiss(f"Absent du cache: {url}")
+        return None
+
+    def write(self, url, body, encoding=None):
+        if self.mode in ("cache", "refresh"):
+            self.store(url, body, encoding)
+
+
+class CachedSession(requests.Session):
+    """requests.Session dont les GET passent par un HttpCache selon le mode choisi."""
+
+    def __init__(self, cache_dir="http_cache", mode="off", ttl=None):
+        super().__init__()
+        self.cache = HttpCache(cache_dir, mode, ttl)
+
+    @staticmethod
+    def _replayed_response(url, body, entry):
+        response = requests.Response()
+        response._content = body
+        response.status_code = 200
+        response.url = url
+        response.encoding = entry.get("encoding") or "utf-8"
+        response.headers["X-Cache-Fetched-At"] = str(entry["fetched_at"])
+        return response
+
+    def get(self, url, **kwargs):
+        hit = self.cache.read(url)
+        if hit is not None:
+            return self._replayed_response(url, *hit)
+
+        response = super().get(url, **kwargs)
+        if response.status_code == 200:
+            self.cache.write(url, response.content, response.encoding)
+        return response
@@ -0,0 +1,122 @@
+"""Index inversé mots-clés -> intervalles de montant d'une nature, pour la prédiction par recouvrement.
+
+Un fichier de mots-clés d'une nature ({"1000-2000": [mots...], ...}) devient :
+- tokens : identifiants (vocabulaire de common.token_store) triés des mots-clés ;
+- offsets / postings : pour chaque token, la liste des intervalles qui le contiennent.
+
+Le score d'un enregistrement pour chaque intervalle est le nombre de ses tokens présents dans
+l'intervalle (l'ancien len(tokens & set(mots_clés))) : on cumule les listes des tokens de
+l'enregistrement au lieu de parcourir tous les intervalles. Les scores de tout un lot
+d'enregistrements sont calculés en une fois avec np.bincount.
+
+L'index est enregistré à côté du fichier de mots-clés (<fichier>.index.npz), reconstruit si
+ce fichier change, et chargé une seule fois par processus (load_index).
+"""
+import json
+import os
+
+import numpy as np
+
+SCORE_CHUNK = 4096
+_loaded = {}
+
+
+def index_path(keyword_file):
+    return f"{keyword_file}.index.npz"
+
+
+class KeywordIndex:
+    def __init__(self, intervals, tokens, offsets, postings):
+        self.intervals = list(intervals)
+        self.tokens = tokens
+        self.offsets = offsets
+        self.postings = postings
+
+    @classmethod
+    def build(cls, keywords_by_interval, vocabulary):
+        """Index d'un dictionnaire {intervalle: [mots-clés]} ; les mots-clés sont ajoutés au vocabulaire."""
+        intervals = list(keywords_by_interval)
+        pairs = {}
+        for interval_id, interval in enumerate(intervals):
+            for token_id in set(vocabulary.encode(keywords_by_interval[interval])):
+                pairs.setdefault(token_id, []).append(interval_id)
+        tokens = np.array(sorted(pairs), dtype=np.int32)
+        lengths = [len(pairs[t]) for t in tokens.tolist()]
+        offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+        postings = np.array([i for t in tokens.tolist() for i in pairs[t]], dtype=np.int32)
+        return cls(intervals, tokens, offsets, postings)
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def scores(self, token_ids_list):
+        """Matrice (enregistrements x intervalles) du nombre de tokens communs (tokens distincts par enregistrement)."""
+        n_records, n_intervals = len(token_ids_list), len(self.intervals)
+        if not n_records or not n_intervals:
+            return np.zeros((n_records, n_intervals), dtype=np.int64)
+        lengths = np.fromiter((len(ids) for ids in token_ids_list), dtype=np.int64, count=n_records)
+        ids = np.concatenate([ids if isinstance(ids, np.ndarray) else np.fromiter(ids, dtype=np.int32, count=len(ids))
+                              for ids in token_ids_list]).astype(np.int32, copy=False)
+        rows = np.repeat(np.arange(n_records), lengths)
+
+        # Tokens de l'enregistrement présents dans l'index et leurs listes d'intervalles
+        position = np.searchsorted(self.tokens, ids)
+        position[position == len(self.tokens)] = 0
+        found = self.tokens[position] == ids if len(self.tokens) else np.zeros(len(ids), dtype=bool)
+        position, rows = position[found], rows[found]
+        starts = self.offsets[position]
+        counts = self.offsets[position + 1] - starts
+        total = int(counts.sum())
+        ends = np.cumsum(counts)
+        entries = np.arange(total) - np.repeat(ends - counts, counts) + np.repeat(starts, counts)
+        cells = np.repeat(rows, counts) * n_intervals + self.postings[entries]
+        return np.bincount(cells, minlength=n_records * n_intervals).reshape(n_records, n_intervals)
+
+    def best(self, token_ids_list):
+        """Meilleur intervalle de chaque enregistrement (le premier à score maximal), None si aucun mot commun."""
+        best = []
+        for start in range(0, len(token_ids_list), SCORE_CHUNK):
+            scores = self.scores(token_ids_list[start:start + SCORE_CHUNK])
+            if not len(self.intervals):
+                best.extend([None] * len(scores))
+                continue
+            winners = scores.argmax(axis=1)
+            best.extend(self.intervals[w] if scores[i, w] > 0 else None for i, w in enumerate(winners.tolist()))
+        return best
+
+    def top_k(self, token_ids, k=3):
+        """Les k intervalles au plus grand score pour un enregistrement : [(intervalle, score), ...]."""
+        scores = self.scores([token_ids])[0]
+        order = np.argsort(-scores, kind="stable")[:k]
+        return [(self.intervals[i], int(scores[i])) for i in order.tolist() if scores[i] > 0]
+
+    def save(self, path, source_stat, vocabulary):
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, intervals=np.array(self.intervals, dtype=str), tokens=self.tokens, offsets=self.offsets,
+                 postings=self.postings, source_size=source_stat.st_size, source_mtime=source_stat.st_mtime,
+                 vocabulary_size=len(vocabulary), vocabulary=vocabulary.digest())
+        os.replace(tmp_path, path)
+
+
+def load_index(keyword_file, vocabulary):
+    """Index d'un fichier de mots-clés : en mémoire, sinon relu sur disque s'il est à jour, sinon reconstruit."""
+    key = os.path.abspath(keyword_file)
+    if key in _loaded:
+        return _loaded[key]
+
+    stat = os.stat(keyword_file)
+    path = index_path(keyword_file)
+    index = None
+    if os.path.exists(path):
+        with np.load(path) as stored:
+            if (int(stored["source_size"]) == stat.st_size and float(stored["source_mtime"]) == stat.st_mtime
+                    and str(stored["vocabulary"]) == vocabulary.digest(int(stored["vocabulary_size"]))):
+                index = KeywordIndex(stored["intervals"].tolist(), stored["tokens"], stored["offsets"], stored["postings"])
+    if index is None:
+        with open(keyword_file, "r", encoding="utf-8") as f:
+            index = KeywordIndex.build(json.load(f), vocabulary)
+        # Le vocabulaire d'abord : l'index ne référence que des identifiants enregistrés
+        vocabulary.save()
+        index.save(path, stat, vocabulary)
+    _loaded[key] = index
+    return index
@@ -0,0 +1,211 @@
+"""Lemmatisation spaCy partagée : traitement par lots et cache persistant texte -> lemmes.
+
+- load_nlp() charge le modèle sans parser ni NER (inutiles pour les lemmes).
+- lemmatize_texts() traite une liste de textes déjà normalisés par le script appelant : les
+  textes identiques ne sont traités qu'une fois, ceux déjà vus lors d'un run précédent sont
+  lus dans le cache et les autres passent par nlp.pipe, par lots et sur plusieurs processus.
+- preprocess() est le prétraitement commun des scripts de prédiction et d'évaluation
+  (minuscules, suppression des accents, lemmes alphabétiques hors mots vides), avec le même
+  cache.
+
+Le cache (SQLite) associe l'empreinte (modèle + version, texte normalisé) aux lemmes des
+tokens alphabétiques ; les mots vides et la longueur minimale sont filtrés à la lecture, ce
+qui permet aux différents scripts de partager les mêmes entrées. Sa taille est bornée : les
+entrées les moins récemment utilisées sont supprimées à la fermeture.
+
+Avec N processus, spaCy relance le script dans chaque processus sous Windows : le code
+appelant doit donc être protégé par `if __name__ == "__main__":`.
+"""
+import atexit
+import hashlib
+import os
+import sqlite3
+import time
+
+import spacy
+from unidecode import unidecode
+
+MODEL = "fr_core_news_sm"
+DISABLED_PIPES = ["parser", "ner"]
+BATCH_SIZE = 512
+DEFAULT_PROCESSES = max(1, (os.cpu_count() or 1) - 1)
+# En dessous de ce nombre de textes distincts, lancer des processus coûte plus qu'il ne rapporte
+MIN_TEXTS_PER_PROCESS = 2000
+
+CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "store", "lemmas.sqlite")
+CACHE_MAX_ENTRIES = 500_000
+MEMORY_MAX_ENTRIES = 100_000
+SEPARATOR = "\x1f"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lemmas (
+    key BLOB PRIMARY KEY,
+    lemmas TEXT NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS lemmas_last_used ON lemmas (last_used);
+"""
+
+
+def load_nlp(model=MODEL):
+    return spacy.load(model, disable=DISABLED_PIPES)
+
+
+def model_version(nlp):
+    meta = nlp.meta
+    return f"{meta.get('lang')}_{meta.get('name')}-{meta.get('version')}/spacy-{spacy.__version__}"
+
+
+class LemmaCache:
+    """Cache persistant (SQLite, LRU borné) des lemmes alphabétiques d'un texte pour une version de modèle."""
+
+    def __init__(self, path=CACHE_PATH, max_entries=CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self._memory = {}
+        self._touched = set()
+        self.hits = self.misses = 0
+
+    def close(self):
+        if self.conn is None:
+            return
+        self.flush()
+        self.conn.close()
+        self.conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def key(version, text):
+        return hashlib.blake2b(f"{version}{SEPARATOR}{text}".encode("utf-8"), digest_size=16).digest()
+
+    def get_many(self, version, texts):
+        """{texte: lemmes} pour les textes déjà en cache."""
+        found, missing = {}, []
+        for text in texts:
+            key = self.key(version, text)
+            if key in self._memory:
+                found[text] = self._memory[key]
+                self._touched.add(key)
+            else:
+                missing.append((key, text))
+        for start in range(0, len(missing), 500):
+            chunk = dict(missing[start:start + 500])
+            rows = self.conn.execute(
+                f"SELECT key, lemmas FROM lemmas WHERE key IN ({', '.join('?' * len(chunk))})", list(chunk)
+            )
+            for key, lemmas in rows:
+                lemmas = lemmas.split(SEPARATOR) if lemmas else []
+                found[chunk[key]] = lemmas
+                self._remember(key, lemmas)
+        self.hits += len(found)
+        self.misses += len(texts) - len(found)
+        return found
+
+    def put_many(self, version, lemmas_by_text):
+        now = time.time()
+        rows = []
+        for text, lemmas in lemmas_by_text.items():
+            key = self.key(version, text)
+            self._remember(key, lemmas)
+            self._touched.discard(key)
+            rows.append((key, SEPARATOR.join(lemmas), now))
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO lemmas (key, lemmas, last_used) VALUES (?, ?, ?)", rows)
+
+    def _remember(self, key, lemmas):
+        if len(self._memory) >= MEMORY_MAX_ENTRIES:
+            self._memory.clear()
+        self._memory[key] = lemmas
+        self._touched.add(key)
+
+    def flush(self):
+        """Met à jour la date d'utilisation des entrées lues et supprime les plus anciennes au-delà de la limite."""
+        now = time.time()
+        with self.conn:
+            self.conn.executemany("UPDATE lemmas SET last_used = ? WHERE key = ?", [(now, key) for key in self._touched])
+            self._touched.clear()
+            excess = self.conn.execute("SELECT COUNT(*) FROM lemmas").fetchone()[0] - self.max_entries
+            if excess > 0:
+                self.conn.execute(
+                    "DELETE FROM lemmas WHERE key IN (SELECT key FROM lemmas ORDER BY last_used LIMIT ?)", (excess,)
+                )
+
+
+_shared = {}
+
+
+def shared_nlp():
+    """Modèle chargé une seule fois par processus pour preprocess()."""
+    if "nlp" not in _shared:
+        _shared["nlp"] = load_nlp()
+    return _shared["nlp"]
+
+
+def shared_cache():
+    """Cache ouvert une seule fois par processus (None si CACHE_PATH vaut None), fermé à la sortie."""
+    if "cache" not in _shared:
+        _shared["cache"] = LemmaCache(CACHE_PATH) if CACHE_PATH else None
+        if _shared["cache"] is not None:
+            atexit.register(_shared["cache"].close)
+    return _shared["cache"]
+
+
+def lemmatize_texts(texts, nlp, stop_words=None, batch_size=BATCH_SIZE, n_process=DEFAULT_PROCESSES, min_length=2,
+                    use_cache=True):
+    """Lemmes de chaque texte (alphabétiques, hors mots vides, d'au moins `min_length` lettres).
+
+    Retourne une liste de listes alignée sur `texts`.
+    """
+    texts = list(texts)
+    if stop_words is None:
+        stop_words = nlp.Defaults.stop_words
+    unique = list(dict.fromkeys(t for t in texts if t))
+
+    cache = shared_cache() if use_cache else None
+    version = model_version(nlp)
+    alpha_lemmas = cache.get_many(version, unique) if cache else {}
+    pending = [t for t in unique if t not in alpha_lemmas]
+
+    if pending:
+        n_process = max(1, min(n_process, len(pending) // MIN_TEXTS_PER_PROCESS))
+        computed = {}
+        docs = nlp.pipe(pending, batch_size=batch_size, n_process=n_process)
+        for text, doc in zip(pending, docs):
+            computed[text] = [token.lemma_ for token in doc if token.is_alpha]
+        if cache:
+            cache.put_many(version, computed)
+        alpha_lemmas.update(computed)
+
+    lemmas = {"": []}
+    for text in unique:
+        lemmas[text] = [lemma for lemma in alpha_lemmas[text] if lemma not in stop_words and len(lemma) >= min_length]
+    return [lemmas[t or ""] for t in texts]
+
+
+def normalize_text(text):
+    """Minuscule + suppression des accents"""
+    if not text:
+        return ""
+    return unidecode(text.lower())
+
+
+def preprocess_texts(texts, min_length=1, stop_words=None, n_process=1):
+    """Prétraitement commun de plusieurs textes (modèle et cache partagés)."""
+    return lemmatize_texts((normalize_text(t) for t in texts), shared_nlp(), stop_words,
+                           n_process=n_process, min_length=min_length)
+
+
+def preprocess(text, min_length=1, stop_words=None):
+    """Lemmes d'un texte : minuscules, sans accents, alphabétiques et hors mots vides."""
+    return preprocess_texts([text], min_length, stop_words)[0]
@@ -0,0 +1,143 @@
+"""Banc de charge hors ligne des scrapers contre le serveur de rejeu (common.replay_server).
+
+Chaque cible (full_scraper, scraper_daily, scraper_details...) est chargée dans ce processus
+avec MARCHES_BASE_URL pointant sur le serveur local, ses constantes de configuration
+(MAX_WORKERS, RETRIES, TIMEOUT, START_ID...) remplacées par `overrides`, puis exécutée dans
+son propre dossier de travail. Le rapport donne pour chaque cible les pages par seconde et
+le taux de succès (pages distinctes servies avec succès / pages distinctes demandées),
+ainsi que les pannes injectées et les retries côté client :
+
+    python -m common.load_test [load_test_config.json]
+"""
+import importlib.util
+import json
+import os
+import sys
+import time
+from contextlib import redirect_stderr, redirect_stdout
+
+from common.metrics import METRICS
+from common.replay_server import load_config as load_server_config, start_server
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_CONFIG = {
+    # Options de common.replay_server (port 0 : port libre)
+    "server": {
+        "port": 0,
+        "latency": 0.05,
+        "jitter": 0.02,
+        "error_rate": 0.02,
+        "timeout_rate": 0.005,
+        "hang_seconds": 5,
+    },
+    "workdir": "load_test_runs",
+    "report": "load_test_report.json",
+    # script : chemin depuis la racine du dépôt ; entry : fonction lancée ; overrides : constantes du script
+    # (stockages partagés désactivés : les enregistrements rejoués ne doivent pas atteindre dataset/ ni store/)
+    "targets": [
+        {"name": "full_scraper", "script": "Scraper/full_scraper.py", "entry": "main",
+         "overrides": {"TIMEOUT": 3}},
+        {"name": "full_scraper_async", "script": "Scraper/full_scraper.py", "entry": "main",
+         "overrides": {"TIMEOUT": 3, "FETCH_MODE": "async"}},
+        {"name": "scraper_daily", "script": "traitementParCategories/fournitures/scraper/scraper_daily.py",
+         "entry": "main", "overrides": {"TIMEOUT": 3, "DATASET_DIR": None, "STORE_PATH": None}},
+        {"name": "scraper_details", "script": "Categorize/scripts/scraper_details.py", "entry": "main",
+         "overrides": {"TIMEOUT": 3, "MAX_RETRIES": 5, "START_ID": 1, "END_ID": 500, "STORE_PATH": None}},
+        {"name": "scraper_details_pooled", "script": "Categorize/scripts/scraper_details.py", "entry": "main_pooled",
+         "overrides": {"TIMEOUT": 3, "START_ID": 1, "END_ID": 500, "STORE_PATH": None}},
+    ],
+}
+
+
+def load_config(path=None):
+    config = dict(DEFAULT_CONFIG)
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            config.update(json.load(f))
+    return config
+
+
+def load_script(name, script):
+    """Importe un script du dépôt comme module (ses effets de bord d'import ont lieu dans le dossier courant)."""
+    spec = importlib.util.spec_from_file_location(f"load_test_{name}", os.path.join(REPO_ROOT, script))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_target(target, server, workdir):
+    """Exécute une cible et retourne ses mesures ; la sortie du script va dans workdir/run.log."""
+    os.makedirs(workdir, exist_ok=True)
+    previous_cwd = os.getcwd()
+    server.stats.reset()
+    METRICS.reset()
+    result = {"target": target["name"], "error": None}
+
+    os.chdir(workdir)
+    start = time.perf_counter()
+    try:
+        with open("run.log", 'w', encoding='utf-8') as log, redirect_stdout(log), redirect_stderr(log):
+            module = load_script(target["name"], target["script"])
+            for key, value in target.get("overrides", {}).items():
+                setattr(module, key, value)
+            start = time.perf_counter()
+            getattr(module, target.get("entry", "main"))()
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        elapsed = time.perf_counter() - start
+        os.chdir(previous_cwd)
+
+    stats = server.stats.snapshot()
+    client = METRICS.report()["total"]
+    requested = stats["distinct_pages_requested"]
+    served = stats["distinct_pages_served"]
+    result.update({
+        "elapsed_seconds": elapsed,
+        "pages": served,
+        "pages_per_second": served / elapsed if elapsed else 0.0,
+        "success_rate": served / requested if requested else 0.0,
+        "requests": sum(stats["requests"].values()),
+        "server": stats,
+        "client_retries": client["retries"],
+        "client_errors": client["errors"],
+        "client_wait_seconds": client["wait_seconds"],
+        "client_parse_seconds": client["parse_seconds"],
+    })
+    return result
+
+
+def print_table(results):
+    print(f"\n{'cible':<26}{'durée (s)':>10}{'pages':>8}{'pages/s':>9}{'succès':>9}"
+          f"{'requêtes':>10}{'5xx inj.':>10}{'timeouts':>10}")
+    for r in results:
+        print(f"{r['target']:<26}{r['elapsed_seconds']:>10.1f}{r['pages']:>8}{r['pages_per_second']:>9.1f}"
+              f"{r['success_rate']:>9.1%}{r['requests']:>10}{r['server']['injected_errors']:>10}"
+              f"{r['server']['injected_timeouts']:>10}"
+              + (f"  ❌ {r['error']}" if r["error"] else ""))
+
+
+def main(config_path=None):
+    config = load_config(config_path)
+    server = start_server(load_server_config(**config["server"]))
+    # Lu à l'import de common.marches et des scripts : doit être fixé avant de charger les cibles
+    os.environ["MARCHES_BASE_URL"] = server.url
+    print(f"🛰️  Serveur de rejeu sur {server.url}")
+
+    workdir = os.path.abspath(config["workdir"])
+    results = []
+    for target in config["targets"]:
+        print(f"🏁 {target['name']}...")
+        results.append(run_target(target, server, os.path.join(workdir, target["name"])))
+
+    server.shutdown()
+    print_table(results)
+    report_path = os.path.join(workdir, config["report"])
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump({"server": config["server"], "results": results}, f, ensure_ascii=False, indent=2)
+    print(f"\n📈 Rapport écrit dans {report_path}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
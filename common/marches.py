@@ -0,0 +1,52 @@
+"""URLs et parsing des pages de résultats de marchespublics.gov.ma, communs à tous les scrapers."""
+import os
+
+from common.card_extractor import extract_cards, extract_natures, extract_result_count
+
+BASE_URL = os.environ.get("MARCHES_BASE_URL", "https://www.marchespublics.gov.ma")
+SEARCH_URL = BASE_URL + "/bdc/entreprise/consultation/resultat"
+PAGE_SIZE = 50
+
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+
+def search_url(nature_id="", page=None, date_start="", date_end="", categorie=""):
+    """Construit l'URL de recherche (mêmes paramètres, dans le même ordre, que les scrapers historiques)."""
+    params = [
+        ("keyword", ""),
+        ("reference", ""),
+        ("objet", ""),
+        ("dateLimitePublicationStart", date_start),
+        ("dateLimitePublicationEnd", date_end),
+        ("dateMiseEnLigneStart", ""),
+        ("dateMiseEnLigneEnd", ""),
+        ("categorie", categorie),
+        ("naturePrestation", nature_id),
+        ("acheteur", ""),
+        ("service", ""),
+        ("lieuExecution", ""),
+        ("pageSize", PAGE_SIZE),
+    ]
+    query = "&".join(f"search_consultation_resultats%5B{key}%5D={value}" for key, value in params)
+    if page is not None:
+        query += f"&page={page}"
+    return f"{SEARCH_URL}?{query}"
+
+
+def parse_natures(html):
+    """Retourne {id: libellé} des natures de prestation proposées par le formulaire de recherche."""
+    return extract_natures(html)
+
+
+def parse_max_pages(html):
+    """Retourne (nombre de pages, nombre de résultats) d'une page de résultats."""
+    total_results = extract_result_count(html)
+    if total_results is not None:
+        max_pages = (total_results + PAGE_SIZE - 1) // PAGE_SIZE
+        return max_pages, total_results
+    return 1, 0
+
+
+def parse_cards(html):
+    """Extrait toutes les cartes de consultation d'une page de résultats."""
+    return extract_cards(html)
@@ -0,0 +1,115 @@
+"""Fusion incrémentale des fichiers quotidiens attributed_*.json en un seul JSONL.
+
+Un manifeste (<sortie>.manifest.json) liste les fichiers déjà fusionnés avec leur taille,
+date de modification, empreinte sha1 et nombre d'enregistrements, ainsi que la taille de la
+sortie. À chaque exécution :
+
+- les fichiers nouveaux sont ajoutés en fin de sortie (le coût suit les nouvelles données) ;
+- si un fichier déjà fusionné a changé (empreinte différente) ou disparu, ou si la sortie ne
+  correspond plus au manifeste, la sortie est reconstruite à partir de tous les fichiers ;
+- un fichier dont seule la date de modification a changé (même empreinte) n'est pas relu.
+
+La sortie est d'abord ramenée à la taille du manifeste, ce qui efface un ajout interrompu.
+"""
+import hashlib
+import json
+import os
+
+
+def file_sha1(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return {"output_size": 0, "files": []}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _save_manifest(path, manifest):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _append_file(outfile, path):
+    """Ajoute les enregistrements d'un fichier JSON à la sortie ; retourne leur nombre."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    lines = [json.dumps(record, ensure_ascii=False) + "\n" for record in data]
+    outfile.writelines(lines)
+    return len(lines)
+
+
+def merge_daily_files(daily_dir, output_file, manifest_path=None, prefix="attributed_"):
+    """Met à jour `output_file` avec les fichiers <prefix>*.json de `daily_dir`.
+
+    Retourne {"rebuilt": bool, "merged_files": [...], "new_records": n, "total_records": n}.
+    """
+    manifest_path = manifest_path or output_file + ".manifest.json"
+    manifest = load_manifest(manifest_path)
+    known = {entry["name"]: entry for entry in manifest["files"]}
+
+    names = sorted(f for f in os.listdir(daily_dir) if f.startswith(prefix) and f.endswith(".json"))
+    rebuild = (not os.path.exists(output_file) and bool(manifest["files"])) or any(
+        name not in names for name in known
+    )
+    if os.path.exists(output_file) and os.path.getsize(output_file) < manifest["output_size"]:
+        rebuild = True
+
+    pending = []
+    for name in names:
+        path = os.path.join(daily_dir, name)
+        stat = os.stat(path)
+        entry = known.get(name)
+        if entry and (entry["size"], entry["mtime"]) == (stat.st_size, stat.st_mtime):
+            continue
+        sha1 = file_sha1(path)
+        if entry and entry["sha1"] == sha1:
+            entry["mtime"] = stat.st_mtime  # simple changement de date : rien à relire
+            continue
+        if entry:
+            rebuild = True
+        pending.append((name, path, stat, sha1))
+
+    if rebuild:
+        print(f"♻️  Fichiers déjà fusionnés modifiés ou supprimés : reconstruction complète de {output_file}")
+        manifest = {"output_size": 0, "files": []}
+        pending = []
+        for name in names:
+            path = os.path.join(daily_dir, name)
+            pending.append((name, path, os.stat(path), file_sha1(path)))
+
+    merged_files = []
+    new_records = 0
+    with open(output_file, "a+b") as raw:
+        raw.truncate(manifest["output_size"])
+    with open(output_file, "a", encoding="utf-8") as outfile:
+        for name, path, stat, sha1 in pending:
+            try:
+                count = _append_file(outfile, path)
+            except Exception as e:
+                print(f"❌ Erreur dans le fichier {name} : {e}")
+                continue
+            manifest["files"].append({
+                "name": name, "size": stat.st_size, "mtime": stat.st_mtime, "sha1": sha1, "records": count,
+            })
+            merged_files.append(name)
+            new_records += count
+        outfile.flush()
+        os.fsync(outfile.fileno())
+
+    manifest["output_size"] = os.path.getsize(output_file)
+    _save_manifest(manifest_path, manifest)
+    return {
+        "rebuilt": rebuild,
+        "merged_files": merged_files,
+        "new_records": new_records,
+        "total_records": sum(entry["records"] for entry in manifest["files"]),
+    }
@@ -0,0 +1,235 @@
+"""Instrumentation des scrapers : latence, statuts HTTP, octets, retries, temps réseau/parsing/attente.
+
+Les mesures sont regroupées par (nature, date) dans le registre global METRICS, partagé
+par les threads et par la boucle asyncio. En fin de run, METRICS.dump(chemin) écrit le
+rapport en JSON (.json) ou au format texte Prometheus (.prom / .txt) et METRICS.summary()
+affiche une ligne de synthèse : de quoi savoir si un crawl lent vient du site (réseau),
+de nos sleeps / du limiteur (attente) ou du parsing.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Bornes supérieures (secondes) des classes de l'histogramme de latence
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, float("inf"))
+
+
+def _new_series():
+    return {
+        "requests": 0,
+        "latency_buckets": [0] * len(LATENCY_BUCKETS),
+        "latency_max": 0.0,
+        "status": {},
+        "errors": {},
+        "cache_hits": 0,
+        "bytes": 0,
+        "retries": 0,
+        "network_seconds": 0.0,
+        "parse_seconds": 0.0,
+        "wait_seconds": 0.0,
+    }
+
+
+def _merge(target, series):
+    for key, value in series.items():
+        if key == "latency_buckets":
+            target[key] = [a + b for a, b in zip(target[key], value)]
+        elif key == "latency_max":
+            target[key] = max(target[key], value)
+        elif isinstance(value, dict):
+            for name, count in value.items():
+                target[key][name] = target[key].get(name, 0) + count
+        else:
+            target[key] += value
+    return target
+
+
+def latency_quantile(series, q):
+    """Estime le quantile q de la latence à partir de l'histogramme (borne supérieure de la classe)."""
+    total = sum(series["latency_buckets"])
+    if not total:
+        return None
+    seen = 0
+    for bound, count in zip(LATENCY_BUCKETS, series["latency_buckets"]):
+        seen += count
+        if seen >= q * total:
+            return series["latency_max"] if bound == float("inf") else bound
+    return series["latency_max"]
+
+
+def _prom_labels(**labels):
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._series = {}
+            self.started_at = time.time()
+
+    def _update(self, nature, date, update):
+        with self._lock:
+            key = (str(nature), str(date))
+            if key not in self._series:
+                self._series[key] = _new_series()
+            update(self._series[key])
+
+    def observe_request(self, latency, status=None, nbytes=0, error=None, nature="", date=""):
+        """Enregistre une requête réseau : latence, statut HTTP (ou type d'erreur) et octets reçus."""
+        def update(series):
+            series["requests"] += 1
+            series["network_seconds"] += latency
+            series["latency_max"] = max(series["latency_max"], latency)
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if latency <= bound:
+                    series["latency_buckets"][i] += 1
+                    break
+            if status is not None:
+                series["status"][str(status)] = series["status"].get(str(status), 0) + 1
+            if error is not None:
+                series["errors"][error] = series["errors"].get(error, 0) + 1
+            series["bytes"] += nbytes
+        self._update(nature, date, update)
+
+    def observe_cache_hit(self, nbytes=0, nature="", date=""):
+        def update(series):
+            series["cache_hits"] += 1
+            series["bytes"] += nbytes
+        self._update(nature, date, update)
+
+    def observe_retry(self, nature="", date=""):
+        self._update(nature, date, lambda series: series.__setitem__("retries", series["retries"] + 1))
+
+    def observe_wait(self, seconds, nature="", date=""):
+        """Temps passé volontairement à attendre (sleep entre requêtes, limiteur de débit)."""
+        self._update(nature, date, lambda series: series.__setitem__("wait_seconds", series["wait_seconds"] + seconds))
+
+    def observe_parse(self, seconds, nature="", date=""):
+        self._update(nature, date, lambda series: series.__setitem__("parse_seconds", series["parse_seconds"] + seconds))
+
+    def sleep(self, seconds, nature="", date=""):
+        """time.sleep comptabilisé dans le temps d'attente."""
+        time.sleep(seconds)
+        self.observe_wait(seconds, nature, date)
+
+    @contextmanager
+    def parsing(self, nature="", date=""):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_parse(time.perf_counter() - start, nature, date)
+
+    def get(self, session, url, nature="", date="", **kwargs):
+        """session.get instrumenté ; les réponses rejouées par CachedSession comptent comme hits de cache."""
+        start = time.perf_counter()
+        try:
+            response = session.get(url, **kwargs)
+        except Exception as e:
+            self.observe_request(time.perf_counter() - start, error=type(e).__name__, nature=nature, date=date)
+            raise
+        latency = time.perf_counter() - start
+        if "X-Cache-Fetched-At" in response.headers:
+            self.observe_cache_hit(len(response.content), nature, date)
+        else:
+            self.observe_request(latency, response.status_code, len(response.content), nature=nature, date=date)
+        return response
+
+    def report(self):
+        """Rapport complet : séries par (nature, date), agrégats par nature, par date et total."""
+        with self._lock:
+            series = {key: json.loads(json.dumps(value)) for key, value in self._series.items()}
+
+        by_nature, by_date, total = {}, {}, _new_series()
+        for (nature, date), values in series.items():
+            _merge(by_nature.setdefault(nature, _new_series()), values)
+            _merge(by_date.setdefault(date, _new_series()), values)
+            _merge(total, values)
+        for values in [total, *by_nature.values(), *by_date.values(), *series.values()]:
+            values["latency_p50"] = latency_quantile(values, 0.5)
+            values["latency_p95"] = latency_quantile(values, 0.95)
+
+        return {
+            "started_at": self.started_at,
+            "elapsed_seconds": time.time() - self.started_at,
+            "latency_buckets": [str(b) for b in LATENCY_BUCKETS],
+            "total": total,
+            "by_nature": by_nature,
+            "by_date": by_date,
+            "series": [{"nature": nature, "date": date, **values} for (nature, date), values in sorted(series.items())],
+        }
+
+    def to_prometheus(self):
+        """Rapport au format texte d'exposition Prometheus (une série par nature et date)."""
+        with self._lock:
+            series = sorted(self._series.items())
+
+        lines = [
+            "# TYPE scraper_request_latency_seconds histogram",
+        ]
+        for (nature, date), values in series:
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, values["latency_buckets"]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else str(bound)
+                lines.append(f"scraper_request_latency_seconds_bucket{_prom_labels(nature=nature, date=date, le=le)} {cumulative}")
+            labels = _prom_labels(nature=nature, date=date)
+            lines.append(f"scraper_request_latency_seconds_sum{labels} {values['network_seconds']}")
+            lines.append(f"scraper_request_latency_seconds_count{labels} {values['requests']}")
+
+        counters = [
+            ("scraper_http_responses_total", "status"),
+            ("scraper_request_errors_total", "errors"),
+        ]
+        for name, field in counters:
+            lines.append(f"# TYPE {name} counter")
+            label = "code" if field == "status" else "error"
+            for (nature, date), values in series:
+                for key, count in sorted(values[field].items()):
+                    lines.append(f"{name}{_prom_labels(nature=nature, date=date, **{label: key})} {count}")
+
+        scalars = [
+            ("scraper_cache_hits_total", "cache_hits"),
+            ("scraper_downloaded_bytes_total", "bytes"),
+            ("scraper_retries_total", "retries"),
+            ("scraper_network_seconds_total", "network_seconds"),
+            ("scraper_parse_seconds_total", "parse_seconds"),
+            ("scraper_wait_seconds_total", "wait_seconds"),
+        ]
+        for name, field in scalars:
+            lines.append(f"# TYPE {name} counter")
+            for (nature, date), values in series:
+                lines.append(f"{name}{_prom_labels(nature=nature, date=date)} {values[field]}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path):
+        """Écrit le rapport : JSON pour *.json, texte Prometheus sinon."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            if path.endswith(".json"):
+                json.dump(self.report(), f, ensure_ascii=False, indent=2)
+            else:
+                f.write(self.to_prometheus())
+        print(f"📈 Rapport de mesures écrit dans {path}")
+
+    def summary(self):
+        total = self.report()["total"]
+        p50, p95 = (total[key] if total[key] is not None else "-" for key in ("latency_p50", "latency_p95"))
+        return (
+            f"{total['requests']} requêtes ({total['cache_hits']} depuis le cache), "
+            f"{sum(total['errors'].values())} erreurs, {total['retries']} retries, "
+            f"{total['bytes'] / 1e6:.1f} Mo | latence p50 ≤ {p50}s, p95 ≤ {p95}s | "
+            f"réseau {total['network_seconds']:.1f}s, parsing {total['parse_seconds']:.1f}s, "
+            f"attente {total['wait_seconds']:.1f}s (cumulés sur les workers)"
+        )
+
+
+METRICS = Metrics()
@@ -0,0 +1,217 @@
+"""Crawler multi-natures piloté par un fichier de configuration.
+
+Remplace les copies `nature_X/scraper/scraper.py` et `scraper_daily.py` générées par nature :
+un seul processus, une seule session HTTP (pool de connexions partagé) et un seul
+limiteur de débit pour toutes les natures demandées. Les sorties par nature restent
+les mêmes que celles des scripts générés :
+
+    mode "full"  : nature_X/scraper/data/attributed.json, infructuous.json
+    mode "daily" : nature_X/scraper/data_daily/attributed_day.json, attributed_cleaned_day.json
+
+Usage : python -m common.nature_crawler crawler_config.json
+"""
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime
+
+import requests
+
+from common.cleaning import clean_data
+from common.dataset_store import write_records
+from common.http_cache import HttpCache
+from common.metrics import METRICS
+from common.marches import HEADERS, SEARCH_URL, search_url, parse_natures, parse_max_pages, parse_cards
+from common.rate_limiter import TokenBucket
+
+DEFAULT_CONFIG = {
+    "natures": "all",              # "all" ou liste d'IDs, ex. [1, 2, 3]
+    "natures_file": "natures.json",
+    "output_dir": ".",             # dossier contenant les nature_X/
+    "mode": "full",                # "full" ou "daily"
+    "date": None,                  # mode daily : "YYYY-MM-DD", aujourd'hui par défaut
+    "concurrency": 32,
+    "rate": 10,                    # requêtes/s, toutes natures confondues
+    "burst": 8,
+    "retries": 3,
+    "timeout": 50,
+    "cache_dir": "http_cache",
+    "cache_mode": "off",           # "off", "cache", "refresh" ou "replay" (voir common.http_cache)
+    "cache_ttl": None,             # secondes, None : sans expiration
+    "metrics_report": "crawl_metrics.json",  # dans output_dir ; .json ou .prom, null pour désactiver
+    "dataset_dir": None,           # stockage Parquet (chemin, ex. common.dataset_store.DEFAULT_ROOT), null : désactivé
+}
+
+
+def load_config(path=None):
+    """Charge la configuration JSON en complétant avec les valeurs par défaut."""
+    config = dict(DEFAULT_CONFIG)
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            config.update(json.load(f))
+    return config
+
+
+def load_natures(natures_file):
+    """Retourne {id: libellé}, depuis natures_file (clés "12" ou "nature_12") ou depuis le site."""
+    if natures_file and os.path.exists(natures_file):
+        with open(natures_file, 'r', encoding='utf-8') as f:
+            raw = json.load(f)
+        return {int(str(key).replace("nature_", "")): name for key, name in raw.items()}
+
+    res = requests.get(SEARCH_URL, headers=HEADERS, timeout=DEFAULT_CONFIG["timeout"])
+    res.raise_for_status()
+    return parse_natures(res.text)
+
+
+def resolve_nature_ids(config):
+    natures = load_natures(config["natures_file"])
+    if config["natures"] == "all":
+        return sorted(natures), natures
+    return [int(nid) for nid in config["natures"]], natures
+
+
+async def crawl_natures_async(nature_ids, concurrency, rate, burst, retries, timeout, date_start="", cache=None,
+                              on_page=None, done_pages=None, metrics=None, known=None):
+    """Récupère toutes les pages de toutes les natures dans une seule boucle asyncio.
+
+    Retourne {nature_id: [cartes]} ; les pages sont concaténées dans l'ordre.
+    `cache` (HttpCache optionnel) permet d'enregistrer les pages ou de les rejouer hors ligne.
+    Avec `on_page(nature_id, page, cartes)`, chaque page est transmise dès qu'elle arrive (rien
+    n'est gardé en mémoire, retourne None) ; `done_pages` ({nature_id: pages}) indique les pages à sauter.
+    `metrics` (common.metrics.Metrics optionnel) reçoit les mesures de chaque requête par nature et date.
+    `known` ({nature_id: is_known(carte)}) : natures crawlées en incrémental, par lots de `burst` pages
+    depuis la première, jusqu'à une page dont toutes les cartes sont déjà connues.
+    """
+    done_pages = done_pages or {}
+    known = known or {}
+
+    def labels(key):
+        return {"nature": key[0] if isinstance(key, tuple) else key, "date": date_start}
+
+    from common.async_fetch import open_session, fetch_all
+
+    limiter = TokenBucket(rate, burst)
+    async with open_session(concurrency, timeout, HEADERS) as session:
+        pages_info = await fetch_all(
+            session, limiter,
+            [(nid, search_url(nature_id=nid, date_start=date_start)) for nid in nature_ids],
+            parse_max_pages, retries, desc="Pages max natures", cache=cache, metrics=metrics, labels=labels
+        )
+        jobs = []
+        pages = {}
+        max_pages_by_nature = {}
+        for nid in nature_ids:
+            max_pages, total_results = pages_info[nid] or (1, 0)
+            print(f"Nature {nid} -> Max pages: {max_pages}, Total résultats: {total_results}")
+            max_pages_by_nature[nid] = max_pages
+            if nid not in known:
+                jobs.extend(
+                    ((nid, page), search_url(nature_id=nid, page=page, date_start=date_start))
+                    for page in range(1, max_pages + 1) if page not in done_pages.get(nid, ())
+                )
+
+        def forward(key, result):
+            if on_page is None:
+                pages[key] = result
+            elif result is not None:
+                on_page(key[0], key[1], result)
+
+        async def crawl_new_pages(nid):
+            max_pages = max_pages_by_nature[nid]
+            for start in range(1, max_pages + 1, burst):
+                batch = range(start, min(start + burst, max_pages + 1))
+                results = await fetch_all(
+                    session, limiter,
+                    [((nid, page), search_url(nature_id=nid, page=page, date_start=date_start))
+                     for page in batch if page not in done_pages.get(nid, ())],
+                    parse_cards, retries, cache=cache, metrics=metrics, labels=labels
+                )
+                for key, result in sorted(results.items()):
+                    forward(key, result)
+                for page in batch:
+                    result = results.get((nid, page))
+                    if result is not None and all(known[nid](d) for d in result if d):
+                        print(f"[crawl_new_pages] Nature {nid}: page {page} déjà connue, arrêt")
+                        return
+
+        await asyncio.gather(
+            fetch_all(session, limiter, jobs, parse_cards, retries, desc="Pages", cache=cache, on_result=forward,
+                      metrics=metrics, labels=labels),
+            *(crawl_new_pages(nid) for nid in nature_ids if nid in known)
+        )
+        if on_page is not None:
+            return None
+
+    data_by_nature = {nid: [] for nid in nature_ids}
+    for (nid, page), result in sorted(pages.items()):
+        if result:
+            data_by_nature[nid].extend(d for d in result if d)
+    return data_by_nature
+
+
+def crawl_natures(nature_ids, concurrency, rate, burst, retries, timeout, date_start="", cache=None,
+                  on_page=None, done_pages=None, metrics=None, known=None):
+    return asyncio.run(crawl_natures_async(
+        nature_ids, concurrency, rate, burst, retries, timeout, date_start, cache, on_page, done_pages, metrics,
+        known
+    ))
+
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def save_full_outputs(output_dir, nature_id, data):
+    data_dir = os.path.join(output_dir, f"nature_{nature_id}", "scraper", "data")
+    attributed = [d for d in data if d['attribue']]
+    infructuous = [d for d in data if not d['attribue']]
+    if attributed:
+        _write_json(os.path.join(data_dir, "attributed.json"), attributed)
+    if infructuous:
+        _write_json(os.path.join(data_dir, "infructuous.json"), infructuous)
+    print(f"✅ nature_{nature_id}: {len(attributed)} attribuées, {len(infructuous)} infructueuses")
+
+
+def save_daily_outputs(output_dir, nature_id, data):
+    daily_dir = os.path.join(output_dir, f"nature_{nature_id}", "scraper", "data_daily")
+    attribues = [d for d in data if d['attribue']]
+    if attribues:
+        _write_json(os.path.join(daily_dir, "attributed_day.json"), attribues)
+        _write_json(os.path.join(daily_dir, "attributed_cleaned_day.json"), clean_data(attribues))
+    print(f"✅ nature_{nature_id}: {len(attribues)} consultations attribuées du jour")
+
+
+def run(config):
+    nature_ids, natures = resolve_nature_ids(config)
+    date_start = ""
+    if config["mode"] == "daily":
+        date_start = config["date"] or datetime.today().strftime("%Y-%m-%d")
+    print(f"📥 Crawl {config['mode']} de {len(nature_ids)} natures"
+          + (f" pour le {date_start}" if date_start else ""))
+
+    cache = HttpCache(config["cache_dir"], config["cache_mode"], config["cache_ttl"])
+    data_by_nature = crawl_natures(
+        nature_ids, config["concurrency"], config["rate"], config["burst"],
+        config["retries"], config["timeout"], date_start, cache, metrics=METRICS
+    )
+
+    save = save_daily_outputs if config["mode"] == "daily" else save_full_outputs
+    for nid, data in data_by_nature.items():
+        save(config["output_dir"], nid, data)
+        if config["dataset_dir"]:
+            # crawl complet : la nature est réécrite ; daily : ajout aux partitions du jour
+            write_records(f"nature_{nid}", [d for d in data if d['attribue']], config["dataset_dir"],
+                          replace=config["mode"] == "full")
+    print("\n✅ Crawl terminé")
+    print(f"📈 {METRICS.summary()}")
+    if config["metrics_report"]:
+        METRICS.dump(os.path.join(config["output_dir"], config["metrics_report"]))
+    return data_by_nature
+
+
+if __name__ == "__main__":
+    run(load_config(sys.argv[1] if len(sys.argv) > 1 else None))
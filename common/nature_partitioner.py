@@ -0,0 +1,144 @@
+"""Découpage en flux de merged.jsonl en un fichier data_nature_{id}.jsonl par nature.
+
+- natures.json (même format qu'avant : {nature: {"id": n, "count": c}}) sert de registre
+  persistant : une nature garde son identifiant d'un run à l'autre, les nouvelles prennent
+  le plus grand identifiant + 1.
+- Seules les lignes ajoutées à la source depuis le dernier passage sont lues et ajoutées aux
+  fichiers de nature (position mémorisée dans .split_state.json). Si la source a été
+  réécrite (plus courte, ou empreinte des octets déjà lus différente), les fichiers de nature
+  sont reconstruits depuis le début, toujours avec les mêmes identifiants.
+- Le nombre de fichiers ouverts en même temps est borné (les moins récemment utilisés sont
+  fermés) ; les fichiers data_nature_*.jsonl sont ramenés à leur taille mémorisée au
+  démarrage, ce qui efface un ajout interrompu avant la sauvegarde de l'état.
+"""
+import json
+import os
+import re
+from collections import OrderedDict
+
+from common.file_fingerprint import fingerprint
+
+MAX_OPEN_FILES = 64
+NATURE_FILE = re.compile(r"^data_nature_(\d+)\.jsonl$")
+
+
+def _write_json(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+class NaturePartitioner:
+    def __init__(self, output_dir, registry_path=None, max_open_files=MAX_OPEN_FILES):
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+        self.registry_path = registry_path or os.path.join(output_dir, "natures.json")
+        self.state_path = os.path.join(output_dir, ".split_state.json")
+        self.max_open_files = max_open_files
+        self._handles = OrderedDict()
+
+        self.registry = {}
+        if os.path.exists(self.registry_path):
+            with open(self.registry_path, 'r', encoding='utf-8') as f:
+                self.registry = json.load(f)
+        self.state = {"sources": {}, "files": {}}
+        if os.path.exists(self.state_path):
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                self.state = json.load(f)
+            # L'état fait foi : natures.json a pu être écrit par un run interrompu avant l'état
+            self.registry = self.state.get("registry", self.registry)
+
+    def nature_path(self, nature_id):
+        return os.path.join(self.output_dir, f"data_nature_{nature_id}.jsonl")
+
+    def nature_id(self, nature):
+        """Identifiant stable de la nature (attribué au premier passage)."""
+        if nature not in self.registry:
+            next_id = max((entry["id"] for entry in self.registry.values()), default=0) + 1
+            self.registry[nature] = {"id": next_id, "count": 0}
+        return self.registry[nature]["id"]
+
+    def _handle(self, nature_id):
+        handle = self._handles.pop(nature_id, None)
+        if handle is None:
+            if len(self._handles) >= self.max_open_files:
+                _, oldest = self._handles.popitem(last=False)
+                oldest.close()
+            handle = open(self.nature_path(nature_id), 'a', encoding='utf-8')
+        self._handles[nature_id] = handle
+        return handle
+
+    def _close_handles(self):
+        while self._handles:
+            _, handle = self._handles.popitem()
+            handle.close()
+
+    def _truncate_to_state(self):
+        """Annule les ajouts non confirmés par l'état sauvegardé (run interrompu)."""
+        for filename in os.listdir(self.output_dir):
+            match = NATURE_FILE.match(filename)
+            if not match:
+                continue
+            path = os.path.join(self.output_dir, filename)
+            size = self.state["files"].get(match.group(1), 0)
+            if os.path.getsize(path) > size:
+                with open(path, 'r+b') as f:
+                    f.truncate(size)
+
+    def _reset(self):
+        """Reconstruction complète : fichiers vidés (à la troncature) et compteurs remis à zéro, identifiants conservés."""
+        for entry in self.registry.values():
+            entry["count"] = 0
+        self.state = {"sources": {}, "files": {}, "registry": self.registry}
+
+    def split(self, source_path):
+        """Ajoute aux fichiers de nature les lignes de `source_path` non encore découpées.
+
+        Retourne {nature: nombre d'enregistrements ajoutés}.
+        """
+        source = os.path.abspath(source_path)
+        previous = self.state["sources"].get(source)
+        offset = 0
+        if previous:
+            offset = previous["offset"]
+            if offset > os.path.getsize(source_path) or fingerprint(source_path, offset) != previous["fingerprint"]:
+                print(f"♻️  {source_path} a été réécrit : reconstruction complète des fichiers de nature")
+                self._reset()
+                offset = 0
+        elif not self.state["sources"]:
+            # Premier passage dans ce dossier (ou fichiers de l'ancien découpage) : on repart de zéro
+            self._reset()
+        self._truncate_to_state()
+
+        added = {}
+        try:
+            with open(source_path, 'rb') as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # ligne en cours d'écriture : reprise au prochain passage
+                    offset += len(line)
+                    if not line.strip():
+                        continue
+                    item = json.loads(line)
+                    nature = (item.get("nature") or "").strip()
+                    if not nature:
+                        continue  # Ignore les éléments sans nature
+                    nature_id = self.nature_id(nature)
+                    self._handle(nature_id).write(json.dumps(item, ensure_ascii=False) + "\n")
+                    self.registry[nature]["count"] += 1
+                    added[nature] = added.get(nature, 0) + 1
+        finally:
+            self._close_handles()
+
+        # Registre puis état : l'écriture de l'état confirme le registre et les tailles des fichiers de nature
+        _write_json(self.registry_path, self.registry)
+        for entry in self.registry.values():
+            path = self.nature_path(entry["id"])
+            if os.path.exists(path):
+                self.state["files"][str(entry["id"])] = os.path.getsize(path)
+        self.state["sources"][source] = {"offset": offset, "fingerprint": fingerprint(source_path, offset)}
+        self.state["registry"] = self.registry
+        _write_json(self.state_path, self.state)
+        return added
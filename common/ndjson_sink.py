@@ -0,0 +1,111 @@
+"""Écriture au fil de l'eau des résultats de scraping.
+
+NdjsonSink ajoute les enregistrements en NDJSON dès qu'une page est terminée et force
+l'écriture disque (fsync) tous les `fsync_every` ajouts : un crash ne perd au plus que
+les dernières pages. JsonArrayWriter produit ensuite les fichiers JSON habituels
+(même format que json.dump(..., indent=2)) élément par élément, sans tout charger en mémoire.
+"""
+import json
+import os
+import textwrap
+import threading
+
+
+class NdjsonSink:
+    def __init__(self, path, fsync_every=20):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.fsync_every = fsync_every
+        self._file = open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    def write(self, record):
+        with self._lock:
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._pending += 1
+            if self._pending >= self.fsync_every:
+                self._sync()
+
+    def write_many(self, records):
+        for record in records:
+            self.write(record)
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+
+    def checkpoint(self):
+        """Force l'écriture sur disque de tout ce qui a été ajouté."""
+        with self._lock:
+            self._sync()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._sync()
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_ndjson(path):
+    """Relit un fichier NDJSON ligne par ligne (une dernière ligne tronquée par un crash est ignorée)."""
+    if not os.path.exists(path):
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                break
+
+
+class JsonArrayWriter:
+    """Écrit un tableau JSON élément par élément, dans un fichier temporaire renommé à la fermeture.
+
+    Si `keep_empty` est faux et qu'aucun élément n'a été écrit, le fichier cible n'est pas touché.
+    """
+
+    def __init__(self, path, keep_empty=True):
+        self.path = path
+        self.keep_empty = keep_empty
+        self.count = 0
+        self._tmp_path = f"{path}.tmp"
+        self._file = open(self._tmp_path, 'w', encoding='utf-8')
+        self._file.write("[")
+
+    def write(self, record):
+        self._file.write(",\n" if self.count else "\n")
+        self._file.write(textwrap.indent(json.dumps(record, ensure_ascii=False, indent=2), "  "))
+        self.count += 1
+
+    def write_many(self, records):
+        for record in records:
+            self.write(record)
+
+    def close(self):
+        self._file.write("\n]" if self.count else "]")
+        self._file.close()
+        if self.count or self.keep_empty:
+            os.replace(self._tmp_path, self.path)
+        else:
+            os.remove(self._tmp_path)
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+            os.remove(self._tmp_path)
@@ -0,0 +1,153 @@
+"""Découpage d'une nature en 3 à 100 tranches de montant (quantiles) en une seule passe.
+
+Les montants sont triés une fois ; les seuils de toutes les résolutions viennent d'un seul
+appel à np.percentile et les bornes des tranches de np.searchsorted sur le tableau trié. Une
+tranche garde la règle historique : un montant va dans la première tranche dont le seuil est
+>= au montant, sinon dans la dernière.
+
+Tout est rangé dans un seul fichier .npz (non compressé, lu à la demande par np.load) :
+- ranges : résolutions calculées (r) ;
+- bins : matrice (éléments x résolutions) de l'indice de tranche de chaque élément, dans
+  l'ordre du fichier source ;
+- thresholds : seuils de chaque résolution mis bout à bout (r - 1 par résolution) ;
+- counts, mins, maxs, sums : résumé de chaque tranche mis bout à bout (r par résolution).
+
+RangeBinning relit ce fichier et rend le résumé d'une résolution au format de l'ancien
+resume.json ({"categorie_01": {"count", "percentage", "min", "max", "mean"}, ...}).
+"""
+import numpy as np
+
+MIN_RANGE = 3
+MAX_RANGE = 100
+
+
+def category_name(index):
+    return f"categorie_{index + 1:02d}"
+
+
+def bin_amounts(amounts, ranges=range(MIN_RANGE, MAX_RANGE + 1)):
+    """Calcule seuils, tranches et résumés de toutes les résolutions possibles (r <= nombre de montants)."""
+    amounts = np.asarray(amounts, dtype=np.float64)
+    ranges = np.array([r for r in ranges if r <= len(amounts)], dtype=np.int64)
+    order = np.argsort(amounts, kind="stable")
+    sorted_amounts = amounts[order]
+
+    percentiles = np.concatenate([100 / r * np.arange(1, r) for r in ranges]) if len(ranges) else np.empty(0)
+    thresholds = np.percentile(sorted_amounts, percentiles) if len(ranges) else np.empty(0)
+
+    bins = np.empty((len(amounts), len(ranges)), dtype=np.uint8)
+    counts, mins, maxs, sums = [], [], [], []
+    start = 0
+    for column, r in enumerate(ranges):
+        cuts = thresholds[start:start + r - 1]
+        start += r - 1
+        # Nombre d'éléments <= à chaque seuil : bornes des tranches dans le tableau trié
+        bounds = np.concatenate(([0], np.searchsorted(sorted_amounts, cuts, side="right"), [len(amounts)]))
+        count = np.diff(bounds)
+        column_bins = np.empty(len(amounts), dtype=np.uint8)
+        column_bins[order] = np.repeat(np.arange(r, dtype=np.uint8), count)
+        bins[:, column] = column_bins
+
+        filled = count > 0
+        low, high = bounds[:-1][filled], bounds[1:][filled] - 1
+        tranche_min = np.zeros(r)
+        tranche_max = np.zeros(r)
+        tranche_min[filled] = sorted_amounts[low]
+        tranche_max[filled] = sorted_amounts[high]
+        counts.append(count)
+        mins.append(tranche_min)
+        maxs.append(tranche_max)
+        # Somme dans l'ordre du fichier (comme l'ancien sum() sur les éléments de la tranche)
+        sums.append(np.bincount(column_bins, weights=amounts, minlength=r))
+
+    def concat(parts, dtype):
+        return np.concatenate(parts).astype(dtype) if parts else np.empty(0, dtype=dtype)
+
+    return {
+        "ranges": ranges,
+        "bins": bins,
+        "thresholds": thresholds,
+        "counts": concat(counts, np.int64),
+        "mins": concat(mins, np.float64),
+        "maxs": concat(maxs, np.float64),
+        "sums": concat(sums, np.float64),
+    }
+
+
+def save_binning(path, binning):
+    np.savez(path, **binning)
+
+
+class RangeBinning:
+    """Lecture paresseuse d'un fichier produit par save_binning (un tableau n'est lu qu'au premier accès)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = np.load(path)
+        self.ranges = [int(r) for r in self._file["ranges"]]
+        self._column = {r: i for i, r in enumerate(self.ranges)}
+        self._threshold_start, self._category_start = {}, {}
+        threshold_start = category_start = 0
+        for r in self.ranges:
+            self._threshold_start[r] = threshold_start
+            self._category_start[r] = category_start
+            threshold_start += r - 1
+            category_start += r
+        self._cache = {}
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _array(self, name):
+        if name not in self._cache:
+            self._cache[name] = self._file[name]
+        return self._cache[name]
+
+    def _check(self, r):
+        if r not in self._column:
+            raise KeyError(f"Résolution {r} absente de {self.path} (disponibles : {self.ranges[:1]}..{self.ranges[-1:]})")
+
+    def __len__(self):
+        return self._array("bins").shape[0]
+
+    def thresholds(self, r):
+        self._check(r)
+        start = self._threshold_start[r]
+        return self._array("thresholds")[start:start + r - 1]
+
+    def bins(self, r):
+        """Indice de tranche (0 à r - 1) de chaque élément, dans l'ordre du fichier source."""
+        self._check(r)
+        return self._array("bins")[:, self._column[r]]
+
+    def members(self, r, category):
+        """Positions dans le fichier source des éléments d'une tranche (indice ou nom categorie_XX)."""
+        if isinstance(category, str):
+            category = int(category.rsplit("_", 1)[1]) - 1
+        return np.flatnonzero(self.bins(r) == category)
+
+    def summary(self, r):
+        """Résumé d'une résolution, au format de l'ancien range_XX/resume.json."""
+        self._check(r)
+        start = self._category_start[r]
+        window = slice(start, start + r)
+        counts = self._array("counts")[window]
+        mins, maxs, sums = self._array("mins")[window], self._array("maxs")[window], self._array("sums")[window]
+        total = int(counts.sum())
+        summary = {}
+        for i in range(r):
+            count = int(counts[i])
+            summary[category_name(i)] = {
+                "count": count,
+                "percentage": round(count / total * 100, 2) if total else 0,
+                "min": round(float(mins[i]), 2),
+                "max": round(float(maxs[i]), 2),
+                "mean": round(float(sums[i]) / count, 2) if count else 0,
+            }
+        return summary
@@ -0,0 +1,35 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Limiteur de débit global (seau à jetons) partagé par toutes les coroutines.
+
+    `rate` jetons sont ajoutés par seconde, jusqu'à `capacity` jetons en réserve.
+    Chaque requête consomme un jeton : le débit moyen reste plafonné à `rate`
+    requêtes/s quel que soit le nombre de requêtes en vol.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    async def acquire(self):
+        """Attend qu'un jeton soit disponible puis le consomme."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        # Le verrou sert de file d'attente : les coroutines passent dans l'ordre d'arrivée
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
@@ -0,0 +1,298 @@
+"""Serveur local remplaçant marchespublics.gov.ma pour les tests de charge hors ligne.
+
+Sert /bdc/entreprise/consultation/resultat (recherche, natures, cartes) et
+/bdc/entreprise/consultation/show/{id} (détail), à partir d'un dossier de cache HTTP
+enregistré (common.http_cache, CACHE_MODE = "cache") ou de pages synthétiques.
+Latence, erreurs 5xx, timeouts (connexion gardée ouverte sans réponse) et « Nombre de
+résultats » sont configurables. Les scrapers y sont redirigés avec la variable
+d'environnement MARCHES_BASE_URL :
+
+    python -m common.replay_server [replay_config.json]
+    MARCHES_BASE_URL=http://127.0.0.1:8765 python Scraper/full_scraper.py
+
+GET /__stats retourne les compteurs du serveur en JSON.
+"""
+import json
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from common.http_cache import HttpCache
+
+RESULTS_PATH = "/bdc/entreprise/consultation/resultat"
+DETAIL_PATH = "/bdc/entreprise/consultation/show/"
+
+DEFAULT_CONFIG = {
+    "host": "127.0.0.1",
+    "port": 8765,
+    "recordings": None,            # dossier http_cache à rejouer, None : pages synthétiques uniquement
+    "recorded_base_url": "https://www.marchespublics.gov.ma",
+    "synthetic_fallback": True,    # page synthétique si l'URL n'est pas enregistrée (sinon 404)
+    "total_results": 300,          # « Nombre de résultats » de chaque recherche
+    "results_per_day": 25,         # sans filtre de date, les cartes remontent d'un jour tous les N résultats
+    "latest_date": "2025-07-28",
+    "infructueux_every": 5,        # une carte sur N sans attributaire
+    "natures": {"1": "Fournitures", "2": "Travaux", "3": "Services", "4": "Études"},
+    "detail_hit_rate": 0.3,        # part des IDs de détail qui existent
+    "detail_gaps": [],             # plages [début, fin] d'IDs sans consultation
+    "latency": 0.05,               # secondes par réponse
+    "jitter": 0.02,
+    "error_rate": 0.0,             # part des requêtes en erreur 5xx
+    "error_status": 503,
+    "timeout_rate": 0.0,           # part des requêtes laissées sans réponse pendant hang_seconds
+    "hang_seconds": 10,
+    "seed": 0,
+}
+
+CARD = """<div class="entreprise__card">
+  <div class="entreprise__leftSubCard">
+    <a href="{detail_path}{id}" class="font-bold table__links">Référence : {reference}</a>
+    <div data-bs-toggle="tooltip">Objet : {objet}</div>
+    <div><span>Acheteur :</span> {acheteur}</div>
+    <div><span>Date de publication du résultat :</span> {date}</div>
+  </div>
+  <div class="entreprise__rightSubCard--top">
+    <span>Nombre de devis reçus : <span class="font-bold">{devis}</span></span>
+    {attribution}
+  </div>
+</div>"""
+
+ATTRIBUTION = """<span>Attributaire : <span class="font-bold">{attributaire}</span></span>
+    <span>Montant TTC : <span class="font-bold">{montant} MAD</span></span>"""
+
+DETAIL = """<html><body>
+<h4>{reference}</h4>
+<span class="text-black">{objet}</span>
+<div class="d-flex flex-column"><span>Acheteur</span><span>{acheteur}</span></div>
+<div class="d-flex flex-column"><span>Date de mise en ligne</span><span>{date}</span></div>
+<div class="d-flex flex-column"><span>Date limite</span><span>{date}</span></div>
+<div class="d-flex flex-column"><span>Lieu d'exécution</span><span>Rabat</span></div>
+<div class="d-flex flex-column"><span>Catégorie</span><span>Fournitures</span></div>
+<div class="d-flex flex-column"><span>Nature de prestation</span><span>Achat de fournitures</span></div>
+<div class="accordion-item"><button class="accordion-button">Article 1</button>
+  <div class="content__article--subMiniCard">Quantité</div><div class="content__article--subMiniCard">{quantite}</div></div>
+</body></html>"""
+
+EMPTY_DETAIL = "<html><body><p>Consultation introuvable</p></body></html>"
+
+
+def _montant(value):
+    """Montant au format du site : 12 480,00"""
+    return f"{value:,.2f}".replace(",", " ").replace(".", ",")
+
+
+def results_page(config, params):
+    """Page de résultats synthétique pour les paramètres de recherche donnés."""
+    def param(name, default=""):
+        return params.get(f"search_consultation_resultats[{name}]", [default])[0] or default
+
+    nature = param("naturePrestation", "0")
+    categorie = param("categorie", "0")
+    date_filter = param("dateLimitePublicationStart")
+    page_size = int(param("pageSize", "50"))
+    page = int(params.get("page", ["1"])[0] or 1)
+    total = config["total_results"]
+    latest = datetime.strptime(config["latest_date"], "%Y-%m-%d")
+
+    cards = []
+    for index in range((page - 1) * page_size, min(total, page * page_size)):
+        if date_filter:
+            day = datetime.strptime(date_filter, "%Y-%m-%d")
+        else:
+            day = latest - timedelta(days=index // config["results_per_day"])
+        attribution = ""
+        if index % config["infructueux_every"]:
+            attribution = ATTRIBUTION.format(
+                attributaire=f"STE FOURNISSEUR {index % 37} SARL", montant=_montant(1000 + index * 137.5)
+            )
+        cards.append(CARD.format(
+            detail_path=DETAIL_PATH, id=index + 1,
+            reference=f"{index + 1}/{day.year}/N{nature}C{categorie}",
+            objet=f"Achat de fournitures lot {index % 11} - consultation {index + 1}",
+            acheteur=f"Commune {index % 23}",
+            date=day.strftime("%d/%m/%Y"),
+            devis=index % 6,
+            attribution=attribution,
+        ))
+
+    options = "".join(f'<option value="{nid}">{label}</option>' for nid, label in config["natures"].items())
+    return f"""<!DOCTYPE html>
+<html lang="fr"><head><meta charset="utf-8"><title>Résultats des consultations</title></head><body>
+<div class="content__resultat"><span>Nombre de résultats :</span> <span class="font-bold">{total}</span></div>
+<select id="search_consultation_resultats_naturePrestation" name="search_consultation_resultats[naturePrestation]">
+<option value="">Toutes les natures</option>{options}</select>
+{"".join(cards)}
+</body></html>"""
+
+
+def detail_exists(config, id_):
+    if any(start <= id_ <= end for start, end in config["detail_gaps"]):
+        return False
+    return (id_ * 2654435761) % 1000 < config["detail_hit_rate"] * 1000
+
+
+def detail_page(config, id_):
+    if not detail_exists(config, id_):
+        return EMPTY_DETAIL
+    return DETAIL.format(
+        reference=f"{id_}/2025/BC", objet=f"Consultation synthétique {id_}",
+        acheteur=f"Commune {id_ % 23}", date="14/07/2025", quantite=id_ % 50 + 1,
+    )
+
+
+class ServerStats:
+    """Compteurs côté serveur : requêtes, statuts, pannes injectées et pages distinctes servies."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = {}
+            self.status = {}
+            self.injected_errors = 0
+            self.injected_timeouts = 0
+            self.requested_urls = set()
+            self.served_urls = set()
+
+    def record(self, kind, path, status=None, injected=None):
+        with self._lock:
+            self.requests[kind] = self.requests.get(kind, 0) + 1
+            if kind in ("resultat", "show"):
+                self.requested_urls.add(path)
+            if status is not None:
+                self.status[str(status)] = self.status.get(str(status), 0) + 1
+                if status == 200 and kind in ("resultat", "show"):
+                    self.served_urls.add(path)
+            if injected == "error":
+                self.injected_errors += 1
+            elif injected == "timeout":
+                self.injected_timeouts += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "requests": dict(self.requests),
+                "status": dict(self.status),
+                "injected_errors": self.injected_errors,
+                "injected_timeouts": self.injected_timeouts,
+                "distinct_pages_requested": len(self.requested_urls),
+                "distinct_pages_served": len(self.served_urls),
+            }
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, content_type="text/html; charset=utf-8"):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        server = self.server
+        config = server.config
+        parsed = urlparse(self.path)
+        if parsed.path == "/__stats":
+            return self._send(200, json.dumps(server.stats.snapshot()), "application/json")
+
+        if parsed.path.startswith(DETAIL_PATH):
+            kind = "show"
+        elif parsed.path.rstrip("/") == RESULTS_PATH:
+            kind = "resultat"
+        else:
+            kind = "other"
+
+        with server.random_lock:
+            draw = server.random.random()
+            delay = max(0.0, config["latency"] + server.random.uniform(-config["jitter"], config["jitter"]))
+
+        if draw < config["timeout_rate"]:
+            server.stats.record(kind, self.path, injected="timeout")
+            time.sleep(config["hang_seconds"])
+            self.close_connection = True
+            return
+        time.sleep(delay)
+        if draw < config["timeout_rate"] + config["error_rate"]:
+            server.stats.record(kind, self.path, config["error_status"], injected="error")
+            return self._send(config["error_status"], "<html><body>Service indisponible</body></html>")
+
+        body = None
+        if server.recordings is not None:
+            hit = server.recordings.lookup(config["recorded_base_url"] + self.path, ignore_ttl=True)
+            if hit is not None:
+                raw, entry = hit
+                body = raw.decode(entry.get("encoding") or "utf-8", errors="replace")
+        if body is None and (server.recordings is None or config["synthetic_fallback"]):
+            if kind == "resultat":
+                body = results_page(config, parse_qs(parsed.query, keep_blank_values=True))
+            elif kind == "show":
+                try:
+                    body = detail_page(config, int(parsed.path[len(DETAIL_PATH):].strip("/")))
+                except ValueError:
+                    body = None
+
+        if body is None:
+            server.stats.record(kind, self.path, 404)
+            return self._send(404, "<html><body>Introuvable</body></html>")
+        server.stats.record(kind, self.path, 200)
+        self._send(200, body)
+
+
+class ReplayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, config):
+        self.config = config
+        self.stats = ServerStats()
+        self.random = random.Random(config["seed"])
+        self.random_lock = threading.Lock()
+        self.recordings = HttpCache(config["recordings"], mode="replay") if config["recordings"] else None
+        super().__init__((config["host"], config["port"]), ReplayHandler)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def load_config(path=None, **overrides):
+    """Configuration par défaut, complétée par un fichier JSON puis par `overrides`."""
+    config = dict(DEFAULT_CONFIG)
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            config.update(json.load(f))
+    config.update(overrides)
+    return config
+
+
+def start_server(config=None):
+    """Démarre le serveur dans un thread (port 0 : port libre choisi par le système) et le retourne."""
+    server = ReplayServer(config or load_config())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(config_path=None):
+    server = ReplayServer(load_config(config_path))
+    print(f"🛰️  Serveur de rejeu sur {server.url} (MARCHES_BASE_URL={server.url})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n📊 {json.dumps(server.stats.snapshot(), ensure_ascii=False)}")
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,189 @@
+"""Texte tokenisé une seule fois : vocabulaire global + identifiants int32 par enregistrement.
+
+Les prédicteurs par mots-clés (predict_from_keywords.py, predict_new_data.py, predict.py)
+normalisaient le texte de chaque enregistrement à chaque exécution (NFD, ponctuation,
+mots vides). Ici :
+
+- Vocabulary : liste ordonnée des tokens (un token garde son identifiant pour toujours),
+  enregistrée dans un seul fichier JSON partagé par tous les fichiers tokenisés ;
+- tokenize_file() écrit à côté d'un fichier JSONL un <fichier>.<variante>.tokens.npz
+  (identifiants int32 mis bout à bout + positions de début de chaque enregistrement) et le
+  relit tant que la source (taille, date) et le tokeniseur (variante, mots vides) n'ont pas
+  changé ; une évaluation répétée ne refait aucun traitement de texte.
+
+Chaque enregistrement garde ses tokens distincts dans leur ordre d'apparition.
+
+    python -m common.token_store <variante> fichier.jsonl [...]   # tokenisation à l'ingestion
+"""
+import hashlib
+import json
+import os
+import re
+import sys
+import unicodedata
+from string import punctuation
+
+import numpy as np
+
+DEFAULT_VOCABULARY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "store", "vocabulary.json")
+
+# Variantes des scripts existants : clean_and_tokenize (chiffres gardés) et normalize_text de
+# predict_from_keywords.py (chiffres supprimés) ; mots de plus de 2 lettres hors mots vides
+VARIANTS = {
+    "racines": {"keep_digits": True, "min_length": 3},
+    "keywords": {"keep_digits": False, "min_length": 3},
+}
+
+# Même classe que l'ancien rf"[{punctuation}]", où « \] » échappait le crochet : la barre oblique inverse reste
+_PUNCTUATION = re.compile(f"[{re.escape(punctuation.replace(chr(92), ''))}]")
+_DIGITS = re.compile(r"\d+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_text(text, keep_digits=True):
+    text = text.lower()
+    text = unicodedata.normalize('NFD', text)
+    text = text.encode('ascii', 'ignore').decode('utf-8')
+    text = _PUNCTUATION.sub(" ", text)
+    if not keep_digits:
+        text = _DIGITS.sub(" ", text)
+    text = _SPACES.sub(" ", text)
+    return text.strip()
+
+
+def tokenize(text, stopwords, variant="racines"):
+    """Tokens distincts d'un texte, dans leur ordre d'apparition."""
+    options = VARIANTS[variant]
+    words = normalize_text(text or "", options["keep_digits"]).split()
+    return list(dict.fromkeys(w for w in words if w not in stopwords and len(w) >= options["min_length"]))
+
+
+def tokenizer_fingerprint(variant, stopwords):
+    digest = hashlib.sha1(json.dumps([variant, VARIANTS[variant], sorted(stopwords)]).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class Vocabulary:
+    def __init__(self, path=DEFAULT_VOCABULARY):
+        self.path = path
+        self.tokens = []
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.tokens = json.load(f)
+        self.index = {token: i for i, token in enumerate(self.tokens)}
+        self._saved = len(self.tokens)
+        self._digests = {}
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def encode(self, tokens):
+        """Identifiants des tokens (les nouveaux sont ajoutés au vocabulaire)."""
+        ids = []
+        for token in tokens:
+            token_id = self.index.get(token)
+            if token_id is None:
+                token_id = self.index[token] = len(self.tokens)
+                self.tokens.append(token)
+            ids.append(token_id)
+        return ids
+
+    def decode(self, ids):
+        return [self.tokens[i] for i in ids]
+
+    def digest(self, size=None):
+        """Empreinte des `size` premiers tokens : un fichier d'identifiants n'est valable qu'avec ce préfixe."""
+        size = len(self.tokens) if size is None else size
+        if size > len(self.tokens):
+            return None
+        if size not in self._digests:
+            self._digests[size] = hashlib.sha1("\n".join(self.tokens[:size]).encode("utf-8")).hexdigest()
+        return self._digests[size]
+
+    def save(self):
+        if len(self.tokens) == self._saved:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.tokens, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self._saved = len(self.tokens)
+
+
+class TokenizedRecords:
+    """Identifiants de tokens des enregistrements d'un fichier, dans l'ordre des lignes non vides."""
+
+    def __init__(self, ids, offsets):
+        self.ids = ids
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.ids[self.offsets[i]:self.offsets[i + 1]]
+
+    def sets(self):
+        """Ensemble d'identifiants de chaque enregistrement (pour les recouvrements de mots-clés)."""
+        ids = self.ids.tolist()
+        offsets = self.offsets.tolist()
+        return [frozenset(ids[start:end]) for start, end in zip(offsets, offsets[1:])]
+
+
+def tokens_path(data_path, variant):
+    return f"{data_path}.{variant}.tokens.npz"
+
+
+def _read_jsonl(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def tokenize_file(data_path, vocabulary, stopwords, variant="racines", text_field="text"):
+    """Identifiants de tokens de chaque enregistrement de `data_path`, relus s'ils sont à jour."""
+    path = tokens_path(data_path, variant)
+    stat = os.stat(data_path)
+    fingerprint = tokenizer_fingerprint(variant, stopwords)
+    if os.path.exists(path):
+        with np.load(path) as stored:
+            if (int(stored["source_size"]) == stat.st_size and float(stored["source_mtime"]) == stat.st_mtime
+                    and str(stored["tokenizer"]) == fingerprint
+                    and "vocabulary" in stored.files
+                    and str(stored["vocabulary"]) == vocabulary.digest(int(stored["vocabulary_size"]))):
+                return TokenizedRecords(stored["ids"], stored["offsets"])
+
+    ids, offsets = [], [0]
+    for record in _read_jsonl(data_path):
+        ids.extend(vocabulary.encode(tokenize(record.get(text_field, ""), stopwords, variant)))
+        offsets.append(len(ids))
+    records = TokenizedRecords(np.array(ids, dtype=np.int32), np.array(offsets, dtype=np.int64))
+
+    # Le vocabulaire d'abord : le fichier de tokens ne référence que des identifiants enregistrés
+    vocabulary.save()
+    tmp_path = path + ".tmp.npz"
+    np.savez(tmp_path, ids=records.ids, offsets=records.offsets, source_size=stat.st_size,
+             source_mtime=stat.st_mtime, tokenizer=fingerprint, vocabulary_size=len(vocabulary),
+             vocabulary=vocabulary.digest())
+    os.replace(tmp_path, path)
+    return records
+
+
+def main(args):
+    if len(args) < 2 or args[0] not in VARIANTS:
+        print(f"Usage : python -m common.token_store <{'|'.join(VARIANTS)}> fichier.jsonl [...]")
+        return 1
+    from nltk.corpus import stopwords
+    french = set(stopwords.words("french"))
+    vocabulary = Vocabulary()
+    for path in args[1:]:
+        records = tokenize_file(path, vocabulary, french, args[0])
+        print(f"✅ {path} : {len(records)} enregistrements, {len(records.ids)} tokens → {tokens_path(path, args[0])}")
+    print(f"📚 Vocabulaire : {len(vocabulary)} tokens ({vocabulary.path})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
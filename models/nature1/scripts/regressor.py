@@ -1,27 +1,24 @@
-import json
-import pandas as pd
 import numpy as np
 from sklearn.ensemble import GradientBoostingRegressor
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 from sklearn.model_selection import train_test_split, cross_val_score
-from sentence_transformers import SentenceTransformer
 import matplotlib.pyplot as plt
 import os
+import sys
 
-# === 1. Charger les données JSON ===
-json_path = "../nature1.json"
-if not os.path.exists(json_path):
-    raise FileNotFoundError(f"Fichier '{json_path}' introuvable.")
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+from common.dataset_store import load_cleaned
+from common.embedding_cache import embed_texts
 
-with open(json_path, "r", encoding="utf-8") as f:
-    data = json.load(f)
+EMBED_MODEL_NAME = "paraphrase-multilingual-MiniLM-L12-v2"
 
-# Gérer le cas d'un seul enregistrement JSON
-if not isinstance(data, list):
-    data = [data]
+# === 1. Source : stockage Parquet s'il contient la nature, sinon fichier JSON ===
+json_path = "../nature1.json"
 
 # === 2. Charger dans un DataFrame ===
-df = pd.DataFrame(data)
+df = load_cleaned("nature1", json_path, columns=["montant", "objet", "acheteur", "reference"])
+if df is None:
+    raise FileNotFoundError(f"Fichier '{json_path}' introuvable.")
 
 # === 3. Nettoyer les données ===
 df = df[df["montant"].notna() & df["objet"].notna() & df["acheteur"].notna()]
@@ -34,8 +31,8 @@ def fusion_texte(row):
 df["texte_complet"] = df.apply(fusion_texte, axis=1)
 
 # === 5. Encoder le texte avec SentenceTransformer ===
-model = SentenceTransformer("paraphrase-multilingual-MiniLM-L12-v2")
-X = model.encode(df["texte_complet"].tolist())
+# Seuls les textes absents du cache partagé (common.embedding_cache) sont encodés
+X = embed_texts(EMBED_MODEL_NAME, df["texte_complet"].tolist())
 
 # === 6. Log-transformer la cible ===
 y = np.log1p(df["montant"].values)  # log(1 + montant)
@@ -92,10 +89,10 @@ else:
     print(f"✅ Montant réel : {y_test_true[0]} MAD — Montant prédit : {y_pred[0]:.2f} MAD")
 
 # === 12. Fonction pour prédire un nouvel enregistrement ===
-def predict_new_record(reg, model, nouvel_enregistrement):
+def predict_new_record(reg, model_name, nouvel_enregistrement):
     ref = nouvel_enregistrement.get("reference", "")
     texte = f"{nouvel_enregistrement['objet']} {nouvel_enregistrement['acheteur']} {ref}"
-    vecteur = model.encode([texte])
+    vecteur = embed_texts(model_name, [texte])
     log_montant = reg.predict(vecteur)[0]
     return np.expm1(log_montant)
 
@@ -124,5 +121,5 @@ while True:
         "reference": reference
     }
 
-    montant_pred = predict_new_record(reg, model, nouveau)
+    montant_pred = predict_new_record(reg, EMBED_MODEL_NAME, nouveau)
     print(f"➡️ Montant prédit : {montant_pred:.2f} MAD\n")
@@ -1,29 +1,20 @@
 import os
-import json
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", "..")))
+from common.merge_manifest import merge_daily_files
 
 # --- Configuration ---
 DAILY_DIR = "data_daily"
 OUTPUT_FILE = "merged_attributed.jsonl"
-
-# --- Filtrage des fichiers à fusionner ---
-files = sorted([
-    f for f in os.listdir(DAILY_DIR)
-    if f.startswith("attributed_") and f.endswith(".json")
-])
-
-total_records = 0
+# Fichiers déjà fusionnés (taille, date, sha1) : seuls les nouveaux sont ajoutés, reconstruction si l'un a changé
+MANIFEST_FILE = "merged_attributed.manifest.json"
 
 # --- Fusion des fichiers ---
-with open(OUTPUT_FILE, "w", encoding="utf-8") as outfile:
-    for file in files:
-        full_path = os.path.join(DAILY_DIR, file)
-        try:
-            with open(full_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                for record in data:
-                    outfile.write(json.dumps(record, ensure_ascii=False) + "\n")
-                    total_records += 1
-        except Exception as e:
-            print(f"❌ Erreur dans le fichier {file} : {e}")
+result = merge_daily_files(DAILY_DIR, OUTPUT_FILE, MANIFEST_FILE)
 
-print(f"✅ Fusion terminée : {total_records} enregistrements écrits dans {OUTPUT_FILE}")
+for name in result["merged_files"]:
+    print(f"➕ {name}")
+mode = "reconstruction" if result["rebuilt"] else f"{len(result['merged_files'])} nouveaux fichiers"
+print(f"✅ Fusion terminée ({mode}) : {result['new_records']} enregistrements ajoutés, "
+      f"{result['total_records']} au total dans {OUTPUT_FILE}")
@@ -15,7 +15,7 @@ RETRIES = 10
 TIMEOUT = 50
 PAGE_SIZE = 50
 
-BASE_URL = "https://www.marchespublics.gov.ma"
+BASE_URL = os.environ.get("MARCHES_BASE_URL", "https://www.marchespublics.gov.ma")
 SEARCH_URL = BASE_URL + "/bdc/entreprise/consultation/resultat"
 
 FIXED_URL_PART_1 = (
@@ -14,7 +14,7 @@ RETRIES = 20
 TIMEOUT = 60
 PAGE_SIZE = 10
 
-BASE_URL = "https://www.marchespublics.gov.ma"
+BASE_URL = os.environ.get("MARCHES_BASE_URL", "https://www.marchespublics.gov.ma")
 SEARCH_URL = BASE_URL + "/bdc/entreprise/consultation/resultat"
 
 headers = {"User-Agent": "Mozilla/5.0"}
@@ -5,12 +5,31 @@ import time
 import os
 import json
 import threading
+import sys
 
-BASE_URL = "https://www.marchespublics.gov.ma/bdc/entreprise/consultation/show/"
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", "..")))
+from common.detail_crawler import crawl_details
+from common.ndjson_sink import NdjsonSink, iter_ndjson
+from common.consultation_store import DEFAULT_PATH as STORE_DEFAULT_PATH, ConsultationStore
+
+BASE_URL = os.environ.get("MARCHES_BASE_URL", "https://www.marchespublics.gov.ma") + "/bdc/entreprise/consultation/show/"
 HEADERS = {"User-Agent": "Mozilla/5.0"}
 MAX_RETRIES = 20
 TIMEOUT = 60
 MAX_WORKERS = 10
+START_ID = 1
+END_ID = 215533
+
+# Mode de crawl : "legacy" (une session et 20 essais à 1 s par ID, tous les IDs soumis d'emblée)
+# ou "pooled" (session partagée, file bornée, backoff exponentiel, saut des trous d'IDs)
+CRAWLER_MODE = "legacy"
+POOLED_RETRIES = 8
+MAX_IN_FLIGHT = 4 * MAX_WORKERS
+GAP_THRESHOLD = 20  # pages vides consécutives avant d'espacer les IDs sondés
+MAX_STRIDE = 64
+
+# Base SQLite canonique des consultations (common.consultation_store), None pour la désactiver
+STORE_PATH = STORE_DEFAULT_PATH
 
 lock = threading.Lock()
 output_path = os.path.join("data", "consultations.ndjson")  # newline-delimited JSON
@@ -86,13 +105,22 @@ def write_result(result):
             f.write(json.dumps(result, ensure_ascii=False) + "\n")
 
 
+def store_details():
+    """Copie les consultations récupérées (et leurs articles) dans la base canonique."""
+    if not STORE_PATH:
+        return
+    with ConsultationStore(STORE_PATH) as store:
+        count = store.upsert_details(iter_ndjson(output_path))
+    print(f"🗄️  {count} consultations enregistrées dans {STORE_PATH}")
+
+
 def main():
     os.makedirs("data", exist_ok=True)
     # Si fichier existe, on le vide d'abord
     open(output_path, "w", encoding="utf-8").close()
 
-    start_id = 1
-    end_id = 215533
+    start_id = START_ID
+    end_id = END_ID
     valid_count = 0
 
     with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
@@ -106,7 +134,35 @@ def main():
                 print(f"[{result['id']}] ✅")
 
     print(f"\n✅ Total consultations valides récupérées : {valid_count}")
+    store_details()
+
+
+def main_pooled():
+    os.makedirs("data", exist_ok=True)
+    open(output_path, "w", encoding="utf-8").close()
+
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    with NdjsonSink(output_path) as sink:
+        def on_record(result):
+            sink.write(result)
+            print(f"[{result['id']}] ✅")
+
+        stats = crawl_details(
+            START_ID, END_ID, on_record, session=session,
+            max_workers=MAX_WORKERS, max_in_flight=MAX_IN_FLIGHT,
+            retries=POOLED_RETRIES, timeout=TIMEOUT,
+            gap_threshold=GAP_THRESHOLD, max_stride=MAX_STRIDE
+        )
+
+    print(f"\n✅ Total consultations valides récupérées : {stats['found']}")
+    print(f"📊 Sans contenu : {stats['empty']}, incomplètes : {stats['incomplete']}, "
+          f"échecs : {stats['failed']}, IDs sautés (trous) : {stats['skipped']}")
+    store_details()
 
 
 if __name__ == "__main__":
-    main()
+    if CRAWLER_MODE == "pooled":
+        main_pooled()
+    else:
+        main()
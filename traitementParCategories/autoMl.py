@@ -3,8 +3,14 @@ import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-from sentence_transformers import SentenceTransformer
 from tpot import TPOTRegressor
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.embedding_cache import embed_texts
+
+EMBED_MODEL_NAME = "dangvantuan/sentence-camembert-large"
 
 # === Charger les données JSON ===
 with open("data.json", "r", encoding="utf-8") as f:
@@ -20,11 +26,10 @@ y = df["montant"].tolist()
 # === Split ===
 X_train_text, X_test_text, y_train, y_test = train_test_split(X_text, y, test_size=0.3, random_state=42)
 
-# === Embedding avec CamemBERT ===
+# === Embedding avec CamemBERT (cache partagé : seuls les textes nouveaux sont encodés) ===
 print("🔄 Génération des embeddings CamemBERT...")
-model = SentenceTransformer("dangvantuan/sentence-camembert-large")
-X_train_emb = model.encode(X_train_text, show_progress_bar=True)
-X_test_emb = model.encode(X_test_text, show_progress_bar=True)
+X_train_emb = embed_texts(EMBED_MODEL_NAME, X_train_text, show_progress_bar=True)
+X_test_emb = embed_texts(EMBED_MODEL_NAME, X_test_text, show_progress_bar=True)
 
 # === AutoML avec TPOT ===
 print("\n🤖 Lancement de l'AutoML (TPOT)...")
@@ -4,9 +4,15 @@ from pathlib import Path
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-from sentence_transformers import SentenceTransformer
 import numpy as np
 import warnings
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.embedding_cache import embed_texts
+
+EMBED_MODEL_NAME = "dangvantuan/sentence-camembert-large"
 
 # Ignorer les avertissements
 warnings.filterwarnings("ignore")
@@ -45,12 +51,9 @@ def evaluate_camembert_for_nature(nature_id, data_file):
         
         print(f"   🔄 Embedding des textes avec CamemBERT pour nature_{nature_id}...")
         
-        # Charger CamemBERT depuis sentence-transformers
-        model = SentenceTransformer("dangvantuan/sentence-camembert-large")
-        
-        # Embedding des textes
-        X_train_embeddings = model.encode(X_train_text, show_progress_bar=False)
-        X_test_embeddings = model.encode(X_test_text, show_progress_bar=False)
+        # Embedding des textes (CamemBERT n'est chargé que pour les textes absents du cache partagé)
+        X_train_embeddings = embed_texts(EMBED_MODEL_NAME, X_train_text)
+        X_test_embeddings = embed_texts(EMBED_MODEL_NAME, X_test_text)
         
         # Modèle de régression
         reg = RandomForestRegressor(random_state=42)
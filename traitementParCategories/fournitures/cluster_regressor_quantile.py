@@ -1,20 +1,25 @@
 import json
+import os
+import sys
 import pandas as pd
 import numpy as np
 from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler
-from sentence_transformers import SentenceTransformer
 from lightgbm import LGBMRegressor
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common.embedding_cache import embed_texts
+
+EMBED_MODEL_NAME = "paraphrase-multilingual-MiniLM-L12-v2"
+
 # === Chargement des données JSON ===
 with open("data/attributed_cleaned.json", "r", encoding="utf-8") as f:
     data = json.load(f)
 df = pd.DataFrame(data).dropna(subset=["objet", "montant"])
 
-# === Encodage des textes ===
-model = SentenceTransformer("paraphrase-multilingual-MiniLM-L12-v2")
-embeddings = model.encode(df["objet"].tolist(), show_progress_bar=True)
+# === Encodage des textes (cache partagé : seuls les textes nouveaux sont encodés) ===
+embeddings = embed_texts(EMBED_MODEL_NAME, df["objet"].tolist(), show_progress_bar=True)
 
 # === Standardisation + Clustering ===
 scaler = StandardScaler()
@@ -24,9 +29,9 @@ df["cluster"] = kmeans.fit_predict(X_scaled)
 
 # === Entraînement des modèles quantile pour chaque cluster ===
 def train_models(cluster_id, group_df):
-    X = model.encode(group_df["objet"].tolist())
+    # Mêmes textes que l'embedding global : ses lignes sont réutilisées
+    X = X_scaled[(df["cluster"] == cluster_id).values]
     y = group_df["montant"].values
-    X = scaler.transform(X)
 
     quantiles = [0.1, 0.25, 0.5, 0.75, 0.9]
     models = {}
@@ -46,7 +51,7 @@ with ThreadPoolExecutor() as executor:
 
 # === Prédiction avec marges ===
 def predict_price(objet):
-    emb = model.encode([objet])
+    emb = embed_texts(EMBED_MODEL_NAME, [objet])
     X = scaler.transform(emb)
     cluster = kmeans.predict(X)[0]
     models = models_by_cluster[cluster]
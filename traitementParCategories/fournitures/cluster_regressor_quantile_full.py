@@ -1,38 +1,35 @@
 import os
 import json
 import pandas as pd
-import numpy as np
 from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler
-from sentence_transformers import SentenceTransformer
 from lightgbm import LGBMRegressor
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import joblib
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common.dataset_store import load_cleaned
+from common.embedding_cache import embed_texts
 
 # === Chemins ===
 DATA_PATH = "data/attributed_cleaned.json"
-EMBEDDINGS_PATH = "embeddings_fournitures.npy"
+DATASET_NATURE = "fournitures"
 SCALER_PATH = "scaler_fournitures.pkl"
 KMEANS_PATH = "kmeans_fournitures.pkl"
 MODELS_DIR = "models_cluster_lgbm"
 os.makedirs(MODELS_DIR, exist_ok=True)
 EMBED_MODEL_NAME = "paraphrase-multilingual-MiniLM-L12-v2"
 
-# === Chargement des données JSON ===
-with open(DATA_PATH, "r", encoding="utf-8") as f:
-    data = json.load(f)
-df = pd.DataFrame(data).dropna(subset=["objet", "acheteur", "reference", "montant"])
+# === Chargement des données (stockage Parquet s'il contient la catégorie, sinon JSON) ===
+df = load_cleaned(DATASET_NATURE, DATA_PATH, columns=["objet", "acheteur", "reference", "montant"])
+df = df.dropna(subset=["objet", "acheteur", "reference", "montant"])
 
 # === Embedding des textes (objet+acheteur+reference) ===
-model = SentenceTransformer(EMBED_MODEL_NAME)
+# Cache partagé indexé par texte (common.embedding_cache) : seuls les textes nouveaux sont encodés
+print("🔄 Calcul des embeddings...")
 texts = (df["objet"].astype(str) + " " + df["acheteur"].astype(str) + " " + df["reference"].astype(str)).tolist()
-if os.path.exists(EMBEDDINGS_PATH):
-    print("🔁 Chargement des embeddings depuis le disque...")
-    embeddings = np.load(EMBEDDINGS_PATH)
-else:
-    print("🔄 Calcul des embeddings...")
-    embeddings = model.encode(texts, show_progress_bar=True, batch_size=128)
-    np.save(EMBEDDINGS_PATH, embeddings)
+embeddings = embed_texts(EMBED_MODEL_NAME, texts, batch_size=128, show_progress_bar=True)
 
 # === Standardisation + Clustering ===
 if os.path.exists(SCALER_PATH) and os.path.exists(KMEANS_PATH):
@@ -60,9 +57,10 @@ def train_or_load_cluster(cid):
         return cid, joblib.load(cluster_models_path)
     else:
         print(f"⚙️ Entraînement des modèles pour cluster {cid}...")
-        group_df = df[df["cluster"] == cid]
-        X = model.encode((group_df["objet"].astype(str) + " " + group_df["acheteur"].astype(str) + " " + group_df["reference"].astype(str)).tolist(), batch_size=128, show_progress_bar=False)
-        X = scaler.transform(X)
+        in_cluster = (df["cluster"] == cid).values
+        group_df = df[in_cluster]
+        # Mêmes textes que l'embedding global : ses lignes sont réutilisées
+        X = scaler.transform(embeddings[in_cluster])
         y = group_df["montant"].values
         models = {}
         for alpha in quantiles:
@@ -85,10 +83,10 @@ RESULTS_PATH = "scraper/data_daily/prediction_results_day_cluster.json"
 with open(TEST_PATH, "r", encoding="utf-8") as f:
     test_data = json.load(f)
 df_test = pd.DataFrame(test_data).dropna(subset=["objet", "acheteur", "reference", "montant"])
+test_texts = [str(row["objet"]) + " " + str(row["acheteur"]) + " " + str(row["reference"]) for _, row in df_test.iterrows()]
+test_embeddings = embed_texts(EMBED_MODEL_NAME, test_texts, batch_size=128)
 
-def predict_row(row):
-    text = str(row["objet"]) + " " + str(row["acheteur"]) + " " + str(row["reference"])
-    emb = model.encode([text])
+def predict_row(row, emb):
     X = scaler.transform(emb)
     cluster = int(kmeans.predict(X)[0])
     models = models_by_cluster[cluster]
@@ -116,7 +114,7 @@ results = []
 inside_10_90 = 0
 inside_25_75 = 0
 with ThreadPoolExecutor() as executor:
-    futures = [executor.submit(predict_row, row) for idx, row in df_test.iterrows()]
+    futures = [executor.submit(predict_row, row, test_embeddings[i:i + 1]) for i, (idx, row) in enumerate(df_test.iterrows())]
     for future in as_completed(futures):
         res = future.result()
         results.append(res)
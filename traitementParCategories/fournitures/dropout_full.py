@@ -1,19 +1,24 @@
 import json
+import os
+import sys
 import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
-from sentence_transformers import SentenceTransformer
 import tensorflow as tf
 from tensorflow.keras import layers, models, backend as K
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common.embedding_cache import embed_texts
+
+EMBED_MODEL_NAME = "paraphrase-multilingual-MiniLM-L12-v2"
+
 # === Chargement des données ===
 with open("data.json", "r", encoding="utf-8") as f:
     data = json.load(f)
 df = pd.DataFrame(data).dropna(subset=["objet", "montant"])
 
-# === Embedding avec SentenceTransformer ===
-encoder = SentenceTransformer("paraphrase-multilingual-MiniLM-L12-v2")
-X = encoder.encode(df["objet"].tolist(), show_progress_bar=True)
+# === Embedding avec SentenceTransformer (cache partagé : seuls les textes nouveaux sont encodés) ===
+X = embed_texts(EMBED_MODEL_NAME, df["objet"].tolist(), show_progress_bar=True)
 y = df["montant"].values
 
 # === Split pour évaluation
@@ -36,7 +41,7 @@ model.fit(X_train, y_train, epochs=30, batch_size=32, verbose=1)
 
 # === Prédiction Monte Carlo Dropout
 def predict_mc_dropout(text, n_iter=100):
-    x_embed = encoder.encode([text])
+    x_embed = embed_texts(EMBED_MODEL_NAME, [text])
     preds = np.array([model(x_embed, training=True).numpy().flatten()[0] for _ in range(n_iter)])
     mean = preds.mean()
     std = preds.std()
@@ -1,12 +1,16 @@
 import json
+import os
+import sys
 import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-from sentence_transformers import SentenceTransformer
 import joblib
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+from common.embedding_cache import embed_texts, shared_model
+
 # === 1. Charger les données ===
 def load_data(json_path):
     with open(json_path, "r", encoding="utf-8") as f:
@@ -21,9 +25,9 @@ def prepare(df):
 
 # === 3. Vectorisation par SentenceTransformer ===
 def encode_texts(texts, model_name="paraphrase-multilingual-MiniLM-L12-v2"):
-    model = SentenceTransformer(model_name)
-    embeddings = model.encode(texts, show_progress_bar=True)
-    return embeddings, model
+    # Seuls les textes absents du cache partagé (common.embedding_cache) sont encodés
+    embeddings = embed_texts(model_name, list(texts), show_progress_bar=True)
+    return embeddings, shared_model(model_name)
 
 # === 4. Entraînement et évaluation ===
 def train_and_evaluate(name, model, X_train, X_test, y_train, y_test):
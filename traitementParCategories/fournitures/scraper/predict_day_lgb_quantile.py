@@ -1,12 +1,15 @@
 import os
+import sys
 import json
 import pandas as pd
 import numpy as np
-from sentence_transformers import SentenceTransformer
 from sklearn.feature_extraction.text import TfidfVectorizer
 from scipy.sparse import hstack, csr_matrix
 import joblib
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+from common.embedding_cache import embed_texts
+
 # === Chemins ===
 MODELS_DIR = "models_lgb_quantile"
 DATA_PATH = "fournitures/scraper/data_daily/attributed_cleaned_day.json"
@@ -23,10 +26,8 @@ assert os.path.exists(tfidf_path), "TF-IDF manquant"
 assert all(os.path.exists(p) for p in models_paths.values()), "Un ou plusieurs modèles manquent"
 assert os.path.exists(embed_name_path), "Nom du modèle d'embedding manquant"
 
-print("🔄 Chargement du modèle SentenceTransformer...")
 with open(embed_name_path, "r", encoding="utf-8") as f:
     embedder_name = f.read().strip()
-model_embed = SentenceTransformer(embedder_name)
 tfidf = joblib.load(tfidf_path)
 models = {q: joblib.load(models_paths[q]) for q in models_paths}
 quantiles = [0.1, 0.5, 0.9]
@@ -36,12 +37,16 @@ with open(DATA_PATH, "r", encoding="utf-8") as f:
     data = json.load(f)
 df = pd.DataFrame(data)
 
+# === Embeddings de la journée en un seul lot (cache partagé : seuls les textes nouveaux sont encodés) ===
+texts = (df["objet"].astype(str) + " " + df["acheteur"].astype(str)).tolist() if len(df) else []
+embeddings = embed_texts(embedder_name, texts, batch_size=128)
+
 # === Prédiction ===
 results = []
 inside_count = 0
-for idx, row in df.iterrows():
-    texte = str(row["objet"]) + " " + str(row["acheteur"])
-    embed = model_embed.encode([texte])
+for i, (idx, row) in enumerate(df.iterrows()):
+    texte = texts[i]
+    embed = embeddings[i:i + 1]
     tfidf_vec = tfidf.transform([texte])
     input_vec = hstack([csr_matrix(embed), tfidf_vec])
     preds = {f"q{int(q*100)}": float(models[q].predict(input_vec)[0]) for q in quantiles}
@@ -1,12 +1,16 @@
 import json
 import os
 import pandas as pd
-import numpy as np
 from sklearn.ensemble import GradientBoostingRegressor
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sentence_transformers import SentenceTransformer
 from scipy.sparse import hstack, csr_matrix
 import joblib
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.embedding_cache import embed_texts
+
+EMBED_MODEL_NAME = "paraphrase-multilingual-MiniLM-L12-v2"
 
 # === 1. Définir les chemins de données ===
 data_files = {
@@ -25,8 +29,6 @@ MODELS_DIR = "models"
 os.makedirs(MODELS_DIR, exist_ok=True)
 
 # === 3. Charger et entraîner/recharger pour chaque catégorie ===
-print("🔄 Chargement du modèle SentenceTransformer...")
-model_embed = SentenceTransformer("paraphrase-multilingual-MiniLM-L12-v2")
 
 for cat, path in data_files.items():
     print(f"\n📂 Traitement de {cat}...")
@@ -39,7 +41,7 @@ for cat, path in data_files.items():
         models = {q: joblib.load(models_paths[q]) for q in models_paths}
         category_models[cat] = models
         category_vectorizers[cat] = tfidf
-        category_embedders[cat] = model_embed
+        category_embedders[cat] = EMBED_MODEL_NAME
         print(f"  ✅ Modèles chargés pour {cat}.")
         continue
     # Sinon, entraîner et sauvegarder
@@ -55,7 +57,8 @@ for cat, path in data_files.items():
     df["texte_complet"] = df["objet"].astype(str) + " " + df["acheteur"].astype(str)
     # Embedding
     print("  → Embedding sémantique...")
-    sentence_vectors = np.vstack(df["texte_complet"].apply(lambda x: model_embed.encode(x)))
+    # Un seul lot, et seulement les textes absents du cache partagé (common.embedding_cache)
+    sentence_vectors = embed_texts(EMBED_MODEL_NAME, df["texte_complet"].tolist())
     # TF-IDF
     print("  → Vectorisation TF-IDF...")
     tfidf = TfidfVectorizer()
@@ -77,16 +80,16 @@ for cat, path in data_files.items():
     # Stockage en mémoire
     category_models[cat] = models
     category_vectorizers[cat] = tfidf
-    category_embedders[cat] = model_embed
+    category_embedders[cat] = EMBED_MODEL_NAME
     print(f"  ✅ Modèles entraînés et sauvegardés pour {cat}.")
 
 # === 4. Boucle interactive ===
 def predict_interval(cat, objet_input, acheteur_input):
     tfidf = category_vectorizers[cat]
     models = category_models[cat]
-    embedder = category_embedders[cat]
+    embedder_name = category_embedders[cat]
     text_input = objet_input + " " + acheteur_input
-    embed_vec = embedder.encode(text_input).reshape(1, -1)
+    embed_vec = embed_texts(embedder_name, [text_input])
     tfidf_vec = tfidf.transform([text_input])
     input_vec = hstack([csr_matrix(embed_vec), tfidf_vec])
     prediction = {
@@ -1,13 +1,15 @@
 import os
-import json
-import pandas as pd
 import numpy as np
-from sentence_transformers import SentenceTransformer
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.model_selection import train_test_split
 from scipy.sparse import hstack, csr_matrix
 import lightgbm as lgb
 import joblib
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.dataset_store import load_cleaned
+from common.embedding_cache import embed_texts
 
 # === 1. Fichiers à traiter ===
 data_files = {
@@ -25,11 +27,7 @@ category_models = {}
 category_vectorizers = {}
 category_embedder_name = {}
 
-# === 3. Chargement du modèle d'embedding ===
-print(f"🔄 Chargement du modèle SentenceTransformer: {EMBED_MODEL_NAME}")
-model_embed = SentenceTransformer(EMBED_MODEL_NAME)
-
-# === 4. Entraînement ou chargement des modèles ===
+# === 3. Entraînement ou chargement des modèles ===
 for cat, path in data_files.items():
     print(f"\n📂 Catégorie : {cat}")
     tfidf_path = os.path.join(MODELS_DIR, f"{cat}_tfidf.pkl")
@@ -47,20 +45,18 @@ for cat, path in data_files.items():
         category_embedder_name[cat] = embedder_name
         print(f"  ✅ Modèles chargés pour {cat}.")
         continue
-    # Sinon, entraîner et sauvegarder
-    if not os.path.exists(path):
+    # Sinon, entraîner et sauvegarder (stockage Parquet s'il contient la catégorie, sinon JSON)
+    df = load_cleaned(cat, path, columns=["objet", "acheteur", "montant"])
+    if df is None:
         print(f"❌ Fichier non trouvé: {path}")
         continue
-    with open(path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    df = pd.DataFrame(data)
     if not all(col in df.columns for col in ["objet", "acheteur", "montant"]):
         print(f"❌ Colonnes manquantes dans {cat}")
         continue
     df["texte_complet"] = df["objet"].astype(str) + " " + df["acheteur"].astype(str)
-    # Embeddings batchés
+    # Embeddings batchés (le modèle n'est chargé que pour les textes absents du cache partagé)
     print("  → Génération des embeddings (batch)...")
-    embed_matrix = model_embed.encode(df["texte_complet"].tolist(), batch_size=128, show_progress_bar=True)
+    embed_matrix = embed_texts(EMBED_MODEL_NAME, df["texte_complet"].tolist(), batch_size=128, show_progress_bar=True)
     # TF-IDF
     print("  → Vectorisation TF-IDF...")
     tfidf = TfidfVectorizer()
@@ -98,12 +94,12 @@ for cat, path in data_files.items():
     category_embedder_name[cat] = EMBED_MODEL_NAME
     print(f"  ✅ Modèles entraînés et sauvegardés pour {cat}.")
 
-# === 5. Prédiction interactive ===
+# === 4. Prédiction interactive ===
 def predict_interval(cat, objet, acheteur):
     tfidf = category_vectorizers[cat]
     models = category_models[cat]
     texte = objet + " " + acheteur
-    embed = model_embed.encode([texte])
+    embed = embed_texts(category_embedder_name[cat], [texte])
     tfidf_vec = tfidf.transform([texte])
     input_vec = hstack([csr_matrix(embed), tfidf_vec])
     result = {}
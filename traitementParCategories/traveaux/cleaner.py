@@ -1,40 +1,15 @@
 import json
 import os
-import re
+import sys
 
-def convert_montant(montant_str):
-    """Convertit une chaîne de montant en nombre flottant."""
-    if not montant_str:
-        return None
-    
-    # Supprimer les espaces et remplacer la virgule par un point
-    montant_str = montant_str.replace(' ', '').replace(',', '.')
-    
-    # Extraire uniquement les chiffres et le point décimal
-    match = re.search(r'([\d.]+)', montant_str)
-    if not match:
-        return None
-        
-    try:
-        return float(match.group(1))
-    except ValueError:
-        return None
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common.dataset_store import write_records
+from common.cleaning import clean_data
 
-def clean_data(data):
-    """Nettoie les données en gardant uniquement les champs requis et en convertissant le montant."""
-    cleaned = []
-    for item in data:
-        if not item:
-            continue
-            
-        cleaned_item = {
-            "reference": item.get("reference"),
-            "objet": item.get("objet"),
-            "acheteur": item.get("acheteur"),
-            "montant": convert_montant(item.get("montant"))
-        }
-        cleaned.append(cleaned_item)
-    return cleaned
+# Stockage Parquet partagé (common.dataset_store.DEFAULT_ROOT pour l'activer), désactivé par défaut.
+# Les scripts d'entraînement ne le lisent que pour une nature importée avec son historique (import_json)
+DATASET_DIR = None
+DATASET_NATURE = "traveaux"
 
 def main():
     # Chemin vers le dossier data
@@ -64,6 +39,11 @@ def main():
             
         print(f"✅ Données nettoyées sauvegardées dans {cleaned_file}")
         print(f"📊 Nombre d'entrées traitées : {len(cleaned_data)}")
+
+        # Les données brutes gardent date_publication, utilisée pour partitionner par jour
+        if DATASET_DIR:
+            count = write_records(DATASET_NATURE, data, DATASET_DIR, replace=True)
+            print(f"🗄️  {count} enregistrements écrits dans le stockage Parquet ({DATASET_NATURE})")
         
     except Exception as e:
         print(f"❌ Erreur lors du nettoyage des données : {e}")
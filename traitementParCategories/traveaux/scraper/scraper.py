@@ -3,18 +3,22 @@ from bs4 import BeautifulSoup
 import time
 import random
 import os
+import sys
 import json
 import re
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+from common.card_extractor import extract_cards
+
 # --- Configuration ---
 MAX_WORKERS = 8
 RETRIES = 3
 TIMEOUT = 50
 PAGE_SIZE = 50
 
-BASE_URL = "https://www.marchespublics.gov.ma"
+BASE_URL = os.environ.get("MARCHES_BASE_URL", "https://www.marchespublics.gov.ma")
 SEARCH_URL = BASE_URL + "/bdc/entreprise/consultation/resultat"
 
 FIXED_URL_PART_1 = (
@@ -70,58 +74,6 @@ def get_max_page():
 
     return 1, 0
 
-def extract_card_data(card):
-    try:
-        ref_element = card.select_one('.font-bold.table__links')
-        reference = ref_element.text.strip().replace('Référence :', '').strip() if ref_element else None
-
-        object_element = card.select_one('[data-bs-toggle="tooltip"]')
-        obj = object_element.text.strip().replace('Objet :', '').strip() if object_element else None
-
-        buyer_span = card.find('span', string=lambda s: s and "Acheteur" in s)
-        buyer = buyer_span.parent.text.replace('Acheteur :', '').strip() if buyer_span else None
-
-        date_span = card.find('span', string=lambda s: s and "Date de publication" in s)
-        publication_date = date_span.parent.text.replace('Date de publication du résultat :', '').strip() if date_span else None
-
-        number_of_quotes = None
-        awarded = False
-        awarded_company = None
-        amount_ttc = None
-
-        right_card = card.select_one('.entreprise__rightSubCard--top')
-        if right_card:
-            quotes_match = right_card.find(string=lambda s: s and "Nombre de devis reçus" in s)
-            if quotes_match:
-                quotes_span = right_card.select_one("span span.font-bold")
-                if quotes_span:
-                    number_of_quotes = quotes_span.text.strip()
-
-            spans = right_card.find_all('span', recursive=False)
-
-            def get_bold_text(span):
-                b = span.find('span', class_='font-bold')
-                return b.text.strip() if b else None
-
-            if len(spans) >= 3:
-                awarded_company = get_bold_text(spans[1])
-                amount_ttc = get_bold_text(spans[2])
-                awarded = awarded_company is not None
-
-        return {
-            "reference": reference,
-            "objet": obj,
-            "acheteur": buyer,
-            "date_publication": publication_date,
-            "nombre_devis": number_of_quotes,
-            "attribue": awarded,
-            "entreprise_attributaire": awarded_company if awarded else None,
-            "montant": amount_ttc if awarded else None
-        }
-    except Exception as e:
-        print(f"[extract_card_data] Erreur extraction carte: {e}")
-        return None
-
 def fetch_page(page):
     query = (
         f"{FIXED_URL_PART_1}"
@@ -137,9 +89,7 @@ def fetch_page(page):
             res = session.get(url, timeout=TIMEOUT)
             res.raise_for_status()
 
-            soup = BeautifulSoup(res.text, 'lxml')
-            cards = soup.select('.entreprise__card')
-            return [extract_card_data(card) for card in cards if card]
+            return extract_cards(res.text)
         except requests.RequestException as e:
             print(f"[fetch_page] Tentative {attempt+1}/{RETRIES} Page {page} erreur: {e}")
             time.sleep(0.3)
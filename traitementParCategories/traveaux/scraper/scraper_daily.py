@@ -1,14 +1,21 @@
 import requests
 from bs4 import BeautifulSoup
-import time
 import random
 import os
-import json
 import re
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from tqdm import tqdm
+import sys
 from datetime import datetime, timedelta
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+from common.card_extractor import extract_cards
+from common.http_cache import CachedSession, CacheMiss
+from common.ndjson_sink import NdjsonSink, JsonArrayWriter, iter_ndjson
+from common.date_planner import date_window, discover_pages, run_plan
+from common.metrics import METRICS
+from common.dataset_store import write_records
+from common.cleaning import clean_data, iter_batches
+from common.consultation_store import DEFAULT_PATH as STORE_DEFAULT_PATH, ConsultationStore
+
 # --- Configuration ---
 NATURE_ID = 1
 MAX_WORKERS = 8
@@ -16,7 +23,7 @@ RETRIES = 3
 TIMEOUT = 50
 PAGE_SIZE = 50
 
-BASE_URL = "https://www.marchespublics.gov.ma"
+BASE_URL = os.environ.get("MARCHES_BASE_URL", "https://www.marchespublics.gov.ma")
 SEARCH_URL = BASE_URL + "/bdc/entreprise/consultation/resultat"
 
 FIXED_URL_PART_1 = (
@@ -39,47 +46,28 @@ FIXED_URL_PART_3 = (
 # Dossiers de sauvegarde
 DAILY_DIR = "data_daily"
 os.makedirs(DAILY_DIR, exist_ok=True)
+# Rapport de fin de run (latences, statuts, octets, retries, temps réseau/parsing/attente par date) :
+# .json ou .prom (texte Prometheus), None pour désactiver
+METRICS_REPORT = os.path.join(DAILY_DIR, "metrics.json")
+# Stockage Parquet partagé (common.dataset_store.DEFAULT_ROOT pour l'activer), désactivé par défaut.
+# Les scripts d'entraînement ne le lisent que pour une nature importée avec son historique (import_json)
+DATASET_DIR = None
+DATASET_NATURE = "traveaux"
+# Base SQLite canonique interrogeable par nature / date / acheteur (common.consultation_store), None pour la désactiver
+STORE_PATH = STORE_DEFAULT_PATH
+# Taille des lots de nettoyage (montants convertis par colonne, voir common.cleaning)
+CLEAN_BATCH_SIZE = 5000
+
+# Cache HTTP : "off", "cache", "refresh" ou "replay" (rejeu hors ligne, voir common.http_cache)
+CACHE_DIR = "http_cache"
+CACHE_MODE = "off"
+CACHE_TTL = 6 * 3600  # les résultats du jour évoluent : cache de quelques heures seulement
 
 headers = {"User-Agent": "Mozilla/5.0"}
-session = requests.Session()
+session = CachedSession(CACHE_DIR, CACHE_MODE, CACHE_TTL)
 session.headers.update(headers)
 
 
-def convert_montant(montant_str):
-    """Convertit une chaîne de montant en nombre flottant."""
-    if not montant_str:
-        return None
-    
-    # Supprimer les espaces et remplacer la virgule par un point
-    montant_str = montant_str.replace(' ', '').replace(',', '.')
-    
-    # Extraire uniquement les chiffres et le point décimal
-    match = re.search(r'([\d.]+)', montant_str)
-    if not match:
-        return None
-        
-    try:
-        return float(match.group(1))
-    except ValueError:
-        return None
-
-def clean_data(data):
-    """Nettoie les données en gardant uniquement les champs requis et en convertissant le montant."""
-    cleaned = []
-    for item in data:
-        if not item:
-            continue
-            
-        cleaned_item = {
-            "reference": item.get("reference"),
-            "objet": item.get("objet"),
-            "acheteur": item.get("acheteur"),
-            "montant": convert_montant(item.get("montant"))
-        }
-        cleaned.append(cleaned_item)
-    return cleaned
-
-
 def get_max_page(date_str):
     """Retourne le nombre de pages et de résultats pour une date donnée."""
     date_obj = datetime.strptime(date_str, "%d/%m/%Y")
@@ -95,9 +83,10 @@ def get_max_page(date_str):
     )
     url = f"{SEARCH_URL}?{query}"
     try:
-        res = session.get(url, timeout=TIMEOUT)
+        res = METRICS.get(session, url, nature=NATURE_ID, date=date_str, timeout=TIMEOUT)
         res.raise_for_status()
-        soup = BeautifulSoup(res.text, 'lxml')
+        with METRICS.parsing(nature=NATURE_ID, date=date_str):
+            soup = BeautifulSoup(res.text, 'lxml')
 
         div = soup.find('div', class_='content__resultat')
         if div:
@@ -111,50 +100,6 @@ def get_max_page(date_str):
 
     return 1, 0
 
-def extract_card_data(card):
-    """Extrait les données d'une carte de consultation."""
-    try:
-        ref = card.select_one('.font-bold.table__links')
-        objet = card.select_one('[data-bs-toggle="tooltip"]')
-        buyer = card.find('span', string=lambda s: s and "Acheteur" in s)
-        pub_date = card.find('span', string=lambda s: s and "Date de publication" in s)
-
-        reference = ref.text.strip().replace('Référence :', '') if ref else None
-        obj = objet.text.strip().replace('Objet :', '') if objet else None
-        acheteur = buyer.parent.text.replace('Acheteur :', '').strip() if buyer else None
-        date_pub = pub_date.parent.text.replace('Date de publication du résultat :', '').strip() if pub_date else None
-
-        # Bloc à droite de la carte
-        right = card.select_one('.entreprise__rightSubCard--top')
-        if right:
-            devis = right.find(string=lambda s: "Nombre de devis reçus" in s)
-            nombre_devis = right.select_one("span span.font-bold").text.strip() if devis else None
-
-            spans = right.find_all('span', recursive=False)
-            attribue = False
-            entreprise = montant = None
-
-            if len(spans) >= 3:
-                entreprise = spans[1].find('span', class_='font-bold')
-                montant = spans[2].find('span', class_='font-bold')
-                entreprise = entreprise.text.strip() if entreprise else None
-                montant = montant.text.strip() if montant else None
-                attribue = entreprise is not None
-
-            return {
-                "reference": reference,
-                "objet": obj,
-                "acheteur": acheteur,
-                "date_publication": date_pub,
-                "nombre_devis": nombre_devis,
-                "attribue": attribue,
-                "entreprise_attributaire": entreprise if attribue else None,
-                "montant": montant if attribue else None
-            }
-    except Exception as e:
-        print(f"[extract_card_data] Erreur: {e}")
-    return None
-
 def fetch_page(page, date_str):
     """Récupère une page de résultats pour une date donnée."""
     date_obj = datetime.strptime(date_str, "%d/%m/%Y")
@@ -172,70 +117,91 @@ def fetch_page(page, date_str):
     url = f"{SEARCH_URL}?{query}"
 
     for attempt in range(RETRIES):
+        if attempt:
+            METRICS.observe_retry(nature=NATURE_ID, date=date_str)
         try:
-            time.sleep(random.uniform(0.25, 0.35))
-            res = session.get(url, timeout=TIMEOUT)
+            METRICS.sleep(random.uniform(0.25, 0.35), nature=NATURE_ID, date=date_str)
+            res = METRICS.get(session, url, nature=NATURE_ID, date=date_str, timeout=TIMEOUT)
             res.raise_for_status()
 
-            soup = BeautifulSoup(res.text, 'lxml')
-            cards = soup.select('.entreprise__card')
-            return [extract_card_data(card) for card in cards if card]
+            with METRICS.parsing(nature=NATURE_ID, date=date_str):
+                return extract_cards(res.text)
+        except CacheMiss:
+            return []
         except requests.RequestException as e:
             print(f"[fetch_page] Tentative {attempt+1}/{RETRIES} - Erreur page {page}: {e}")
-            time.sleep(0.3)
+            METRICS.sleep(0.3, nature=NATURE_ID, date=date_str)
     return []
 
-def save_results(data, date_str):
-    """Sauvegarde les résultats par type (attribués ou infructueux) et les données nettoyées."""
-    
-    attribues = [d for d in data if d and d['attribue']]
-    
+def stream_path(date_str):
+    return os.path.join(DAILY_DIR, f"attributed_day_{date_str.replace('/', '-')}.ndjson")
+
+
+def save_results(date_str):
+    """Construit les fichiers attribués (bruts et nettoyés) du jour à partir du flux NDJSON."""
+    path = os.path.join(DAILY_DIR, f"attributed_day_{date_str.replace('/', '-')}.json")
+    cleaned_path = os.path.join(DAILY_DIR, f"attributed_cleaned_day_{date_str.replace('/', '-')}.json")
+
+    with JsonArrayWriter(path, keep_empty=False) as raw, JsonArrayWriter(cleaned_path, keep_empty=False) as cleaned:
+        # Nettoyage par lots : les montants d'un lot sont convertis en une seule passe
+        for batch in iter_batches(iter_ndjson(stream_path(date_str)), CLEAN_BATCH_SIZE):
+            raw.write_many(batch)
+            cleaned.write_many(clean_data(batch))
+
     # Sauvegarder les données brutes
-    if attribues:
-        path = os.path.join(DAILY_DIR, f"attributed_day_{date_str.replace('/', '-')}.json")
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump(attribues, f, ensure_ascii=False, indent=2)
-        print(f"✅ {len(attribues)} consultations attribuées sauvegardées dans {path}")
-    
+    if raw.count:
+        print(f"✅ {raw.count} consultations attribuées sauvegardées dans {path}")
+
     # Nettoyer et sauvegarder les données nettoyées
-    if attribues:
-        cleaned_data = clean_data(attribues)
-        cleaned_path = os.path.join(DAILY_DIR, f"attributed_cleaned_day_{date_str.replace('/', '-')}.json")
-        with open(cleaned_path, 'w', encoding='utf-8') as f:
-            json.dump(cleaned_data, f, ensure_ascii=False, indent=2)
-        print(f"🧹 {len(cleaned_data)} données nettoyées sauvegardées dans {cleaned_path}")
+    if cleaned.count:
+        print(f"🧹 {cleaned.count} données nettoyées sauvegardées dans {cleaned_path}")
+
+    # Ajout (par référence) aux partitions jour du stockage Parquet
+    if DATASET_DIR and raw.count:
+        write_records(DATASET_NATURE, iter_ndjson(stream_path(date_str)), DATASET_DIR)
+    if STORE_PATH and raw.count:
+        with ConsultationStore(STORE_PATH) as store:
+            for batch in iter_batches(iter_ndjson(stream_path(date_str)), CLEAN_BATCH_SIZE):
+                store.upsert_awards(batch, categorie=DATASET_NATURE)
+    os.remove(stream_path(date_str))
 
 def main():
     today = datetime.now()
     # Calculate last Wednesday's date
     days_since_wednesday = (today.weekday() - 2 + 7) % 7 # Monday is 0, Wednesday is 2
     last_wednesday = today - timedelta(days=days_since_wednesday)
-    
-    current_date = last_wednesday
-
-    while current_date <= today:
-        date_str = current_date.strftime('%d/%m/%Y')
-        print(f"\n📅 Scraping pour la date : {date_str}")
-        print(f"📂 Nature de prestation : {NATURE_ID}")
-
-        max_pages, total_results = get_max_page(date_str)
-        print(f"🔍 {total_results} résultats trouvés sur {max_pages} pages.")
-
-        all_data = []
-        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-            futures = {
-                executor.submit(fetch_page, page, date_str): page
-                for page in range(1, max_pages + 1)
-            }
-
-            for future in tqdm(as_completed(futures), total=len(futures), desc=f"📄 Pages ({date_str})"):
-                result = future.result()
-                if result:
-                    all_data.extend(result)
-        print(f'📊 Total des données extraites pour {date_str} : {len(all_data)}')
-        save_results(all_data, date_str)
+
+    dates = date_window(last_wednesday, today)
+    print(f"\n📅 Scraping du {dates[0]} au {dates[-1]} ({len(dates)} jours)")
+    print(f"📂 Nature de prestation : {NATURE_ID}")
+
+    # Nombre de pages de toutes les dates découvert en parallèle, puis un seul pool pour toutes les pages
+    plan = discover_pages(dates, get_max_page, MAX_WORKERS)
+    for date_str, (max_pages, total_results) in plan.items():
+        print(f"🔍 {date_str} : {total_results} résultats trouvés sur {max_pages} pages.")
+
+    # Les attribuées de chaque page sont ajoutées au flux de sa date dès que la page est terminée
+    sinks, totals = {}, {}
+    for date_str in dates:
+        if os.path.exists(stream_path(date_str)):
+            os.remove(stream_path(date_str))
+        sinks[date_str] = NdjsonSink(stream_path(date_str))
+        totals[date_str] = 0
+
+    def on_records(date_str, result):
+        totals[date_str] += len(result)
+        sinks[date_str].write_many(d for d in result if d and d['attribue'])
+
+    def on_date_done(date_str):
+        sinks.pop(date_str).close()
+        print(f'\n📊 Total des données extraites pour {date_str} : {totals[date_str]}')
+        save_results(date_str)
         print(f"🎉 Extraction terminée pour {date_str}.")
-        current_date += timedelta(days=1)
+
+    run_plan(plan, fetch_page, on_records, on_date_done, MAX_WORKERS)
+    print(f"📈 {METRICS.summary()}")
+    if METRICS_REPORT:
+        METRICS.dump(METRICS_REPORT)
 
 if __name__ == "__main__":
     main()
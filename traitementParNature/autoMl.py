@@ -4,9 +4,15 @@ import numpy as np
 from pathlib import Path
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-from sentence_transformers import SentenceTransformer
 from tpot import TPOTRegressor
 import warnings
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.embedding_cache import embed_texts
+
+EMBED_MODEL_NAME = "dangvantuan/sentence-camembert-large"
 
 warnings.filterwarnings("ignore")
 
@@ -27,9 +33,8 @@ def evaluate_automl_for_nature(nature_id, data_file):
         y = df["montant"].tolist()
         X_train_text, X_test_text, y_train, y_test = train_test_split(X_text, y, test_size=0.3, random_state=42)
         print(f"   🔄 Génération des embeddings CamemBERT pour nature_{nature_id}...")
-        model = SentenceTransformer("dangvantuan/sentence-camembert-large")
-        X_train_emb = model.encode(X_train_text, show_progress_bar=False)
-        X_test_emb = model.encode(X_test_text, show_progress_bar=False)
+        X_train_emb = embed_texts(EMBED_MODEL_NAME, X_train_text)
+        X_test_emb = embed_texts(EMBED_MODEL_NAME, X_test_text)
         print("   🤖 Lancement de l'AutoML (TPOT)...")
         tpot = TPOTRegressor(generations=5, population_size=20, verbosity=2, random_state=42, max_time_mins=10)
         tpot.fit(X_train_emb, y_train)
@@ -4,9 +4,16 @@ from pathlib import Path
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-from sentence_transformers import SentenceTransformer
 import numpy as np
 import warnings
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.dataset_store import has_history, load_cleaned
+from common.embedding_cache import embed_texts
+
+EMBED_MODEL_NAME = "dangvantuan/sentence-camembert-large"
 
 # Ignorer les avertissements
 warnings.filterwarnings("ignore")
@@ -16,16 +23,13 @@ def evaluate_camembert_for_nature(nature_id, data_file):
     Évalue le modèle CamemBERT + RandomForest pour une nature donnée
     """
     try:
-        # Charger les données
-        with open(data_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        # Charger les données (stockage Parquet s'il contient la nature, sinon JSON)
+        df = load_cleaned(f"nature_{nature_id}", data_file, columns=["reference", "objet", "acheteur", "montant"])
         
-        if not data:
+        if df is None or df.empty:
             print(f"⚠️  Aucune donnée trouvée pour nature_{nature_id}")
             return None
         
-        df = pd.DataFrame(data)
-        
         # Filtrer les données avec montant valide
         df = df[df['montant'].notna() & (df['montant'] > 0)]
         
@@ -45,12 +49,9 @@ def evaluate_camembert_for_nature(nature_id, data_file):
         
         print(f"   🔄 Embedding des textes avec CamemBERT pour nature_{nature_id}...")
         
-        # Charger CamemBERT depuis sentence-transformers
-        model = SentenceTransformer("dangvantuan/sentence-camembert-large")
-        
-        # Embedding des textes
-        X_train_embeddings = model.encode(X_train_text, show_progress_bar=False)
-        X_test_embeddings = model.encode(X_test_text, show_progress_bar=False)
+        # Embedding des textes (CamemBERT n'est chargé que pour les textes absents du cache partagé)
+        X_train_embeddings = embed_texts(EMBED_MODEL_NAME, X_train_text)
+        X_test_embeddings = embed_texts(EMBED_MODEL_NAME, X_test_text)
         
         # Modèle de régression
         reg = RandomForestRegressor(random_state=42)
@@ -114,7 +115,7 @@ def process_all_natures():
             # Chercher le fichier attributed_cleaned.json
             data_file = item / "data" / "attributed_cleaned.json"
             
-            if not data_file.exists():
+            if not data_file.exists() and not has_history(f"nature_{nature_id}"):
                 print(f"⚠️  Fichier non trouvé pour nature_{nature_id}: {data_file}")
                 error_count += 1
                 continue
@@ -1,15 +1,22 @@
 
 
 import json
-import spacy
-from unidecode import unidecode
+import os
+import sys
 from pathlib import Path
 from collections import defaultdict, Counter
 import math
 
-# Charger le modèle spaCy pour le français
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.lemmatizer import DEFAULT_PROCESSES, lemmatize_texts, normalize_text, preprocess, shared_nlp
+
+# Lemmatisation par lots (nlp.pipe) : taille des lots et nombre de processus
+BATCH_SIZE = 512
+N_PROCESS = DEFAULT_PROCESSES
+
+# Charger le modèle spaCy pour le français (sans parser ni NER)
 try:
-    nlp = spacy.load('fr_core_news_sm')
+    nlp = shared_nlp()
 except OSError:
     print("❌ Modèle spaCy 'fr_core_news_sm' non trouvé. Installation requise:")
     print("python -m spacy download fr_core_news_sm")
@@ -18,28 +25,11 @@ except OSError:
 # Mots vides à exclure
 stop_words = set(nlp.Defaults.stop_words)
 
-def normalize_text(text):
-    """Minuscule + suppression des accents"""
-    if not text:
-        return ""
-    text = text.lower()
-    text = unidecode(text)
-    return text
-
 def process_text(text):
-    """Traite un texte avec spaCy et retourne les mots lemmatisés"""
+    """Traite un texte avec spaCy et retourne les mots lemmatisés (cache partagé, common.lemmatizer)"""
     if not text:
         return []
-    text = normalize_text(text)
-    doc = nlp(text)
-    
-    # Lemmatisation + filtrage
-    words = [token.lemma_ for token in doc
-             if token.lemma_ not in stop_words
-             and token.is_alpha
-             and len(token.lemma_) > 1]
-    
-    return words
+    return preprocess(text, min_length=2, stop_words=stop_words)
 
 def categorize_by_amount(nature_id, step=2000):
     """
@@ -83,6 +73,13 @@ def categorize_by_amount(nature_id, step=2000):
             'text': combined_text
         })
     
+    # Lemmatisation de tous les textes de la nature en une passe (textes identiques traités une fois)
+    all_items = [item for items in categories.values() for item in items]
+    lemmas = lemmatize_texts((normalize_text(item['text']) for item in all_items), nlp, stop_words,
+                             batch_size=BATCH_SIZE, n_process=N_PROCESS)
+    for item, words in zip(all_items, lemmas):
+        item['words'] = words
+
     # Traiter chaque catégorie
     results = {}
     
@@ -90,11 +87,8 @@ def categorize_by_amount(nature_id, step=2000):
         if not items:  # Ignorer les catégories vides
             continue
             
-        # Combiner tous les textes de la catégorie
-        all_text = " ".join(item['text'] for item in items)
-        
-        # Extraire les mots significatifs
-        words = process_text(all_text)
+        # Mots significatifs de tous les textes de la catégorie
+        words = [word for item in items for word in item['words']]
         
         # Compter les occurrences
         word_counts = Counter(words)
@@ -1,46 +1,26 @@
 import json
-import spacy
-from unidecode import unidecode
+import os
+import sys
+import hashlib
 from pathlib import Path
 from collections import defaultdict, Counter
 import math
+import joblib
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 
-# Charger le modèle spaCy pour le français
-try:
-    nlp = spacy.load('fr_core_news_sm')
-except OSError:
-    print("❌ Modèle spaCy 'fr_core_news_sm' non trouvé. Installation requise:")
-    print("python -m spacy download fr_core_news_sm")
-    exit(1)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.lemmatizer import preprocess_texts
 
-# Mots vides à exclure
-stop_words = set(nlp.Defaults.stop_words)
-
-def normalize_text(text):
-    """Minuscule + suppression des accents"""
-    if not text:
-        return ""
-    text = text.lower()
-    text = unidecode(text)
-    return text
-
-def process_text(text):
-    """Traite un texte avec spaCy et retourne les mots lemmatisés"""
-    if not text:
-        return []
-    text = normalize_text(text)
-    doc = nlp(text)
-    
-    # Lemmatisation + filtrage
-    words = [token.lemma_ for token in doc
-             if token.lemma_ not in stop_words
-             and token.is_alpha
-             and len(token.lemma_) > 1]
-    
-    return " ".join(words)
+# Vectoriseur TF-IDF et matrice des catégories de chaque nature, enregistrés dans nature_X/
+# et réutilisés tant que la catégorisation de la nature ne change pas (None pour toujours réentraîner)
+MODEL_FILE = "tfidf_ranges.pkl"
+TOP_K = 15
+# Nombre d'éléments par produit matriciel (taille de la matrice dense des similarités)
+SCORE_CHUNK = 2048
+# Paramètres du vectoriseur, pris en compte dans l'empreinte du modèle enregistré
+VECTORIZER_PARAMS = {"max_features": 1000, "stop_words": "english"}
 
 def load_categorization_results():
     """Charge les résultats de catégorisation"""
@@ -51,6 +31,68 @@ def load_categorization_results():
         print("❌ Fichier categorization_results.json non trouvé. Exécutez d'abord categorize_by_amount.py")
         return None
 
+def categories_fingerprint(nature_categories):
+    payload = {"categories": nature_categories, "vectorizer": VECTORIZER_PARAMS}
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def load_range_model(nature_id, nature_categories):
+    """Vectoriseur, matrice TF-IDF des catégories et marges d'une nature : relus sur disque s'ils sont à jour."""
+    model_path = Path(f"nature_{nature_id}") / MODEL_FILE if MODEL_FILE else None
+    fingerprint = categories_fingerprint(nature_categories)
+    if model_path and model_path.exists():
+        model = joblib.load(model_path)
+        if model.get('fingerprint') == fingerprint:
+            return model['vectorizer'], model['category_vectors'], model['category_ranges']
+
+    # Préparer les textes des catégories pour TF-IDF
+    category_texts = []
+    category_ranges = []
+    
+    for category_range, category_info in nature_categories.items():
+        # Créer un texte représentatif de la catégorie basé sur les mots les plus fréquents
+        words = list(category_info['words'].keys())
+        category_text = " ".join(words * 3)  # Répéter pour plus de poids
+        category_texts.append(category_text)
+        category_ranges.append(category_range)
+    
+    # Vectoriser les catégories
+    vectorizer = TfidfVectorizer(**VECTORIZER_PARAMS)
+    category_vectors = vectorizer.fit_transform(category_texts)
+
+    if model_path:
+        tmp_path = model_path.with_name(model_path.name + ".tmp")
+        joblib.dump({
+            'fingerprint': fingerprint,
+            'vectorizer': vectorizer,
+            'category_vectors': category_vectors,
+            'category_ranges': category_ranges
+        }, tmp_path)
+        os.replace(tmp_path, model_path)
+    return vectorizer, category_vectors, category_ranges
+
+def top_k_indices(similarities, k):
+    """Indices des k meilleures catégories de chaque ligne, par similarité décroissante.
+
+    Même ordre que np.argsort(similarities)[::-1][:k] avec un tri stable : à similarité égale,
+    la dernière catégorie passe devant. np.argpartition sélectionne les candidats ; les lignes
+    où des ex aequo chevauchent la k-ième place sont triées entièrement.
+    """
+    n_categories = similarities.shape[1]
+    k = min(k, n_categories)
+    # Colonnes inversées : l'ordre voulu devient (similarité décroissante, indice croissant)
+    reversed_scores = -similarities[:, ::-1]
+    if k < n_categories:
+        candidates = np.argpartition(reversed_scores, k - 1, axis=1)[:, :k]
+        kth = np.take_along_axis(reversed_scores, candidates, axis=1).max(axis=1)
+        ambiguous = np.flatnonzero((reversed_scores <= kth[:, None]).sum(axis=1) > k)
+        if len(ambiguous):
+            candidates[ambiguous] = np.argsort(reversed_scores[ambiguous], axis=1, kind="stable")[:, :k]
+    else:
+        candidates = np.tile(np.arange(n_categories), (len(similarities), 1))
+    values = np.take_along_axis(reversed_scores, candidates, axis=1)
+    order = np.lexsort((candidates, values), axis=1)
+    return n_categories - 1 - np.take_along_axis(candidates, order, axis=1)
+
 def predict_amount_ranges_for_nature(nature_id, categorization_data):
     """
     Prédit les marges de montant pour une nature donnée
@@ -75,61 +117,42 @@ def predict_amount_ranges_for_nature(nature_id, categorization_data):
         print(f"⚠️  Aucune catégorisation trouvée pour nature_{nature_id}")
         return None
     
-    # Préparer les textes des catégories pour TF-IDF
-    category_texts = []
-    category_ranges = []
+    vectorizer, category_vectors, category_ranges = load_range_model(nature_id, nature_categories)
     
-    for category_range, category_info in nature_categories.items():
-        # Créer un texte représentatif de la catégorie basé sur les mots les plus fréquents
-        words = list(category_info['words'].keys())
-        category_text = " ".join(words * 3)  # Répéter pour plus de poids
-        category_texts.append(category_text)
-        category_ranges.append(category_range)
+    # Tous les éléments de la journée sont lemmatisés, vectorisés et comparés en lot
+    items = [item for item in data if item.get('montant', 0) is not None]
+    combined_texts = [f"{item.get('acheteur', '')} {item.get('reference', '')} {item.get('objet', '')}" for item in items]
+    processed_texts = [" ".join(words) for words in preprocess_texts(combined_texts, min_length=2)]
     
-    # Vectoriser les catégories
-    vectorizer = TfidfVectorizer(max_features=1000, stop_words='english')
-    category_vectors = vectorizer.fit_transform(category_texts)
-    
-    # Traiter chaque élément
     predictions = []
     
-    for item in data:
-        montant_reel = item.get('montant', 0)
-        if montant_reel is None:
-            continue
-        
-        # Combiner les champs texte
-        combined_text = f"{item.get('acheteur', '')} {item.get('reference', '')} {item.get('objet', '')}"
-        processed_text = process_text(combined_text)
-        
-        # Vectoriser le texte de l'élément
-        item_vector = vectorizer.transform([processed_text])
-        
-        # Calculer les similarités
-        similarities = cosine_similarity(item_vector, category_vectors).flatten()
-        
-        # Obtenir les top 5 catégories les plus similaires
-        top_indices = np.argsort(similarities)[::-1][:15]
+    for start in range(0, len(items), SCORE_CHUNK):
+        item_vectors = vectorizer.transform(processed_texts[start:start + SCORE_CHUNK])
+        similarities = cosine_similarity(item_vectors, category_vectors)
+        top_indices = top_k_indices(similarities, TOP_K)
         
-        top_predictions = []
-        for idx in top_indices:
-            top_predictions.append({
-                'range': category_ranges[idx],
-                'similarity': float(similarities[idx]),
-                'count': nature_categories[category_ranges[idx]]['count']
+        for item, row_similarities, row_indices in zip(items[start:start + SCORE_CHUNK], similarities, top_indices):
+            montant_reel = item.get('montant', 0)
+            
+            top_predictions = []
+            for idx in row_indices:
+                top_predictions.append({
+                    'range': category_ranges[idx],
+                    'similarity': float(row_similarities[idx]),
+                    'count': nature_categories[category_ranges[idx]]['count']
+                })
+            
+            # Déterminer si le montant réel appartient à l'une des top 15 prédictions
+            montant_reel_range = f"{math.floor(montant_reel / 2000) * 2000}-{math.floor(montant_reel / 2000) * 2000 + 2000}"
+            correct_prediction = any(pred['range'] == montant_reel_range for pred in top_predictions)
+            
+            predictions.append({
+                'reference': item.get('reference', ''),
+                'montant_reel': montant_reel,
+                'montant_reel_range': montant_reel_range,
+                'top_15_predictions': top_predictions,
+                'correct_prediction': correct_prediction
             })
-        
-        # Déterminer si le montant réel appartient à l'une des top 15 prédictions
-        montant_reel_range = f"{math.floor(montant_reel / 2000) * 2000}-{math.floor(montant_reel / 2000) * 2000 + 2000}"
-        correct_prediction = any(pred['range'] == montant_reel_range for pred in top_predictions)
-        
-        predictions.append({
-            'reference': item.get('reference', ''),
-            'montant_reel': montant_reel,
-            'montant_reel_range': montant_reel_range,
-            'top_15_predictions': top_predictions,
-            'correct_prediction': correct_prediction
-        })
     
     return predictions
 
@@ -1,10 +1,14 @@
 import os
-import subprocess
+import sys
 
 base_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(base_dir))
+from common.nature_crawler import load_config, run
 
-for i in range(1, 102):  # adapte la plage si besoin
-    scraper_path = os.path.join(base_dir, f"nature_{i}", "scraper", "scraper.py")
-    if os.path.exists(scraper_path):
-        print(f"--- Running: {scraper_path} ---")
-        subprocess.run(["python", scraper_path])
\ No newline at end of file
+# Un seul processus pour toutes les natures (pool de connexions et limiteur partagés),
+# au lieu d'un `python nature_X/scraper/scraper.py` par nature.
+config = load_config(os.path.join(base_dir, "crawler_config.json"))
+config["natures_file"] = os.path.join(base_dir, config["natures_file"])
+config["output_dir"] = os.path.join(base_dir, config["output_dir"])
+config["cache_dir"] = os.path.join(base_dir, config["cache_dir"])
+run(config)